@@ -0,0 +1,60 @@
+"""
+Throughput benchmark of locate_intersections_batch: scenes per second for a loop of
+locate_intersections calls against one batch call, with the scenes solved one after another
+and on a process pool. Also checks that scene k of the batch gives the same result as
+locate_intersections(scenes[k], seed=seed + k).
+
+Usage: python benchmarks/bench_batch_scenes.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import locate_intersections, locate_intersections_batch
+
+
+def make_scene(rng, num_targets=3, circles_per_target=4, span=30.0, noise=0.02):
+    circles = []
+    for target in rng.uniform(0, span, size=(num_targets, 2)):
+        for _ in range(circles_per_target):
+            angle = rng.uniform(0, 2*np.pi)
+            r = rng.uniform(1.5, 4.0)
+            center = target + r * np.array([np.cos(angle), np.sin(angle)])
+            circles.append([center.tolist(), abs(r + rng.normal(0, noise))])
+    return circles
+
+
+def same_result(a, b):
+    return a[1] == b[1] and all(np.array_equal(fa['p'], fb['p']) for fa, fb in zip(a[0], b[0]))
+
+
+def main(num_scenes=100, solvers=('batched', 'slsqp'), seed=0):
+    rng = np.random.default_rng(seed)
+    scenes = [make_scene(rng) for _ in range(num_scenes)]
+
+    print('%8s %26s %10s %12s %8s' % ('solver', 'mode', 'time', 'scenes/sec', 'matches'))
+    for solver in solvers:
+        # slsqp is slow; a tenth of the scenes is enough to measure it
+        solver_scenes = scenes if solver == 'batched' else scenes[:max(num_scenes // 10, 1)]
+
+        t = time.perf_counter()
+        reference = [locate_intersections(circles_ref, solver=solver, seed=seed + k)
+                     for k, circles_ref in enumerate(solver_scenes)]
+        elapsed = time.perf_counter() - t
+        print('%8s %26s %9.3fs %12.1f %8s' %
+              (solver, 'locate_intersections loop', elapsed, len(solver_scenes) / elapsed, '-'))
+
+        for executor in (None, 'process'):
+            t = time.perf_counter()
+            results = locate_intersections_batch(solver_scenes, solver=solver, executor=executor, seed=seed)
+            elapsed = time.perf_counter() - t
+            matches = all(same_result(a, b) for a, b in zip(reference, results))
+            print('%8s %26s %9.3fs %12.1f %8s' % (solver, 'batch, executor=%s' % (executor,), elapsed,
+                                                 len(solver_scenes) / elapsed, matches))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark of the perform_hcluster backends at P = 10^3 ... 10^6 points: wall time and peak
+traced memory. Points are clouds around random targets, like the circle centers and
+intersections determine_num_lat_clusters produces. fclusterdata is skipped once its
+condensed distance matrix alone would exceed MAX_FCLUSTERDATA_BYTES.
+
+Usage: python benchmarks/bench_clustering.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from clustering import perform_hcluster, CLUSTER_BACKENDS
+
+MAX_FCLUSTERDATA_BYTES = 2 * 1024**3
+THRESHOLD = 3.0
+
+
+def make_points(num_points, rng, points_per_target=30, spread=1.0):
+    num_targets = max(num_points // points_per_target, 1)
+    # keep the density of targets constant
+    span = 20 * np.sqrt(num_targets)
+    targets = rng.uniform(0, span, size=(num_targets, 2))
+    return targets[rng.integers(0, num_targets, size=num_points)] + rng.normal(0, spread, size=(num_points, 2))
+
+
+def measure(points, backend):
+    tracemalloc.start()
+    t = time.perf_counter()
+    num_lat_clusters, enum_clusters, _ = perform_hcluster(points, THRESHOLD, backend=backend)
+    elapsed = time.perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return num_lat_clusters, enum_clusters, elapsed, peak
+
+
+def main(sizes=(10**3, 10**4, 3*10**4, 10**5, 10**6), seed=0):
+    rng = np.random.default_rng(seed)
+    print('%9s %14s %10s %10s %12s %10s' % ('P', 'backend', 'clusters', 'time', 'peak memory', 'agrees'))
+    for num_points in sizes:
+        points = make_points(num_points, rng)
+        reference = None
+        for backend in CLUSTER_BACKENDS:
+            if backend == 'fclusterdata' and 8 * num_points * (num_points - 1) / 2 > MAX_FCLUSTERDATA_BYTES:
+                print('%9d %14s %10s %10s %9.1f GB %10s' %
+                      (num_points, backend, '-', 'skipped', 8 * num_points**2 / 2 / 1024**3, '-'))
+                continue
+
+            num_lat_clusters, enum_clusters, elapsed, peak = measure(points, backend)
+            if reference is None:
+                reference = enum_clusters
+            # same partition, up to the numbering of the clusters
+            agrees = len(set(zip(reference, enum_clusters))) == len(set(reference)) == num_lat_clusters
+            print('%9d %14s %10d %9.3fs %9.1f MB %10s' %
+                  (num_points, backend, num_lat_clusters, elapsed, peak / 1024**2, agrees))
+
+
+if __name__ == '__main__':
+    main()
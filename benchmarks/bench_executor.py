@@ -0,0 +1,56 @@
+"""
+Benchmark of the executor option of locate_intersections: the clusters of each reclustering
+iteration solved one after another, on a thread pool and on a process pool, for scenes with
+a growing number of well separated targets. Reports wall time and whether the parallel results
+match the sequential ones (they are seeded per cluster, so they should be identical).
+
+Usage: python benchmarks/bench_executor.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import locate_intersections
+
+EXECUTORS = (None, 'thread', 'process')
+
+
+def make_scene(num_targets, rng, circles_per_target=4, spacing=30.0, noise=0.05):
+    # targets on a jittered grid, so the number of targets is found reliably
+    side = int(np.ceil(np.sqrt(num_targets)))
+    cells = np.stack(np.divmod(np.arange(num_targets), side), axis=1)
+    targets = spacing * (cells + rng.uniform(0.3, 0.7, size=(num_targets, 2)))
+    circles = []
+    for target in targets:
+        for _ in range(circles_per_target):
+            angle = rng.uniform(0, 2*np.pi)
+            r = rng.uniform(1.5, 4.0)
+            center = target + r * np.array([np.cos(angle), np.sin(angle)])
+            circles.append([center.tolist(), r + rng.normal(0, noise)])
+    return circles
+
+
+def main(sizes=(4, 16, 36), solver='slsqp', seed=0):
+    rng = np.random.default_rng(seed)
+    print('%8s %9s %10s %10s %12s' % ('targets', 'executor', 'time', 'loss', 'matches'))
+    for num_targets in sizes:
+        circles = make_scene(num_targets, rng)
+        reference = None
+        for executor in EXECUTORS:
+            t = time.perf_counter()
+            best_fun_vals_list, best_total_loss, _, _, _ = \
+                locate_intersections(circles, solver=solver, executor=executor, seed=seed)
+            elapsed = time.perf_counter() - t
+
+            ps = np.array([fun_vals['p'] for fun_vals in best_fun_vals_list])
+            if reference is None:
+                reference = ps
+            print('%8d %9s %9.3fs %10.4f %12s' % (num_targets, executor, elapsed, best_total_loss,
+                                                 np.array_equal(reference, ps)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Cold import time of the solver modules, each measured in a fresh interpreter (best of REPEAT),
+and which heavy dependencies the import loads. For comparison, 'eager' also imports the scipy
+submodules and matplotlib.pyplot that used to be imported at module level, and 'first solve'
+adds one small locate_intersections call, which loads what it needs on first use.
+
+Usage: python benchmarks/bench_import.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+REPEAT = 5
+HEAVY = ('matplotlib', 'scipy.optimize', 'scipy.cluster', 'scipy.sparse', 'scipy.spatial')
+
+EAGER = 'import scipy.optimize, scipy.cluster.hierarchy, scipy.sparse.csgraph, scipy.spatial, matplotlib.pyplot'
+FIRST_SOLVE = "multilateration.locate_intersections([[[0, 0], 1], [[1.5, 0], 1], [[0.75, 1.2], 1]], seed=0, solver='batched')"
+
+CASES = (
+    ('caches', 'import caches'),
+    ('multilateration', 'import multilateration'),
+    ('incremental', 'import incremental'),
+    ('multilateration, eager', 'import multilateration; ' + EAGER),
+    ('multilateration, first solve', 'import multilateration; ' + FIRST_SOLVE),
+)
+
+SCRIPT = """
+import sys, time
+t = time.perf_counter()
+%s
+elapsed = time.perf_counter() - t
+print(elapsed, ','.join(m for m in %r if m in sys.modules))
+"""
+
+
+def measure(statement):
+    best, loaded = None, None
+    for _ in range(REPEAT):
+        out = subprocess.check_output([sys.executable, '-c', SCRIPT % (statement, HEAVY)], cwd=ROOT)
+        elapsed, _, loaded = out.decode().strip().partition(' ')
+        best = float(elapsed) if best is None else min(best, float(elapsed))
+    return best, loaded
+
+
+def main():
+    print('%30s %10s   %s' % ('import', 'time', 'heavy modules loaded'))
+    for name, statement in CASES:
+        elapsed, loaded = measure(statement)
+        print('%30s %8.0fms   %s' % (name, 1e3 * elapsed, loaded or '-'))
+
+
+if __name__ == '__main__':
+    main()
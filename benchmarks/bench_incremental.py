@@ -0,0 +1,60 @@
+"""
+Benchmark of IncrementalLocator on a stream of circles: the time of each add against solving
+the circles so far from scratch with locate_intersections, which is only timed every
+SCRATCH_EVERY circles. Also reports how many adds needed a full solve, and the final total
+loss of both.
+
+Usage: python benchmarks/bench_incremental.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from incremental import IncrementalLocator
+from multilateration import locate_intersections
+
+SCRATCH_EVERY = 25
+OPTIONS = dict(solver='batched', pair_search='grid', cluster_backend='kdtree')
+
+
+def make_stream(num_targets, rng, circles_per_target=6, spacing=30.0, noise=0.02):
+    # targets on a jittered grid; circles arrive in random order
+    side = int(np.ceil(np.sqrt(num_targets)))
+    cells = np.stack(np.divmod(np.arange(num_targets), side), axis=1)
+    targets = spacing * (cells + rng.uniform(0.3, 0.7, size=(num_targets, 2)))
+    circles = []
+    for target in targets:
+        for _ in range(circles_per_target):
+            angle = rng.uniform(0, 2*np.pi)
+            r = rng.uniform(1.5, 4.0)
+            center = target + r * np.array([np.cos(angle), np.sin(angle)])
+            circles.append([center.tolist(), abs(r + rng.normal(0, noise))])
+    return [circles[i] for i in rng.permutation(len(circles))]
+
+
+def main(num_targets=25, seed=0):
+    rng = np.random.default_rng(seed)
+    stream = make_stream(num_targets, rng)
+
+    locator = IncrementalLocator(seed=seed, **OPTIONS)
+    print('%8s %14s %12s %14s' % ('circles', 'add (mean)', 'full solves', 'from scratch'))
+    t_add, scratch_loss = 0, None
+    for n, circle in enumerate(stream, start=1):
+        t = time.perf_counter()
+        locator.add(circle)
+        t_add += time.perf_counter() - t
+
+        if n % SCRATCH_EVERY == 0 or n == len(stream):
+            t = time.perf_counter()
+            _, scratch_loss, _, _, _ = locate_intersections(stream[:n], seed=seed, **OPTIONS)
+            t_scratch = time.perf_counter() - t
+            print('%8d %12.2fms %12d %12.2fms' % (n, 1e3 * t_add / n, locator.num_full_solves, 1e3 * t_scratch))
+
+    print('final total loss: incremental %.4f, from scratch %.4f' % (locator.total_loss, scratch_loss))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark of IntersectionCache on a series of snapshots of fixed stations, of which a
+fraction of the radii change between snapshots: time per snapshot of get_hcluster_points
+without a cache and with one, for both pair searches, the cache hit rate, and whether the
+hcluster points are the same. The first snapshot, which fills the cache, is not timed.
+
+Usage: python benchmarks/bench_intersection_cache.py [changed]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from caches import IntersectionCache
+from circle_table import circle_table_from_arrays
+from multilateration import get_hcluster_points
+
+
+def make_snapshots(num_circles, num_snapshots, changed, rng, span=None):
+    # Stations are fixed; in each snapshot a fraction `changed` of the radii are measured anew
+    span = span or 2.0 * np.sqrt(num_circles)
+    centers = rng.uniform(0, span, size=(num_circles, 2))
+    radii = rng.uniform(0.5, 2.0, size=num_circles)
+    snapshots = []
+    for _ in range(num_snapshots):
+        snapshots.append(circle_table_from_arrays(centers, radii)[0])
+        radii = radii.copy()
+        update = rng.random(num_circles) < changed
+        radii[update] = rng.uniform(0.5, 2.0, size=np.count_nonzero(update))
+    return snapshots
+
+
+def main(changed=0.1, sizes=(200, 1000, 4000), num_snapshots=10, seed=0):
+    rng = np.random.default_rng(seed)
+    print('%d%% of the radii change per snapshot' % (100 * changed,))
+    print('%8s %6s %14s %14s %10s %8s' % ('circles', 'search', 'no cache', 'cache', 'hit rate', 'same'))
+    for num_circles in sizes:
+        snapshots = make_snapshots(num_circles, num_snapshots, changed, rng)
+        for pair_search in ('all', 'grid'):
+            cache = IntersectionCache()
+            get_hcluster_points(snapshots[0], pair_search=pair_search, intersection_cache=cache)
+
+            t = time.perf_counter()
+            reference = [get_hcluster_points(table, pair_search=pair_search) for table in snapshots[1:]]
+            elapsed = time.perf_counter() - t
+
+            t = time.perf_counter()
+            cached = [get_hcluster_points(table, pair_search=pair_search, intersection_cache=cache)
+                      for table in snapshots[1:]]
+            elapsed_cached = time.perf_counter() - t
+
+            same = all(np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1]) and a[2] == b[2]
+                       for a, b in zip(reference, cached))
+            print('%8d %6s %12.1fms %12.1fms %10.2f %8s' % (num_circles, pair_search,
+                                                           1e3 * elapsed / (num_snapshots - 1),
+                                                           1e3 * elapsed_cached / (num_snapshots - 1),
+                                                           cache.stats()['hit_rate'], same))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,65 @@
+"""
+Benchmark of circle_io: loading N circles from .npy (memory-mapped and read), .npz and CSV into
+a circle table, against building the circles_ref list of lists from the same array. Then the
+setup of locate_intersections (prepare_scenes) from the table and from the list, and writing
+results with save_results.
+
+Usage: python benchmarks/bench_io.py [num_circles]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from circle_io import load_circles, save_results
+from circle_table import LatResult
+from multilateration import prepare_scenes
+
+
+def timed(f):
+    t = time.perf_counter()
+    result = f()
+    return time.perf_counter() - t, result
+
+
+def main(num_circles=1000000, seed=0):
+    rng = np.random.default_rng(seed)
+    circles = np.column_stack((rng.uniform(0, 1e4, size=(num_circles, 2)), rng.uniform(1.5, 4.0, num_circles)))
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = {extension: os.path.join(folder, 'circles' + extension) for extension in ('.npy', '.npz', '.csv')}
+        np.save(paths['.npy'], circles)
+        np.savez(paths['.npz'], x=circles[:, 0], y=circles[:, 1], r=circles[:, 2])
+        np.savetxt(paths['.csv'], circles, delimiter=',', header='x,y,r', comments='')
+
+        print('%d circles' % (num_circles,))
+        print('%28s %10s' % ('load', 'time'))
+        for name, f in (('.npy, memory-mapped', lambda: load_circles(paths['.npy'])),
+                        ('.npy, read', lambda: load_circles(paths['.npy'], mmap=False)),
+                        ('.npz', lambda: load_circles(paths['.npz'])),
+                        ('.csv', lambda: load_circles(paths['.csv'])),
+                        ('.npy to list of circles', lambda: [[[x, y], r] for x, y, r in np.load(paths['.npy']).tolist()])):
+            elapsed, _ = timed(f)
+            print('%28s %9.3fs' % (name, elapsed))
+
+        table, _ = load_circles(paths['.npy'])
+        circles_ref = [[[x, y], r] for x, y, r in circles.tolist()]
+        print('%28s %10s' % ('prepare_scenes', 'time'))
+        for name, scene in (('circle table', table), ('list of circles', circles_ref)):
+            elapsed, _ = timed(lambda: prepare_scenes([scene]))
+            print('%28s %9.3fs' % (name, elapsed))
+
+        # One target per 4 circles
+        members = np.arange(num_circles).reshape(-1, 4)
+        lat_results = [LatResult(loss=0.0, p=circles[m[0], :2], members=m, index=j, p_plus=[[circles[m[0], :2], 0.2]])
+                       for j, m in enumerate(members)]
+        elapsed, _ = timed(lambda: save_results(os.path.join(folder, 'results.npz'), lat_results, num_circles))
+        print('%28s %9.3fs (%d targets, %.1f MB)' % ('save_results', elapsed, len(lat_results),
+                                                    os.path.getsize(os.path.join(folder, 'results.npz')) / 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
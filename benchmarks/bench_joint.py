@@ -0,0 +1,74 @@
+"""
+Benchmark of solver='joint' (all targets of an iteration in one sparse least squares problem,
+multilat_joint) against solver='batched' (one multi-start solve per target), on scenes from
+scenes.make_scene with N targets of M stations and radius noise.
+
+First the solvers alone: the clusters are the circles of each true target, solved from the
+closed-form estimates and opt_trials random starts within the limits of the cluster. Then
+locate_intersections end to end, with and without linear_tol: total time, time in the 'multilat'
+stage (profiling.Profiler), total loss and the localization error against the ground truth.
+
+Usage: python benchmarks/bench_joint.py [num_targets ...]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import linearized_estimates, locate_intersections, solve_cluster, solve_clusters_joint
+from profiling import Profiler
+from scenes import localization_error, make_scene
+
+NUM_TARGETS = (64, 256, 1024)
+KWARGS = dict(pair_search='grid', cluster_backend='kdtree', convergence_tol=1e-6, seed=0)
+
+
+def cluster_args(circles_ref, target_ids, solver, opt_trials):
+    # solve_cluster arguments of the circles of every true target
+    centers = np.array([center for center, _ in circles_ref])
+    radii = np.array([r for _, r in circles_ref])
+    estimates = linearized_estimates(centers, radii, target_ids)
+    args_list = []
+    for k in range(len(estimates)):
+        x_list, r_list = centers[target_ids == k], radii[target_ids == k]
+        xlim = (np.min(x_list[:, 0] - r_list), np.max(x_list[:, 0] + r_list))
+        ylim = (np.min(x_list[:, 1] - r_list), np.max(x_list[:, 1] + r_list))
+        args_list.append((x_list, r_list, xlim, ylim, opt_trials, None, solver, (0, k), False, 'uniform',
+                          estimates[k], None))
+    return args_list
+
+
+def main(num_targets=NUM_TARGETS, stations_per_target=4, noise=0.02, opt_trials=7):
+    linear_tol = 3 * noise * stations_per_target
+    for n in num_targets:
+        circles_ref, targets, target_ids = make_scene(n, stations_per_target, noise=noise, seed=1)
+        print('%d targets x %d stations, noise %g' % (n, stations_per_target, noise))
+
+        print('%10s %10s %12s' % ('solver', 'time', 'total loss'))
+        for solver, solve in (('batched', lambda args_list: [solve_cluster(*args) for args in args_list]),
+                              ('joint', solve_clusters_joint)):
+            args_list = cluster_args(circles_ref, target_ids, solver, opt_trials)
+            t = time.perf_counter()
+            results = solve(args_list)
+            print('%10s %9.3fs %12.4f' % (solver, time.perf_counter() - t, sum(loss for _, loss in results)))
+
+        print('%10s %10s %10s %10s %12s %6s %10s' % ('locate', 'linear_tol', 'time', 'multilat', 'total loss',
+                                                    'found', 'error'))
+        for solver in ('batched', 'joint'):
+            for tol in (None, linear_tol):
+                profiler = Profiler()
+                t = time.perf_counter()
+                best_fun_vals_list, best_total_loss, _, _, _ = locate_intersections(
+                    circles_ref, solver=solver, linear_tol=tol, profiler=profiler, **KWARGS)
+                elapsed = time.perf_counter() - t
+                error = localization_error([fun_vals['p'] for fun_vals in best_fun_vals_list], targets)
+                print('%10s %10s %9.2fs %9.2fs %12.2f %6d %10.4f' %
+                      (solver, tol if tol is None else '%.2g' % (tol,), elapsed,
+                       profiler.report()['stages']['multilat']['time'], best_total_loss, error['num_found'],
+                       error['mean_error']))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or NUM_TARGETS)
@@ -0,0 +1,83 @@
+"""
+Benchmark of the closed-form (linearized least squares) starting point of solve_cluster.
+Clusters are the circles of single targets from scenes.make_scene, with radius noise; random
+starting points are drawn within the limits of the whole scene. The estimates of all clusters
+are computed at once with linearized_estimates, as multiple_multilateration does.
+
+For each noise level, compares 15 random starts ('uniform'), the estimate as first of 15 starts
+(linear_tol=0), and the estimate alone when its loss is below linear_tol, here 3 * noise * 4
+(about three times the loss of a 4-circle cluster at its minimum). A solve succeeds when it ends
+within 5% of the average radius of the best solution found.
+
+Usage: python benchmarks/bench_linear.py [slsqp|batched]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import linearized_estimates, locate_intersections, solve_cluster
+from scenes import make_scene
+
+NOISE = (0.0, 0.01, 0.05)
+TRIALS = 15
+
+
+def make_clusters(num_clusters, noise, stations_per_target=(3, 4, 5), seed=0):
+    clusters = []
+    for m in stations_per_target:
+        circles_ref, _, target_ids = make_scene(num_clusters // len(stations_per_target), m, noise=noise, seed=seed + m)
+        centers = np.array([center for center, _ in circles_ref])
+        radii = np.array([r for _, r in circles_ref])
+        xlim = (np.min(centers[:, 0] - radii), np.max(centers[:, 0] + radii))
+        ylim = (np.min(centers[:, 1] - radii), np.max(centers[:, 1] + radii))
+        estimates = linearized_estimates(centers, radii, target_ids)
+        for k in np.unique(target_ids):
+            members = target_ids == k
+            clusters.append((centers[members], radii[members], xlim, ylim, estimates[k]))
+    return clusters
+
+
+def main(solver='slsqp', num_clusters=60, seed=0):
+    print('solver %s, %d clusters of 3-5 circles, %d starts' % (solver, num_clusters, TRIALS))
+    print('%6s %22s %10s %10s %10s' % ('noise', 'start', 'success', 'no restart', 'time/cl'))
+    for noise in NOISE:
+        clusters = make_clusters(num_clusters, noise, seed=seed)
+        best = [min((solve_cluster(x, r, xlim, ylim, opt_trials=2 * TRIALS, solver=solver, seed=(seed, n),
+                                   p0_linear=p0_linear), solve_cluster(x, r, xlim, ylim, opt_trials=2 * TRIALS,
+                                                                        solver=solver, seed=(seed, n))),
+                    key=lambda solution: solution[1])[0] for n, (x, r, xlim, ylim, p0_linear) in enumerate(clusters)]
+        tolerance = 0.05 * np.array([np.mean(r) for _, r, _, _, _ in clusters])
+        linear_tol = 3 * noise * 4 + 1e-9
+
+        for name, kwargs in (('uniform', lambda p0_linear: {}),
+                             ('linear, restarts', lambda p0_linear: dict(p0_linear=p0_linear, linear_tol=0)),
+                             ('linear, tol %.2g' % (linear_tol,),
+                              lambda p0_linear: dict(p0_linear=p0_linear, linear_tol=linear_tol))):
+            t = time.perf_counter()
+            solutions = [solve_cluster(x, r, xlim, ylim, opt_trials=TRIALS, solver=solver, seed=(seed, n, 1),
+                                       return_info=True, **kwargs(p0_linear))
+                         for n, (x, r, xlim, ylim, p0_linear) in enumerate(clusters)]
+            elapsed = time.perf_counter() - t
+            success = np.mean([np.linalg.norm(p - p_best) < tol
+                               for (p, _, _), p_best, tol in zip(solutions, best, tolerance)])
+            single = np.mean([info['trials'] == 1 for _, _, info in solutions])
+            print('%6.2f %22s %10.2f %10.2f %8.2fms' % (noise, name, success, single, 1e3 * elapsed / len(clusters)))
+
+    print('\nlocate_intersections, 32 targets x 4 stations')
+    print('%6s %12s %10s %10s' % ('noise', 'linear_tol', 'time', 'loss'))
+    for noise in NOISE:
+        circles_ref, _, _ = make_scene(32, 4, noise=noise, seed=seed)
+        for linear_tol in (None, 3 * noise * 4 + 1e-9):
+            t = time.perf_counter()
+            _, best_total_loss, _, _, _ = locate_intersections(circles_ref, solver=solver, pair_search='grid',
+                                                               cluster_backend='kdtree', seed=seed,
+                                                               linear_tol=linear_tol)
+            print('%6.2f %12s %9.2fs %10.3f' % (noise, linear_tol if linear_tol is None else '%.2g' % (linear_tol,),
+                                               time.perf_counter() - t, best_total_loss))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,55 @@
+"""
+Benchmark of the loss and jacobian closures: opt_func_dec (python-level sums) against
+opt_func_vec (batched numpy engine), for cluster sizes from 3 to 10,000 circles.
+
+Usage: python benchmarks/bench_loss_engine.py
+"""
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import opt_func_dec, opt_func_vec
+
+
+def make_cluster(k, seed=0):
+    rng = np.random.default_rng(seed)
+    target = rng.uniform(0, 30, size=2)
+    x_list = [c for c in rng.uniform(0, 30, size=(k, 2))]
+    r_list = [np.linalg.norm(target - c) + rng.normal(0, 0.05) for c in x_list]
+    return target, x_list, r_list
+
+
+def time_call(func, repeat=5):
+    number, _ = timeit.Timer(func).autorange()
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main(sizes=(3, 10, 30, 100, 300, 1000, 3000, 10000)):
+    print('%8s %14s %14s %14s %9s %12s' %
+          ('k', 'dec loss+jac', 'vec loss+jac', 'vec fused', 'speedup', 'max rel err'))
+    for k in sizes:
+        target, x_list, r_list = make_cluster(k)
+        p = target + 0.5
+
+        _, loss_dec, jac_dec = opt_func_dec(x_list, r_list)
+        _, loss_vec, jac_vec, loss_and_jac = opt_func_vec(x_list, r_list)
+
+        # The vectorized engine must reproduce the reference closures
+        rel_err = max(
+            abs(loss_vec(p) - loss_dec(p)) / abs(loss_dec(p)),
+            np.max(np.abs(jac_vec(p) - jac_dec(p))) / np.max(np.abs(jac_dec(p))),
+        )
+
+        t_dec = time_call(lambda: (loss_dec(p), jac_dec(p)))
+        t_vec = time_call(lambda: (loss_vec(p), jac_vec(p)))
+        t_fused = time_call(lambda: loss_and_jac(p))
+
+        print('%8d %12.2fus %12.2fus %12.2fus %8.1fx %12.2e' %
+              (k, t_dec*1e6, t_vec*1e6, t_fused*1e6, t_dec / t_fused, rel_err))
+
+
+if __name__ == '__main__':
+    main()
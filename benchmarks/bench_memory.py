@@ -0,0 +1,75 @@
+"""
+Memory of the circle and result representations at n = 10^4 ... 10^6 circles, measured with
+tracemalloc:
+- circles: a list of [np.array([x, y]), r, lat_cluster_id, label] lists, as locate_intersections
+  used to build, against one CIRCLE_DTYPE circle table
+- results: one dict per target holding its own copies of its circles as lists, as in the dict
+  output, against LatResult records whose circles are index arrays into the table.
+  Targets have CIRCLES_PER_TARGET circles each.
+
+Usage: python benchmarks/bench_memory.py
+"""
+import os
+import sys
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from circle_table import LatResult, circle_table_from_arrays
+
+CIRCLES_PER_TARGET = 4
+
+
+def traced_size(build):
+    # memory still held by what build returns
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def circle_lists(centers, radii):
+    return [[np.array((x, y)), r, i // CIRCLES_PER_TARGET, None]
+            for i, ((x, y), r) in enumerate(zip(centers.tolist(), radii.tolist()))]
+
+
+def circle_table(centers, radii):
+    return circle_table_from_arrays(centers, radii, np.arange(len(radii)) // CIRCLES_PER_TARGET)[0]
+
+
+def result_dicts(circles, targets):
+    return [{'loss': 0.0, 'p': target, 'index': j, 'p+': [[target, 0.1]],
+             'circles': [[np.copy(center), r, lat_cluster_id, label] for center, r, lat_cluster_id, label
+                         in circles[j*CIRCLES_PER_TARGET:(j+1)*CIRCLES_PER_TARGET]]}
+            for j, target in enumerate(targets)]
+
+
+def result_records(targets):
+    members = np.arange(len(targets) * CIRCLES_PER_TARGET).reshape(-1, CIRCLES_PER_TARGET)
+    return [LatResult(0.0, target, members[j], j, [[target, 0.1]]) for j, target in enumerate(targets)]
+
+
+def main(sizes=(10**4, 10**5, 10**6), seed=0):
+    rng = np.random.default_rng(seed)
+    print('%9s %10s %14s %14s %8s' % ('n', 'what', 'lists/dicts', 'table/slots', 'ratio'))
+    for n in sizes:
+        centers = rng.uniform(0, 1000, size=(n, 2))
+        radii = rng.uniform(1, 5, size=n)
+        targets = list(rng.uniform(0, 1000, size=(n // CIRCLES_PER_TARGET, 2)))
+
+        before = traced_size(lambda: circle_lists(centers, radii))
+        after = traced_size(lambda: circle_table(centers, radii))
+        print('%9d %10s %11.1f MB %11.1f MB %7.1fx' % (n, 'circles', before / 1024**2, after / 1024**2, before / after))
+
+        # the results refer to circles which already exist; only count the results themselves
+        circles = circle_lists(centers, radii)
+        before = traced_size(lambda: result_dicts(circles, targets))
+        after = traced_size(lambda: result_records(targets))
+        print('%9d %10s %11.1f MB %11.1f MB %7.1fx' % (n, 'results', before / 1024**2, after / 1024**2, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark of the multi-start cluster solve: opt_trials sequential SLSQP runs (solver='slsqp')
+against one batched Levenberg-Marquardt run over all starts (multilat_batched), from the same
+starting points. Reports time per cluster and whether the batched best-of-trials loss matches
+the SLSQP one within LOSS_TOL.
+
+Usage: python benchmarks/bench_multistart.py
+"""
+import os
+import sys
+import time
+import numpy as np
+from scipy import optimize as opt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import opt_func_vec, multilat_batched
+
+# batched loss may exceed the SLSQP loss by at most this much (relative to the sum of radii)
+LOSS_TOL = 1e-3
+
+
+def make_cluster(k, rng, noise=0.05, span=30):
+    target = rng.uniform(0, span, size=2)
+    centers = rng.uniform(0, span, size=(k, 2))
+    radii = np.linalg.norm(centers - target, axis=1) + rng.normal(0, noise, size=k)
+    return centers, np.abs(radii)
+
+
+def slsqp_multistart(centers, radii, p0s):
+    _, _, _, loss_and_grad = opt_func_vec(centers, radii)
+    best_p, best_loss = None, sys.maxsize
+    for p0 in p0s:
+        p = opt.minimize(loss_and_grad, p0, jac=True, method='SLSQP', options={'disp': False})
+        if p.fun < best_loss:
+            best_p, best_loss = p.x, p.fun
+    return best_p, best_loss
+
+
+def main(sizes=(3, 5, 10, 30, 100, 1000), clusters_per_size=20, opt_trials=15, seed=0):
+    rng = np.random.default_rng(seed)
+    print('%6s %14s %14s %9s %16s %10s' %
+          ('k', 'slsqp/cluster', 'batch/cluster', 'speedup', 'max excess loss', 'within tol'))
+    for k in sizes:
+        t_slsqp, t_batch, worst = 0, 0, -np.inf
+        for _ in range(clusters_per_size):
+            centers, radii = make_cluster(k, rng)
+            p0s = rng.uniform(0, 30, size=(opt_trials, 2))
+
+            t = time.perf_counter()
+            _, loss_slsqp = slsqp_multistart(centers, radii, p0s)
+            t_slsqp += time.perf_counter() - t
+
+            t = time.perf_counter()
+            _, loss_batch, _ = multilat_batched(centers, radii, p0s)
+            t_batch += time.perf_counter() - t
+
+            worst = max(worst, (loss_batch - loss_slsqp) / np.sum(radii))
+
+        print('%6d %12.2fms %12.2fms %8.1fx %16.2e %10s' %
+              (k, 1e3*t_slsqp/clusters_per_size, 1e3*t_batch/clusters_per_size,
+               t_slsqp / t_batch, worst, worst <= LOSS_TOL))
+
+
+if __name__ == '__main__':
+    main()
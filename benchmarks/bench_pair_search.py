@@ -0,0 +1,45 @@
+"""
+Benchmark of candidate pair generation for determine_num_lat_clusters on sparse scenes
+(constant circle density): the O(n^2) walk over all pairs against grid_candidate_pairs.
+
+Usage: python benchmarks/bench_pair_search.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from spatial_index import all_candidate_pairs, grid_candidate_pairs
+
+
+def make_sparse_scene(n, rng, density=0.02, r_range=(0.5, 3.0)):
+    # keep the number of circles per unit area constant as n grows
+    span = np.sqrt(n / density)
+    return rng.uniform(0, span, size=(n, 2)), rng.uniform(*r_range, size=n)
+
+
+def main(sizes=(1000, 3000, 10000, 30000, 100000, 300000, 1000000), max_all_pairs=30000, seed=0):
+    rng = np.random.default_rng(seed)
+    print('%9s %11s %12s %12s %14s' % ('n', 'pairs', 'all pairs', 'grid', 'grid us/circle'))
+    for n in sizes:
+        centers, radii = make_sparse_scene(n, rng)
+
+        t = time.perf_counter()
+        pairs = grid_candidate_pairs(centers, radii, expansion=1.1)
+        t_grid = time.perf_counter() - t
+
+        if n <= max_all_pairs:
+            t = time.perf_counter()
+            reference = all_candidate_pairs(centers, radii, expansion=1.1)
+            t_all = '%10.3fs' % (time.perf_counter() - t,)
+            assert np.array_equal(reference, pairs)
+        else:
+            t_all = '%11s' % ('skipped',)
+
+        print('%9d %11d %s %10.3fs %14.2f' % (n, len(pairs), t_all, t_grid, 1e6 * t_grid / n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark of the seeding modes of solve_cluster: success rate against the number of local
+solves (opt_trials). Clusters are the circles of single targets from scenes.make_scene, with
+radius noise; starting points are drawn within the limits of the whole scene, as in the first
+recluster iterations. A solve succeeds when it ends within 5% of the average radius of the best
+solution found for the cluster by any mode with many trials. SLSQP often stops near, but not on,
+the kink of the loss at the minimum, so the mean excess loss over the best is reported too.
+
+Usage: python benchmarks/bench_seeding.py [slsqp|batched]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import SEEDINGS, solve_cluster
+from scenes import make_scene
+
+TRIALS = (1, 2, 3, 5, 8, 15)
+
+
+def main(solver='slsqp', num_clusters=60, stations_per_target=(3, 4, 5), noise=0.05, seed=0):
+    clusters = []
+    for m in stations_per_target:
+        circles_ref, _, target_ids = make_scene(num_clusters // len(stations_per_target), m, noise=noise, seed=seed + m)
+        centers = np.array([center for center, _ in circles_ref])
+        radii = np.array([r for _, r in circles_ref])
+        xlim = (np.min(centers[:, 0] - radii), np.max(centers[:, 0] + radii))
+        ylim = (np.min(centers[:, 1] - radii), np.max(centers[:, 1] + radii))
+        for k in np.unique(target_ids):
+            members = target_ids == k
+            clusters.append((centers[members], radii[members], xlim, ylim))
+
+    # Best solution of each cluster over all modes, with many trials
+    best_p, best_loss = [], []
+    for n, (x, r, xlim, ylim) in enumerate(clusters):
+        p, loss = min((solve_cluster(x, r, xlim, ylim, opt_trials=max(TRIALS) * 2, solver=solver, seed=(seed, n),
+                                     seeding=seeding) for seeding in SEEDINGS), key=lambda solution: solution[1])
+        best_p.append(p)
+        best_loss.append(loss)
+    best_p, best_loss = np.array(best_p), np.array(best_loss)
+    tolerance = 0.05 * np.array([np.mean(r) for _, r, _, _ in clusters])
+
+    print('solver %s, %d clusters: success rate (mean excess loss) by number of solves' % (solver, len(clusters)))
+    print('%14s' % ('seeding',) + ''.join('%16s' % ('%d' % (t,)) for t in TRIALS) + '%12s' % ('time/solve',))
+    for seeding in SEEDINGS:
+        columns, elapsed = [], 0.0
+        for trials in TRIALS:
+            t = time.perf_counter()
+            solutions = [solve_cluster(x, r, xlim, ylim, opt_trials=trials, solver=solver, seed=(seed, n, trials),
+                                       seeding=seeding)
+                         for n, (x, r, xlim, ylim) in enumerate(clusters)]
+            elapsed += time.perf_counter() - t
+            p = np.array([p for p, _ in solutions])
+            loss = np.array([loss for _, loss in solutions])
+            success = np.mean(np.linalg.norm(p - best_p, axis=1) < tolerance)
+            columns.append('%6.2f (%6.4f)' % (success, np.mean(loss - best_loss)))
+        print('%14s' % (seeding,) + ''.join('%16s' % (column,) for column in columns) +
+              '%10.2fms' % (1e3 * elapsed / (len(clusters) * sum(TRIALS)),))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,46 @@
+"""
+Benchmark of service.BatchingLocator under load from service.generate_load: many small scenes
+from scenes.make_scene, sent all at once and as a Poisson stream. max_batch_size=1 is one
+locate_intersections call per request on the same pool, the baseline. Reports throughput,
+latency percentiles, the mean batch size and the largest queue depth.
+
+Usage: python benchmarks/bench_service.py [num_requests] [targets_per_scene]
+"""
+import asyncio
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from scenes import make_scene
+from service import BatchingLocator, generate_load
+
+BATCH_SIZES = (1, 4, 16, 64)
+KWARGS = dict(solver='batched', pair_search='grid', cluster_backend='kdtree', convergence_tol=1e-6, records=True)
+
+
+async def run(scenes, max_batch_size, rate):
+    async with BatchingLocator(max_batch_size=max_batch_size, max_wait=0.005, seed=0, **KWARGS) as locator:
+        results, latencies, elapsed = await generate_load(locator, scenes, rate=rate)
+        metrics = locator.metrics()
+    failed = sum(isinstance(result, Exception) for result in results)
+    print('%10s %6d %9.1f/s %9.3fs %9.3fs %8.1f %8d %6d' %
+          ('burst' if rate is None else '%g/s' % (rate,), max_batch_size, len(scenes) / elapsed,
+           np.percentile(latencies, 50), np.percentile(latencies, 99), metrics['mean_batch_size'],
+           metrics['max_queue_depth'], failed))
+
+
+def main(num_requests=256, targets_per_scene=2, stations_per_target=3):
+    scenes = [make_scene(targets_per_scene, stations_per_target, noise=0.02, seed=k)[0] for k in range(num_requests)]
+    print('%d requests of %d targets x %d stations, %d CPUs' %
+          (num_requests, targets_per_scene, stations_per_target, os.cpu_count()))
+    print('%10s %6s %11s %10s %10s %8s %8s %6s' % ('load', 'batch', 'throughput', 'p50', 'p99', 'mean bs',
+                                                   'max queue', 'failed'))
+    for rate in (None, 200.0):
+        for max_batch_size in BATCH_SIZES:
+            asyncio.run(run(scenes, max_batch_size, rate))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
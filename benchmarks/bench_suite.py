@@ -0,0 +1,169 @@
+"""
+Benchmark suite over a grid of synthetic scenes (see scenes.make_scene): N targets, M stations
+per target, with radius noise. For each scene it times locate_intersections,
+determine_num_lat_clusters and solve_cluster (multilateration of every true target's circles),
+and measures the localization error of the located targets against the ground truth.
+
+Results are written as JSON, with the commit and library versions they were measured at, so
+runs on different commits can be compared:
+
+Usage: python benchmarks/bench_suite.py [--out results.json] [--solver batched] [--quick]
+       python benchmarks/bench_suite.py --compare before.json after.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import scipy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import auto_clustering_threshold, determine_num_lat_clusters, locate_intersections, \
+    solve_cluster
+from scenes import localization_error, make_scene
+
+NUM_TARGETS = (4, 16, 64)
+STATIONS_PER_TARGET = (3, 5)
+NOISE = (0.0, 0.05)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.realpath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def best_time(f, repeat):
+    # best of repeat runs, and the result of the last
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = f()
+        times.append(time.perf_counter() - t)
+    return min(times), result
+
+
+def run_scene(num_targets, stations_per_target, noise, solver, seed, repeat):
+    circles_ref, targets, target_ids = make_scene(num_targets, stations_per_target, noise=noise, seed=seed)
+    r_avg = np.mean([r for _, r in circles_ref])
+
+    locate_time, (best_fun_vals_list, best_total_loss, _, _, _) = best_time(
+        lambda: locate_intersections(circles_ref, solver=solver, pair_search='grid', cluster_backend='kdtree',
+                                     seed=seed), repeat)
+
+    cluster_time, (num_lat_clusters, _, _, _) = best_time(
+        lambda: determine_num_lat_clusters(circles_ref, clustering_threshold=float(auto_clustering_threshold(r_avg)),
+                                           pair_search='grid', cluster_backend='kdtree'), repeat)
+
+    centers = np.array([center for center, _ in circles_ref])
+    radii = np.array([r for _, r in circles_ref])
+    clusters = [np.flatnonzero(target_ids == k) for k in range(num_targets)]
+    lims = [((np.min(centers[c, 0] - radii[c]), np.max(centers[c, 0] + radii[c])),
+             (np.min(centers[c, 1] - radii[c]), np.max(centers[c, 1] + radii[c]))) for c in clusters]
+    multilat_time, solved = best_time(
+        lambda: [solve_cluster(centers[c], radii[c], xlim, ylim, opt_trials=15, solver=solver, seed=(seed, k))
+                 for k, (c, (xlim, ylim)) in enumerate(zip(clusters, lims))], repeat)
+
+    record = {
+        'num_targets': num_targets,
+        'stations_per_target': stations_per_target,
+        'noise': noise,
+        'seed': seed,
+        'locate_time': locate_time,
+        'determine_num_lat_clusters_time': cluster_time,
+        'multilat_time_per_target': multilat_time / num_targets,
+        'total_loss': float(best_total_loss),
+        'num_lat_clusters': int(num_lat_clusters),
+        'multilat_mean_error': float(np.mean(np.linalg.norm(np.array([p for p, _ in solved]) - targets, axis=1)))
+    }
+    record.update(localization_error([fun_vals['p'] for fun_vals in best_fun_vals_list], targets))
+    return record
+
+
+def run(solver='batched', num_targets=NUM_TARGETS, stations_per_target=STATIONS_PER_TARGET, noise=NOISE,
+        seeds=(0, 1), repeat=3):
+    records = []
+    print('%8s %8s %6s %12s %12s %14s %6s %6s %10s' %
+          ('targets', 'stations', 'noise', 'locate', 'clusters', 'multilat/tgt', 'found', 'true', 'mean err'))
+    for n in num_targets:
+        for m in stations_per_target:
+            for sigma in noise:
+                for seed in seeds:
+                    record = run_scene(n, m, sigma, solver, seed, repeat)
+                    records.append(record)
+                    print('%8d %8d %6.2f %10.1fms %10.1fms %12.2fms %6d %6d %10.4f' %
+                          (n, m, sigma, 1e3 * record['locate_time'], 1e3 * record['determine_num_lat_clusters_time'],
+                           1e3 * record['multilat_time_per_target'], record['num_found'], record['num_targets'],
+                           record['mean_error']))
+
+    return {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'solver': solver,
+        'repeat': repeat,
+        'results': records
+    }
+
+
+def compare(before_path, after_path):
+    # Ratios after / before of the timings, and the errors of both, for the scenes in both files
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def key(record):
+        return record['num_targets'], record['stations_per_target'], record['noise'], record['seed']
+
+    before_records = {key(record): record for record in before['results']}
+    print('before: %s (%s)\nafter:  %s (%s)' % (before['commit'], before['date'], after['commit'], after['date']))
+    print('%8s %8s %6s %5s %10s %10s %14s %12s %12s' %
+          ('targets', 'stations', 'noise', 'seed', 'locate', 'clusters', 'multilat/tgt', 'err before', 'err after'))
+    for record in after['results']:
+        old = before_records.get(key(record))
+        if old is None:
+            continue
+        print('%8d %8d %6.2f %5d %9.2fx %9.2fx %13.2fx %12.4f %12.4f' %
+              (key(record) + (record['locate_time'] / old['locate_time'],
+                              record['determine_num_lat_clusters_time'] / old['determine_num_lat_clusters_time'],
+                              record['multilat_time_per_target'] / old['multilat_time_per_target'],
+                              old['mean_error'], record['mean_error'])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', default=None, help='JSON file to write the results to')
+    parser.add_argument('--solver', default='batched', choices=('batched', 'slsqp'))
+    parser.add_argument('--repeat', type=int, default=3, help='timings are the best of this many runs')
+    parser.add_argument('--quick', action='store_true', help='only the smallest scenes, one seed and one run')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.quick:
+        results = run(solver=args.solver, num_targets=NUM_TARGETS[:2], seeds=(0,), repeat=1)
+    else:
+        results = run(solver=args.solver, repeat=args.repeat)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=1)
+        print('Results written to %s' % (args.out,))
+
+
+if __name__ == '__main__':
+    main()
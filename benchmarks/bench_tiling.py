@@ -0,0 +1,53 @@
+"""
+Benchmark of tiling.locate_intersections_tiled against locate_intersections on wide scenes
+from scenes.make_scene (M stations per target, radius noise): total time, time per stage
+(profiling.Profiler), the largest tile, and the localization error against the ground truth.
+The whole scene is skipped above FULL_LIMIT targets.
+
+Usage: python benchmarks/bench_tiling.py [num_targets ...]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from multilateration import locate_intersections
+from profiling import Profiler
+from scenes import localization_error, make_scene
+from tiling import locate_intersections_tiled, tile_circles
+
+NUM_TARGETS = (256, 1024, 4096)
+FULL_LIMIT = 4096
+KWARGS = dict(solver='batched', pair_search='grid', cluster_backend='kdtree', convergence_tol=1e-6, seed=0)
+
+
+def run(name, f, circles_ref, targets):
+    profiler = Profiler()
+    t = time.perf_counter()
+    best_fun_vals_list, best_total_loss, _, _, _ = f(circles_ref, profiler=profiler, **KWARGS)
+    elapsed = time.perf_counter() - t
+    error = localization_error([fun_vals['p'] for fun_vals in best_fun_vals_list], targets)
+    stages = profiler.report()['stages']
+    print('%8s %8.2fs %8.2fs %8.2fs %10.1f %6d %10.4f' %
+          (name, elapsed, stages['multilat']['time'], stages['reassign']['time'], best_total_loss,
+           error['num_found'], error['mean_error']))
+
+
+def main(num_targets=NUM_TARGETS, stations_per_target=4, noise=0.02):
+    for n in num_targets:
+        circles_ref, targets, _ = make_scene(n, stations_per_target, noise=noise, seed=1)
+        radii = np.array([r for _, r in circles_ref])
+        tiles = tile_circles([center for center, _ in circles_ref], 40 * np.max(radii), 2 * np.max(radii))
+        print('%d targets, %d circles, %d tiles of at most %d circles (%d circles in all tiles)' %
+              (n, len(circles_ref), len(tiles), max(len(members) for _, members in tiles),
+               sum(len(members) for _, members in tiles)))
+        print('%8s %9s %9s %9s %10s %6s %10s' % ('mode', 'total', 'multilat', 'reassign', 'loss', 'found', 'mean err'))
+        if n <= FULL_LIMIT:
+            run('full', locate_intersections, circles_ref, targets)
+        run('tiled', locate_intersections_tiled, circles_ref, targets)
+
+
+if __name__ == '__main__':
+    main(*([[int(n) for n in sys.argv[1:]]] if sys.argv[1:] else []))
@@ -0,0 +1,55 @@
+"""
+Benchmark of WarmStartCache on a series of snapshots of one scene whose radii are jittered by
+measurement noise: time per snapshot and total loss without a cache and with one, and the
+cache hit rate. With noise well below the cache quantum, most clusters of later snapshots are
+found in the cache and solved with a single optimization.
+
+Usage: python benchmarks/bench_warm_start.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from caches import WarmStartCache
+from multilateration import locate_intersections
+
+
+def make_scene(num_targets, rng, circles_per_target=4, spacing=30.0):
+    side = int(np.ceil(np.sqrt(num_targets)))
+    cells = np.stack(np.divmod(np.arange(num_targets), side), axis=1)
+    targets = spacing * (cells + rng.uniform(0.3, 0.7, size=(num_targets, 2)))
+    centers, radii = [], []
+    for target in targets:
+        for _ in range(circles_per_target):
+            angle = rng.uniform(0, 2*np.pi)
+            r = rng.uniform(1.5, 4.0)
+            centers.append(target + r * np.array([np.cos(angle), np.sin(angle)]))
+            radii.append(r)
+    return np.array(centers), np.array(radii)
+
+
+def main(num_targets=9, num_snapshots=20, noise=1e-3, solver='slsqp', seed=0):
+    rng = np.random.default_rng(seed)
+    centers, radii = make_scene(num_targets, rng)
+    snapshots = [[[center.tolist(), r] for center, r in zip(centers, np.abs(radii + rng.normal(0, noise, len(radii))))]
+                 for _ in range(num_snapshots)]
+
+    print('%10s %14s %12s %10s' % ('cache', 'per snapshot', 'mean loss', 'hit rate'))
+    for cache in (None, WarmStartCache()):
+        losses = []
+        t = time.perf_counter()
+        for k, circles_ref in enumerate(snapshots):
+            _, loss, _, _, _ = locate_intersections(circles_ref, solver=solver, seed=seed + k,
+                                                    warm_start_cache=cache)
+            losses.append(loss)
+        elapsed = time.perf_counter() - t
+        print('%10s %12.1fms %12.4f %10s' % ('none' if cache is None else 'lru', 1e3 * elapsed / num_snapshots,
+                                             np.mean(losses), '-' if cache is None else
+                                             '%.2f' % (cache.stats()['hit_rate'],)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Seeded synthetic scenes with known targets, for the benchmarks.
+
+make_scene places targets at random in a square, and around each target a number of stations
+whose circles pass through it, with noise added to the radii. The same seed always gives the
+same scene.
+"""
+import numpy as np
+
+from scipy.optimize import linear_sum_assignment
+
+
+def make_scene(num_targets, stations_per_target, noise=0.0, overlap=0.05, radius_range=(1.5, 4.0), seed=0):
+    """
+    :param num_targets: number of targets N
+    :param stations_per_target: number of stations M measuring each target
+    :param noise: standard deviation of the gaussian noise added to every radius
+    :param overlap: expected number of targets per radius_range[1] x radius_range[1] square. Higher values
+                    put the targets closer together, so more circles of different targets intersect
+    :param radius_range: radii of the circles are uniform in this range, before the noise
+    :param seed: seed for np.random.default_rng
+    :return: circles_ref, targets, target_ids: the N*M circles as a list of [[x, y], r] for
+             locate_intersections, the (N, 2) array of true target locations, and the (N*M,) index of
+             the target of each circle
+    """
+    rng = np.random.default_rng(seed)
+    side = radius_range[1] * np.sqrt(num_targets / overlap)
+    targets = rng.uniform(0, side, size=(num_targets, 2))
+
+    target_ids = np.repeat(np.arange(num_targets), stations_per_target)
+    angles = rng.uniform(0, 2*np.pi, size=len(target_ids))
+    radii = rng.uniform(*radius_range, size=len(target_ids))
+    centers = targets[target_ids] + radii[:, None] * np.stack((np.cos(angles), np.sin(angles)), axis=1)
+    radii = np.abs(radii + rng.normal(0, noise, size=len(radii)))
+
+    circles_ref = [[center, r] for center, r in zip(centers.tolist(), radii.tolist())]
+    return circles_ref, targets, target_ids
+
+
+def localization_error(found, targets):
+    """
+    Match found locations to true targets one to one, minimizing the total distance.
+
+    :param found: (k, 2) array of located targets
+    :param targets: (N, 2) array of true targets
+    :return: dict of num_found, num_targets, mean_error and max_error over the matched pairs
+    """
+    found = np.reshape(np.asarray(found, dtype='float64'), (-1, 2))
+    targets = np.reshape(np.asarray(targets, dtype='float64'), (-1, 2))
+    distances = np.linalg.norm(found[:, None, :] - targets[None, :, :], axis=2)
+    rows, cols = linear_sum_assignment(distances)
+    matched = distances[rows, cols]
+
+    return {
+        'num_found': len(found),
+        'num_targets': len(targets),
+        'mean_error': float(np.mean(matched)) if len(matched) else float('nan'),
+        'max_error': float(np.max(matched)) if len(matched) else float('nan')
+    }
@@ -0,0 +1,237 @@
+import threading
+import time
+import numpy as np
+
+from collections import OrderedDict
+
+
+class WarmStartCache:
+    """
+    LRU cache of converged cluster locations, keyed on a quantized fingerprint of the cluster's
+    circles. multiple_multilateration starts a cluster it has seen before (up to the quantization)
+    from the cached location, with a single optimization instead of opt_trials random restarts.
+
+    Entries are evicted when there are more than max_size, least recently used first, and when
+    they are older than max_age seconds. The cache is safe to share between threads; a process
+    pool works on copies, so updates made there are lost.
+    """
+
+    def __init__(self, max_size=1024, max_age=None, quantum=1e-2, clock=time.monotonic):
+        """
+        :param max_size: maximum number of entries
+        :param max_age: entries older than this many seconds are not used. None for no limit
+        :param quantum: centers and radii are rounded to multiples of this for the fingerprint
+        :param clock: time source, in seconds
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self.quantum = quantum
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def fingerprint(self, x_list, r_list):
+        """
+        :param x_list: (k, 2) array of circle centers
+        :param r_list: (k,) array of circle radii
+        :return: key of the set of circles: the same for the same circles in any order
+        """
+        quantized = np.round(np.column_stack((x_list, r_list)) / self.quantum).astype(np.int64)
+        quantized = quantized[np.lexsort(quantized.T[::-1])]
+        return quantized.tobytes()
+
+    def get(self, key):
+        """
+        :return: the cached location for key, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.max_age is not None and self.clock() - entry[1] > self.max_age:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, p):
+        """
+        Store location p for key.
+        """
+        with self._lock:
+            self._entries[key] = (np.copy(p), self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        :return: dict of size, hits, misses, evictions and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class IntersectionCache:
+    """
+    Candidate circle pairs and their (almost-)intersections, as found by get_hcluster_points, kept
+    per set of station centers across calls. When the same stations come back with some radii
+    measured anew, a pair of circles is reused as long as neither radius changed; only the pairs
+    of the circles whose radius changed are searched for (on a KD-tree of the centers) and
+    intersected again. The result is exactly that of a full search.
+
+    Entries are whole station sets: there are at most max_size of them, least recently used
+    evicted first. stats() counts reused pairs as hits and recomputed ones as misses. The cache is
+    safe to share between threads; a process pool works on copies, so updates made there are lost.
+    """
+
+    def __init__(self, max_size=64):
+        """
+        :param max_size: maximum number of station sets
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def pair_intersections(self, circle_array, expansion, search, intersect):
+        """
+        Candidate pairs of circles and their intersections, reusing those of unchanged pairs.
+
+        :param circle_array: (n, 3) array of [x, y, r]
+        :param expansion: factor applied to every radius to find the candidate pairs
+        :param search: function of centers, radii and expansion giving the (m, 2) candidate pairs i < j,
+                       such as spatial_index.grid_candidate_pairs; only called for station sets not cached
+        :param intersect: function of the circles of the pairs, (m, 3) arrays circles0 and circles1,
+                          giving ix0, ix1, intersect, such as multilateration.almost_intersections
+        :return: pairs, ix0, ix1, intersect, with the pairs sorted by i then j
+        """
+        centers, radii = circle_array[:, :2], circle_array[:, 2]
+        key = (expansion, np.ascontiguousarray(centers).tobytes())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            pairs = search(centers, radii, expansion=expansion)
+            ix0, ix1, hit = intersect(circle_array[pairs[:, 0]], circle_array[pairs[:, 1]])
+            self._put(key, dict(radii=radii.copy(), tree=None, pairs=pairs, ix0=ix0, ix1=ix1, intersect=hit),
+                      hits=0, misses=len(pairs))
+            return pairs, ix0, ix1, hit
+
+        changed = radii != entry['radii']
+        if not np.any(changed):
+            self._put(key, entry, hits=len(entry['pairs']), misses=0)
+            return entry['pairs'], entry['ix0'], entry['ix1'], entry['intersect']
+
+        # pairs of unchanged circles are kept as they are
+        kept = ~(changed[entry['pairs'][:, 0]] | changed[entry['pairs'][:, 1]])
+        pairs = entry['pairs'][kept]
+
+        # the circles whose radius changed, against every circle within reach of them
+        if entry['tree'] is None:
+            from scipy.spatial import cKDTree
+            entry['tree'] = cKDTree(centers)
+        reach = expansion * radii
+        rows = np.flatnonzero(changed)
+        neighbours = entry['tree'].query_ball_point(centers[rows], (reach[rows] + np.max(reach)) * (1 + 1e-6))
+        counts = np.array([len(neighbour) for neighbour in neighbours], dtype=np.intp)
+        i = np.repeat(rows, counts)
+        j = np.concatenate(neighbours).astype(np.intp) if len(i) else np.empty(0, dtype=np.intp)
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        # each pair once, and pairs of two changed circles are found from both
+        num_circles = len(circle_array)
+        pair_key = np.unique(i[i != j] * num_circles + j[i != j])
+        i, j = pair_key // num_circles, pair_key % num_circles
+        # the test of spatial_index, so the pairs are those a full search finds
+        delta = centers[i] - centers[j]
+        d = np.sqrt(delta[:, 0]*delta[:, 0] + delta[:, 1]*delta[:, 1])
+        touching = d <= (reach[i] + reach[j]) * (1 + 1e-9)
+        new_pairs = np.stack((i[touching], j[touching]), axis=1)
+        new_ix0, new_ix1, new_hit = intersect(circle_array[new_pairs[:, 0]], circle_array[new_pairs[:, 1]])
+
+        pairs = np.concatenate((pairs, new_pairs))
+        order = np.argsort(pairs[:, 0] * num_circles + pairs[:, 1], kind='stable')
+        pairs = pairs[order]
+        ix0 = np.concatenate((entry['ix0'][kept], new_ix0))[order]
+        ix1 = np.concatenate((entry['ix1'][kept], new_ix1))[order]
+        hit = np.concatenate((entry['intersect'][kept], new_hit))[order]
+        self._put(key, dict(radii=radii.copy(), tree=entry['tree'], pairs=pairs, ix0=ix0, ix1=ix1, intersect=hit),
+                  hits=int(np.count_nonzero(kept)), misses=len(new_pairs))
+        return pairs, ix0, ix1, hit
+
+    def _put(self, key, entry, hits, misses):
+        # the arrays are handed out on later hits as they are
+        for name in ('pairs', 'ix0', 'ix1', 'intersect'):
+            entry[name].flags.writeable = False
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        :return: dict of size (station sets), hits and misses (pairs), evictions and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -36,4 +36,67 @@ def get_circle_intersections(circle0, circle1):
     # y coord
     p3_bot[1] = p2[1] + h*(c1[0] - c0[0]) / d
 
-    return p3_top, p3_bot, 'intersect'
\ No newline at end of file
+    return p3_top, p3_bot, 'intersect'
+
+
+# Case codes returned by get_circle_intersections_batch, indexing CASE_NAMES
+SEPERATE, CONTAINED, COINCIDENT, INTERSECT = 0, 1, 2, 3
+CASE_NAMES = ('seperate', 'contained', 'coincident', 'intersect')
+
+
+def get_circle_intersections_batch(circles0, circles1):
+    """
+    Vectorized get_circle_intersections over m pairs of circles at once.
+
+    :param circles0: (m, 3) array of [x, y, r] for the first circle of every pair
+    :param circles1: (m, 3) array of [x, y, r] for the second circle of every pair
+    :return: p3_top (m, 2), p3_bot (m, 2), case (m,) codes into CASE_NAMES,
+             contained (m, 2) bools (is circle 0 bigger?, is circle 1 bigger?), only set for
+             'contained' pairs. Intersection points are nan unless the case is 'intersect'.
+    """
+    circles0 = np.reshape(np.asarray(circles0, dtype='float64'), (-1, 3))
+    circles1 = np.reshape(np.asarray(circles1, dtype='float64'), (-1, 3))
+    c0, r0 = circles0[:, :2], circles0[:, 2]
+    c1, r1 = circles1[:, :2], circles1[:, 2]
+
+    # matmul rounds like the np.linalg.norm used for a single pair
+    delta = c0 - c1
+    d = np.sqrt(np.matmul(delta[:, None, :], delta[:, :, None])[:, 0, 0])
+
+    # same precedence as get_circle_intersections
+    seperate = d > (r0 + r1)
+    contained = ~seperate & (d < np.abs(r0 - r1))
+    coincident = ~seperate & ~contained & (d == 0) & (r0 == r1)
+    intersect = ~(seperate | contained | coincident)
+
+    case = np.full(len(d), INTERSECT, dtype=np.int8)
+    case[seperate] = SEPERATE
+    case[contained] = CONTAINED
+    case[coincident] = COINCIDENT
+
+    containment = np.zeros((len(d), 2), dtype=bool)
+    containment[contained, 0] = r0[contained] >= r1[contained]
+    containment[contained, 1] = r1[contained] > r0[contained]
+
+    p3_top = np.full((len(d), 2), np.nan)
+    p3_bot = np.full((len(d), 2), np.nan)
+
+    c0, c1, r0, r1, d = c0[intersect], c1[intersect], r0[intersect], r1[intersect], d[intersect]
+    a = (r0**2 - r1**2 + d**2) / (2*d)
+    # tangent circles can round to a tiny negative value under the root
+    h = np.sqrt(np.maximum(r0**2 - a**2, 0))
+
+    # middle
+    p2 = c0 + a[:, None]*(c1 - c0) / d[:, None]
+
+    # x coord
+    p3_top[intersect, 0] = p2[:, 0] + h*(c1[:, 1] - c0[:, 1]) / d
+    # y coord
+    p3_top[intersect, 1] = p2[:, 1] - h*(c1[:, 0] - c0[:, 0]) / d
+
+    # x coord
+    p3_bot[intersect, 0] = p2[:, 0] - h*(c1[:, 1] - c0[:, 1]) / d
+    # y coord
+    p3_bot[intersect, 1] = p2[:, 1] + h*(c1[:, 0] - c0[:, 0]) / d
+
+    return p3_top, p3_bot, case, containment
@@ -0,0 +1,155 @@
+import os
+import numpy as np
+
+try:
+    # from same directory
+    from circle_table import CIRCLE_DTYPE
+except ModuleNotFoundError:
+    # if it is contained in a project
+    from .circle_table import CIRCLE_DTYPE
+
+# Columns of a circle file, in the order of unnamed columns
+CIRCLE_COLUMNS = ('x', 'y', 'r', 'label')
+
+
+def _columns_from_matrix(matrix):
+    # Columns of an (n, 3) or (n, 4) array of [x, y, r(, label)]
+    if matrix.ndim != 2 or matrix.shape[1] not in (3, 4):
+        raise ValueError('Expected an (n, 3) or (n, 4) array of [x, y, r(, label)], got shape %s' % (matrix.shape,))
+    return {name: matrix[:, k] for k, name in enumerate(CIRCLE_COLUMNS[:matrix.shape[1]])}
+
+def _read_csv(path, delimiter=','):
+    # Columns of a CSV file. The first row is a header if it names the columns x, y, r (and label),
+    # otherwise the columns are x, y, r(, label) in this order.
+    with open(path) as f:
+        first = f.readline().strip().split(delimiter)
+    names = [name.strip().lower() for name in first]
+    header = all(name in names for name in CIRCLE_COLUMNS[:3])
+    if not header:
+        names = list(CIRCLE_COLUMNS[:len(names)])
+
+    usecols = [names.index(name) for name in CIRCLE_COLUMNS[:3]]
+    xyr = np.loadtxt(path, delimiter=delimiter, skiprows=int(header), usecols=usecols, dtype='float64', ndmin=2)
+    columns = dict(zip(CIRCLE_COLUMNS[:3], xyr.T))
+    if 'label' in names:
+        columns['label'] = np.loadtxt(path, delimiter=delimiter, skiprows=int(header), usecols=names.index('label'),
+                                      dtype=str, ndmin=1)
+    return columns
+
+def load_circles(path, mmap=True, delimiter=','):
+    """
+    Load circles from a file into a circle table, with no per-circle Python objects. The x, y and r
+    columns are copied once, straight into the table (40 bytes per circle), whatever the format.
+
+    Formats, by extension:
+    - .npy: an (n, 3) or (n, 4) array of [x, y, r(, label)], or a structured array with fields
+      x, y, r and optionally label. If mmap, the file is memory-mapped: the x, y and r columns
+      are still all read into the table, but without reading the whole file into an intermediate
+      array first, and the labels are left as a view of the file.
+    - .npz: arrays x, y, r and optionally label, or one array circles as in .npy.
+    - .csv (or any other extension): columns x, y, r and optionally label, either named in a header
+      row in any order, or in this order without a header.
+
+    :param path: file to load
+    :param mmap: memory-map .npy files instead of reading them into memory before copying the columns
+    :param delimiter: column delimiter of CSV files
+    :return: table, labels: the circle table, and the array of labels its label column indexes into,
+             empty if the file has no labels
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        array = np.load(path, mmap_mode='r' if mmap else None)
+        if array.dtype.names is not None:
+            columns = {name: array[name] for name in CIRCLE_COLUMNS if name in array.dtype.names}
+        else:
+            columns = _columns_from_matrix(array)
+    elif extension == '.npz':
+        with np.load(path) as archive:
+            if 'circles' in archive.files:
+                columns = _columns_from_matrix(archive['circles'])
+            else:
+                columns = {name: archive[name] for name in CIRCLE_COLUMNS if name in archive.files}
+    else:
+        columns = _read_csv(path, delimiter=delimiter)
+
+    missing = [name for name in CIRCLE_COLUMNS[:3] if name not in columns]
+    if missing:
+        raise ValueError('%s has no column %s' % (path, ', '.join(missing)))
+
+    # Fill the table column by column, as circle_table_from_arrays does, without stacking the centers first
+    table = np.empty(len(columns['r']), dtype=CIRCLE_DTYPE)
+    for name in CIRCLE_COLUMNS[:3]:
+        table[name] = columns[name]
+    table['cluster'] = -1
+    labels = np.asarray(columns['label']) if 'label' in columns else np.empty(0)
+    table['label'] = np.arange(len(table)) if len(labels) else -1
+    return table, labels
+
+def save_circles(path, table, labels=None):
+    """
+    Write the circles of a circle table as an .npz file that load_circles reads.
+
+    :param path: file to write
+    :param table: circle table
+    :param labels: the labels its label column indexes into, or None. Labels should be numbers or strings
+    """
+    columns = dict(x=table['x'], y=table['y'], r=table['r'])
+    if labels is not None and len(labels):
+        columns['label'] = np.asarray(labels)[table['label']]
+    np.savez(path, **columns)
+
+def results_to_columns(lat_results, num_circles, labels=None):
+    """
+    Columnar form of multilateration results, one array per field.
+
+    :param lat_results: list of LatResult, as returned with records=True
+    :param num_circles: number of circles in the circle table the members index into
+    :param labels: array of the label of every circle, or None
+    :return: dict of arrays:
+             p (k, 2), loss (k,) and index (k,), one row per target;
+             member_offsets (k+1,) and members: the circles of target j are
+             members[member_offsets[j]:member_offsets[j+1]];
+             circle_target (num_circles,): the row of the target of every circle, or -1;
+             p_plus (m, 3) rows of [x, y, radius] and p_plus_target (m,), the row of the target of each;
+             member_labels, the labels of members, if labels is given
+    """
+    counts = np.array([len(lat_result.members) for lat_result in lat_results], dtype=np.int64)
+    members = np.concatenate([np.asarray(lat_result.members, dtype=np.int64) for lat_result in lat_results]) \
+        if lat_results else np.empty(0, dtype=np.int64)
+    circle_target = np.full(num_circles, -1, dtype=np.int64)
+    circle_target[members] = np.repeat(np.arange(len(lat_results)), counts)
+
+    p_plus = [(j, point[0], point[1], radius) for j, lat_result in enumerate(lat_results)
+              for point, radius in (lat_result.p_plus or ())]
+    p_plus = np.array(p_plus, dtype='float64').reshape(-1, 4)
+
+    columns = {
+        'p': np.array([lat_result.p for lat_result in lat_results], dtype='float64').reshape(-1, 2),
+        'loss': np.array([lat_result.loss for lat_result in lat_results], dtype='float64'),
+        'index': np.array([lat_result.index for lat_result in lat_results], dtype=np.int64),
+        'member_offsets': np.concatenate(([0], np.cumsum(counts))),
+        'members': members,
+        'circle_target': circle_target,
+        'p_plus': p_plus[:, 1:],
+        'p_plus_target': p_plus[:, 0].astype(np.int64)
+    }
+    if labels is not None and len(labels):
+        columns['member_labels'] = np.asarray(labels)[members]
+    return columns
+
+def save_results(path, lat_results, num_circles, labels=None, compressed=False):
+    """
+    Write multilateration results as an .npz file of the columns of results_to_columns.
+    Labels should be numbers or strings, so that load_results can read them without pickle.
+
+    :param compressed: use np.savez_compressed
+    """
+    columns = results_to_columns(lat_results, num_circles, labels=labels)
+    (np.savez_compressed if compressed else np.savez)(path, **columns)
+
+def load_results(path):
+    """
+    :return: dict of the arrays written by save_results
+    """
+    with np.load(path) as archive:
+        return {name: archive[name] for name in archive.files}
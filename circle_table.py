@@ -0,0 +1,117 @@
+import numpy as np
+
+# One row per circle. label is an index into a separate list of label objects, or -1 for no label;
+# cluster is the multilateration cluster of the circle, or -1 if it has none yet.
+CIRCLE_DTYPE = np.dtype([('x', 'f8'), ('y', 'f8'), ('r', 'f8'), ('cluster', 'i8'), ('label', 'i8')])
+
+
+def circle_table_from_arrays(centers, radii, clusters=None, labels=None):
+    """
+    Build a circle table from arrays, without going through a list of circles.
+
+    :param centers: (n, 2) array of circle centers
+    :param radii: (n,) array of circle radii
+    :param clusters: (n,) int array of cluster ids, or None for -1 (no cluster)
+    :param labels: list of n label objects, or None for no labels
+    :return: table, labels: (n,) CIRCLE_DTYPE array, and the list its label column indexes into
+    """
+    centers = np.reshape(np.asarray(centers, dtype='float64'), (-1, 2))
+    table = np.empty(len(centers), dtype=CIRCLE_DTYPE)
+    table['x'] = centers[:, 0]
+    table['y'] = centers[:, 1]
+    table['r'] = radii
+    table['cluster'] = -1 if clusters is None else clusters
+
+    if labels is None:
+        table['label'] = -1
+        labels = []
+    else:
+        labels = list(labels)
+        table['label'] = [-1 if label is None else n for n, label in enumerate(labels)]
+
+    return table, labels
+
+
+def is_circle_table(circles):
+    """
+    :return: whether circles is a circle table, a CIRCLE_DTYPE array, rather than a list of circles
+    """
+    return isinstance(circles, np.ndarray) and circles.dtype == CIRCLE_DTYPE
+
+
+def as_circle_table(circles, labels=None):
+    """
+    Circle table of a list of circles [[x, y], r, lat_cluster_id, label], of which lat_cluster_id
+    and label are optional and may be None. A circle table is returned as is.
+
+    :param circles: list of circles, or a CIRCLE_DTYPE array
+    :param labels: if circles is a circle table, the list its label column indexes into
+    :return: table, labels: (n,) CIRCLE_DTYPE array, and the list its label column indexes into
+    """
+    if is_circle_table(circles):
+        return circles, [] if labels is None else labels
+
+    centers = [circle[0] for circle in circles]
+    radii = [circle[1] for circle in circles]
+    clusters = [-1 if len(circle) < 3 or circle[2] is None else circle[2] for circle in circles]
+    labels = [circle[3] if len(circle) >= 4 else None for circle in circles]
+    if all(label is None for label in labels):
+        labels = None
+
+    return circle_table_from_arrays(centers, radii, clusters, labels)
+
+
+def table_centers(table):
+    """
+    :param table: CIRCLE_DTYPE array
+    :return: contiguous (n, 2) array of the circle centers
+    """
+    return np.stack((table['x'], table['y']), axis=1)
+
+
+def table_to_circles(table, labels):
+    """
+    Inverse of as_circle_table: the list of circles [np.array([x, y]), r, lat_cluster_id, label].
+    """
+    return [[np.array((x, y)), r, None if cluster < 0 else cluster, labels[label] if label >= 0 else None]
+            for x, y, r, cluster, label in table.tolist()]
+
+
+class LatResult:
+    """
+    Multilateration result for one cluster. The circles of the cluster are kept as indices into
+    a circle table; to_dict gives the dict that multiple_multilateration returns by default.
+    """
+    __slots__ = ('loss', 'p', 'members', 'index', 'p_plus')
+
+    def __init__(self, loss, p, members, index, p_plus=None):
+        self.loss = loss
+        self.p = p
+        self.members = members
+        self.index = index
+        self.p_plus = p_plus
+
+    def __repr__(self):
+        return 'LatResult(loss=%r, p=%r, members=%r, index=%r, p_plus=%r)' % \
+            (self.loss, self.p, self.members, self.index, self.p_plus)
+
+    def circles(self, table, labels):
+        """
+        :return: the cluster's circles, [np.array([x, y]), r, lat_cluster_id, label] as in circles_ref
+        """
+        return [[np.array((x, y)), r, self.index, labels[label] if label >= 0 else None]
+                for x, y, r, _, label in table[self.members].tolist()]
+
+    def to_dict(self, table, labels):
+        """
+        :return: {'loss', 'p', 'circles', 'index', 'p+'}, the dict format of multiple_multilateration
+        """
+        min_fun_vals = {
+            'loss': self.loss,
+            'p': self.p,
+            'circles': self.circles(table, labels),
+            'index': self.index
+        }
+        if self.p_plus is not None:
+            min_fun_vals['p+'] = self.p_plus
+        return min_fun_vals
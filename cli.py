@@ -0,0 +1,94 @@
+"""
+Locate the targets of the circles in a file, and write the results as columns to an .npz file.
+
+Circles are read with circle_io.load_circles (.npy, memory-mapped, .npz or CSV) and results
+written with circle_io.save_results; see there for the formats.
+
+Usage: python cli.py circles.npy -o results.npz [--solver batched] [--tile-size 100] [--executor process]
+"""
+import argparse
+import sys
+import time
+
+try:
+    # from same directory
+    from circle_io import load_circles, save_results
+    from clustering import CLUSTER_BACKENDS
+    from multilateration import SEEDINGS, locate_intersections
+    from profiling import Profiler
+    from tiling import locate_intersections_tiled
+except ModuleNotFoundError:
+    # if it is contained in a project
+    from .circle_io import load_circles, save_results
+    from .clustering import CLUSTER_BACKENDS
+    from .multilateration import SEEDINGS, locate_intersections
+    from .profiling import Profiler
+    from .tiling import locate_intersections_tiled
+
+
+def threshold(value):
+    return value if value == 'search' else float(value)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('circles', help='.npy, .npz or CSV file of circles x, y, r(, label)')
+    parser.add_argument('-o', '--out', default=None, help='.npz file to write the results to')
+    parser.add_argument('--delimiter', default=',', help='column delimiter of CSV files')
+    parser.add_argument('--no-mmap', action='store_true', help='read .npy files instead of memory-mapping them')
+    parser.add_argument('--compressed', action='store_true', help='compress the results file')
+    parser.add_argument('--solver', default='batched', choices=('batched', 'slsqp', 'joint'))
+    parser.add_argument('--seeding', default='uniform', choices=SEEDINGS)
+    parser.add_argument('--pair-search', default='grid', choices=('all', 'grid'))
+    parser.add_argument('--cluster-backend', default='kdtree', choices=CLUSTER_BACKENDS)
+    parser.add_argument('--clustering-threshold', type=threshold, default=None,
+                        help="hcluster threshold, or 'search'. Derived from the average radius by default")
+    parser.add_argument('--convergence-tol', type=float, default=None)
+    parser.add_argument('--linear-tol', type=float, default=None,
+                        help='start from the closed-form estimate of each target, without restarts if its loss is '
+                             'below this')
+    parser.add_argument('--executor', default=None, choices=('thread', 'process'),
+                        help='solve targets, or tiles with --tile-size, on a pool')
+    parser.add_argument('--tile-size', type=float, default=None,
+                        help='solve by tiles of this side, with tiling.locate_intersections_tiled')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--profile', action='store_true', help='print the time spent in each stage')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    if args.solver == 'joint' and args.executor is not None and args.tile_size is None:
+        parser.error('--solver joint solves all targets in one call; --executor needs --tile-size with it')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    start = time.perf_counter()
+    table, labels = load_circles(args.circles, mmap=not args.no_mmap, delimiter=args.delimiter)
+    print('Loaded %d circles from %s in %.2fs' % (len(table), args.circles, time.perf_counter() - start))
+    if not len(table):
+        return 1
+
+    profiler = Profiler() if args.profile else None
+    kwargs = dict(clustering_threshold=args.clustering_threshold, verbose=args.verbose, solver=args.solver,
+                  pair_search=args.pair_search, cluster_backend=args.cluster_backend,
+                  convergence_tol=args.convergence_tol, executor=args.executor, seed=args.seed, records=True,
+                  profiler=profiler, seeding=args.seeding, labels=labels, linear_tol=args.linear_tol)
+
+    start = time.perf_counter()
+    if args.tile_size is not None:
+        lat_results, total_loss, _, _, _ = locate_intersections_tiled(table, tile_size=args.tile_size, **kwargs)
+    else:
+        lat_results, total_loss, _, _, _ = locate_intersections(table, **kwargs)
+    print('Located %d targets in %.2fs, total loss %g' % (len(lat_results), time.perf_counter() - start, total_loss))
+
+    if profiler is not None:
+        for stage, totals in profiler.report()['stages'].items():
+            print('%20s %6d calls %10.3fs' % (stage, totals['calls'], totals['time']))
+
+    if args.out:
+        save_results(args.out, lat_results, len(table), labels=labels, compressed=args.compressed)
+        print('Results written to %s' % (args.out,))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import numpy as np
+
+# The scipy submodules are imported by the backends that use them, when first called,
+# as they take most of the import time of the solver.
+
+# Backends for perform_hcluster. All of them cut a single linkage tree at the clustering threshold:
+# - 'fclusterdata': scipy's fclusterdata. Builds the full condensed distance matrix, O(P^2) memory.
+# - 'mst': euclidean minimum spanning tree, found on the Delaunay triangulation of the points
+#          (which always contains it), or along the line for collinear points, cut at the threshold.
+#          O(P log P).
+# - 'kdtree': connected components of the graph of all point pairs within the threshold,
+#             found with a KD-tree. Linear in the number of such pairs.
+CLUSTER_BACKENDS = ('fclusterdata', 'mst', 'kdtree')
+
+
+def single_linkage_mst(points):
+    """
+    Euclidean minimum spanning tree of the points. Cutting its edges longer than t
+    gives the same clusters as single linkage hierarchical clustering at distance t.
+
+    :param points: (P, 2) array of points
+    :return: i, j, weight: the P-1 (or fewer, for coincident points) tree edges
+    """
+    from scipy import sparse
+    from scipy.sparse.csgraph import minimum_spanning_tree
+    from scipy.spatial import Delaunay, QhullError
+
+    points = np.reshape(np.asarray(points, dtype='float64'), (-1, 2))
+    num_points = len(points)
+
+    try:
+        tri = Delaunay(points)
+        # every edge of every triangle
+        simplices = tri.simplices
+        i = np.concatenate((simplices[:, 0], simplices[:, 1], simplices[:, 2]))
+        j = np.concatenate((simplices[:, 1], simplices[:, 2], simplices[:, 0]))
+        # coincident points are left out of the triangulation; attach them to their nearest vertex
+        i = np.concatenate((i, tri.coplanar[:, 0]))
+        j = np.concatenate((j, tri.coplanar[:, 2]))
+    except (QhullError, ValueError):
+        # Fewer than 3 points, or all points collinear (to Qhull's precision): the tree is the path
+        # through the points in their order along the line, O(P log P) like the triangulation
+        centered = points - np.mean(points, axis=0)
+        _, _, axes = np.linalg.svd(centered, full_matrices=False)
+        order = np.argsort(centered @ axes[0], kind='stable')
+        i, j = order[:-1], order[1:]
+
+    # each interior edge is shared by two triangles; keep it once
+    edge_key = np.unique(np.minimum(i, j).astype(np.int64) * num_points + np.maximum(i, j))
+    i, j = edge_key // num_points, edge_key % num_points
+
+    weight = np.linalg.norm(points[i] - points[j], axis=1)
+    # zero weight edges are dropped by scipy's sparse graphs; keep them with a tiny weight
+    graph = sparse.coo_matrix((np.maximum(weight, np.finfo('float64').tiny), (i, j)),
+                              shape=(num_points, num_points)).tocsr()
+    tree = minimum_spanning_tree(graph).tocoo()
+
+    return tree.row, tree.col, np.linalg.norm(points[tree.row] - points[tree.col], axis=1)
+
+
+def label_components(num_points, i, j):
+    """
+    Connected components of an undirected graph given by its edges.
+
+    :return: num_components, labels enumerated from zero in order of first appearance
+    """
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    graph = sparse.coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(num_points, num_points))
+    return connected_components(graph, directed=False)
+
+
+def perform_hcluster(points, clustering_threshold=0.2, metric='euclidean', backend='fclusterdata'):
+    """
+    Cluster points with single linkage hierarchical clustering, cut at clustering_threshold.
+
+    :param points: column np array of [x; y] containing intersections and circle centers
+    :param clustering_threshold: points closer than this are in the same cluster
+    :param metric: distance metric. Only 'fclusterdata' supports metrics other than 'euclidean'
+    :param backend: one of CLUSTER_BACKENDS
+    :return: num_lat_clusters, enum_clusters, cluster_means
+    """
+    points = np.reshape(np.asarray(points, dtype='float64'), (-1, 2))
+
+    if len(points) == 1:
+        num_lat_clusters = 1
+        enum_clusters = np.array([0,])
+        cluster_means = [np.copy(points[0]),]
+        return num_lat_clusters, enum_clusters, cluster_means
+
+    if backend != 'fclusterdata' and metric != 'euclidean':
+        raise ValueError('Backend %s only supports the euclidean metric' % (backend,))
+
+    if backend == 'fclusterdata':
+        from scipy.cluster import hierarchy as hcluster
+        enum_clusters = hcluster.fclusterdata(points, clustering_threshold, criterion='distance',
+                                              metric=metric)
+        # enumerate the clusters from zero to # clusters-1
+        enum_clusters -= 1
+        num_lat_clusters = np.max(enum_clusters) + 1
+    elif backend == 'mst':
+        i, j, weight = single_linkage_mst(points)
+        keep = weight <= clustering_threshold
+        num_lat_clusters, enum_clusters = label_components(len(points), i[keep], j[keep])
+    elif backend == 'kdtree':
+        from scipy.spatial import cKDTree
+        pairs = cKDTree(points).query_pairs(clustering_threshold, output_type='ndarray')
+        num_lat_clusters, enum_clusters = label_components(len(points), pairs[:, 0], pairs[:, 1])
+    else:
+        raise ValueError('Unknown clustering backend: %s' % (backend,))
+
+    # Calculate the cluster means
+    counts = np.bincount(enum_clusters, minlength=num_lat_clusters)
+    means = np.stack((np.bincount(enum_clusters, weights=points[:, 0], minlength=num_lat_clusters),
+                      np.bincount(enum_clusters, weights=points[:, 1], minlength=num_lat_clusters)), axis=1)
+    cluster_means = list(means / counts[:, None])
+
+    # return the number of clusters and the clusters enumerated from zero
+    return num_lat_clusters, enum_clusters, cluster_means
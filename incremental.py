@@ -0,0 +1,281 @@
+import numpy as np
+
+try:
+    # from same directory
+    from circle_table import CIRCLE_DTYPE, LatResult, table_centers
+    from clustering import label_components, perform_hcluster
+    from multilateration import almost_intersections, assign_circles_to_targets, auto_clustering_threshold, \
+        get_hcluster_points, multiple_multilateration, set_highlights, solve_cluster
+except ModuleNotFoundError:
+    # if it is contained in a project
+    from .circle_table import CIRCLE_DTYPE, LatResult, table_centers
+    from .clustering import label_components, perform_hcluster
+    from .multilateration import almost_intersections, assign_circles_to_targets, auto_clustering_threshold, \
+        get_hcluster_points, multiple_multilateration, set_highlights, solve_cluster
+
+
+class IncrementalLocator:
+    """
+    Multilateration of a set of circles that changes one circle at a time.
+
+    The first solve, and any update that changes the number of hcluster clusters (the targets
+    determine_num_lat_clusters would find), runs multiple_multilateration on all circles. Other
+    updates only intersect the added circle with its neighbours, put it in the cluster of the
+    closest target, and re-solve that one cluster starting from its previous p.
+    """
+
+    def __init__(self, circles_ref=(), xlim=None, ylim=None, clustering_threshold=None, opt_trials=15,
+                 recluster_iters=8, warm_trials=1, solver='slsqp', pair_search='grid', cluster_backend='kdtree',
+                 seed=None, verbose=False):
+        """
+        :param circles_ref: initial circles, list of [(x,y),r,label] as for locate_intersections
+        :param xlim: x borders. If None, the limits of the circles at each full solve
+        :param ylim: y borders. If None, the limits of the circles at each full solve
+        :param clustering_threshold: clustering threshold for hcluster. If None, derived from the average
+                                     radius at each full solve, as locate_intersections does
+        :param opt_trials: optimization re-seeding attempts of full solves
+        :param recluster_iters: reclustering iterations of full solves
+        :param warm_trials: optimization attempts when re-solving one cluster; the first starts at its previous p
+        :param solver: see multiple_multilateration
+        :param pair_search: see multiple_multilateration
+        :param cluster_backend: see multiple_multilateration
+        :param seed: seed for the random starting points. If None, drawn from numpy's global random state
+        :param verbose: verbosity
+        """
+        self.xlim, self.ylim = xlim, ylim
+        self.clustering_threshold = clustering_threshold
+        self.opt_trials = opt_trials
+        self.recluster_iters = recluster_iters
+        self.warm_trials = warm_trials
+        self.solver = solver
+        self.pair_search = pair_search
+        self.cluster_backend = cluster_backend
+        self.seed = np.random.randint(2**31) if seed is None else seed
+        self.verbose = verbose
+
+        # Circle table and the id of each of its rows
+        self.table = np.empty(0, dtype=CIRCLE_DTYPE)
+        self.labels = []
+        self.circle_ids = np.empty(0, dtype=np.int64)
+        self._next_id = 0
+
+        # Results: one LatResult per target, whose members are rows of the circle table
+        self.records = []
+        self.total_loss = 0
+        self.num_full_solves = 0
+        self.num_updates = 0
+
+        # hcluster points, the ids of the circles each comes from (-1 for none), and their hcluster cluster
+        self._threshold = None
+        self._points = np.empty((0, 2))
+        self._point_ids = np.empty((0, 2), dtype=np.int64)
+        self._point_cluster = np.empty(0, dtype=np.int64)
+
+        for circle in circles_ref:
+            self._append(circle)
+        if len(self.table):
+            self.relocate()
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def results(self):
+        """
+        :return: best_fun_vals_list, as returned by locate_intersections
+        """
+        return [lat_result.to_dict(self.table, self.labels) for lat_result in self.records]
+
+    @property
+    def highlight_radius(self):
+        return np.mean(self.table['r']) / 10 if len(self.table) else 0
+
+    def _append(self, circle):
+        # Add a row for circle to the table; return its id
+        (x, y), r = circle[0], circle[1]
+        label = -1
+        if len(circle) >= 3 and circle[2] is not None:
+            label = len(self.labels)
+            self.labels.append(circle[2])
+
+        circle_id = self._next_id
+        self._next_id += 1
+        self.table = np.append(self.table, np.array([(x, y, r, -1, label)], dtype=CIRCLE_DTYPE))
+        self.circle_ids = np.append(self.circle_ids, circle_id)
+        return circle_id
+
+    def relocate(self):
+        """
+        Cluster and multilaterate all circles from scratch, like locate_intersections.
+        """
+        table = self.table
+        self.num_full_solves += 1
+        if self.verbose: print('[IncrementalLocator] full solve of %d circles' % (len(table),))
+
+        if not len(table):
+            self.records, self.total_loss = [], 0
+            self._points, self._point_ids, self._point_cluster = \
+                np.empty((0, 2)), np.empty((0, 2), dtype=np.int64), np.empty(0, dtype=np.int64)
+            return
+
+        self._threshold = self.clustering_threshold
+        if self._threshold is None:
+            self._threshold = float(auto_clustering_threshold(np.mean(table['r'])))
+
+        xlim, ylim = self.xlim, self.ylim
+        if xlim is None or ylim is None:
+            xlim = (np.min(table['x'] - table['r']), np.max(table['x'] + table['r']))
+            ylim = (np.min(table['y'] - table['r']), np.max(table['y'] + table['r']))
+
+        # determine_num_lat_clusters, keeping the points for later updates
+        points, point_circles, circle_point_id_list = get_hcluster_points(table, pair_search=self.pair_search)
+        num_lat_clusters, enum_clusters, cluster_means = \
+            perform_hcluster(points, clustering_threshold=self._threshold, backend=self.cluster_backend)
+        self._points = points
+        self._point_ids = np.where(point_circles >= 0, self.circle_ids[point_circles], -1)
+        self._point_cluster = np.asarray(enum_clusters, dtype=np.int64)
+
+        table['cluster'] = self._point_cluster[circle_point_id_list]
+        self.records, self.total_loss = \
+            multiple_multilateration(table, xlim=xlim, ylim=ylim, num_lat_clusters=num_lat_clusters,
+                                     opt_trials=self.opt_trials, recluster_iters=self.recluster_iters,
+                                     clustering_threshold=self._threshold, highlight_radius=self.highlight_radius,
+                                     verbose=self.verbose, solver=self.solver, pair_search=self.pair_search,
+                                     cluster_backend=self.cluster_backend, seed=self.seed + self.num_full_solves - 1,
+                                     labels=self.labels, records=True, p0_list=cluster_means)
+        for lat_result in self.records:
+            table['cluster'][lat_result.members] = lat_result.index
+
+    def add(self, circle):
+        """
+        Add a circle.
+
+        :param circle: [(x,y),r,label], label optional
+        :return: id of the circle, for remove
+        """
+        circle_id = self._append(circle)
+        if len(self.records) == 0:
+            self.relocate()
+            return circle_id
+
+        # Only the new circle's hcluster points are new: its center, and its (almost-)intersections
+        # with the circles it can touch
+        table = self.table
+        new_row = len(table) - 1
+        x, y, r = table['x'][new_row], table['y'][new_row], table['r'][new_row]
+        others = table[:new_row]
+        d = np.hypot(others['x'] - x, others['y'] - y)
+        touching = np.flatnonzero(d <= 1.1 * (others['r'] + r) * (1 + 1e-9))
+        circles0 = np.stack((others['x'][touching], others['y'][touching], others['r'][touching]), axis=1)
+        circles1 = np.tile((x, y, r), (len(touching), 1))
+        ix0, ix1, intersect = almost_intersections(circles0, circles1)
+
+        new_points = np.concatenate(([[x, y]], ix0[intersect], ix1[intersect]))
+        partner_ids = self.circle_ids[touching[intersect]]
+        new_point_ids = np.concatenate(([[circle_id, -1]],
+                                        np.stack((partner_ids, np.full(len(partner_ids), circle_id)), axis=1),
+                                        np.stack((partner_ids, np.full(len(partner_ids), circle_id)), axis=1)))
+
+        # Single linkage: the new points join the hcluster clusters of the points within the threshold.
+        # Unless the new points and those clusters form as many components as there are such clusters,
+        # a cluster appeared or clusters merged, and the number of targets changes.
+        num_new = len(new_points)
+        near = np.hypot(new_points[:, None, 0] - self._points[None, :, 0],
+                        new_points[:, None, 1] - self._points[None, :, 1]) <= self._threshold
+        near_new, near_point = np.nonzero(near)
+        joined, near_cluster = np.unique(self._point_cluster[near_point], return_inverse=True)
+        new_i, new_j = np.nonzero(np.triu(np.hypot(new_points[:, None, 0] - new_points[None, :, 0],
+                                                   new_points[:, None, 1] - new_points[None, :, 1])
+                                          <= self._threshold, k=1))
+        num_components, component = label_components(num_new + len(joined),
+                                                     np.concatenate((new_i, near_new)),
+                                                     np.concatenate((new_j, num_new + near_cluster)))
+        if num_components != len(joined) or len(np.unique(component[num_new:])) != len(joined):
+            if self.verbose: print('[IncrementalLocator] number of targets changed')
+            self.relocate()
+            return circle_id
+
+        # each component holds one existing cluster, which its new points join
+        component_cluster = np.empty(num_components, dtype=np.int64)
+        component_cluster[component[num_new:]] = joined
+        self._points = np.concatenate((self._points, new_points))
+        self._point_ids = np.concatenate((self._point_ids, new_point_ids))
+        self._point_cluster = np.concatenate((self._point_cluster, component_cluster[component[:num_new]]))
+
+        # Put the circle in the cluster of the closest target and re-solve that cluster
+        targets = np.array([lat_result.p for lat_result in self.records], dtype='float64')
+        (j,), _ = assign_circles_to_targets(np.array([[x, y]]), np.array([r]), targets)
+        table['cluster'][new_row] = j
+        self._resolve(j)
+        return circle_id
+
+    def remove(self, circle_id):
+        """
+        Remove a circle.
+
+        :param circle_id: id returned by add
+        :raises KeyError: if there is no circle circle_id
+        """
+        rows = np.flatnonzero(self.circle_ids == circle_id)
+        if not len(rows):
+            raise KeyError('No circle with id %r' % (circle_id,))
+        (row,) = rows
+        j = self.table['cluster'][row]
+        label = self.table['label'][row]
+        if label >= 0:
+            # drop the reference; label indices of other circles stay valid
+            self.labels[label] = None
+
+        self.table = np.delete(self.table, row)
+        self.circle_ids = np.delete(self.circle_ids, row)
+        if not len(self.table):
+            self.relocate()
+            return
+
+        # Drop the circle's hcluster points. If that empties or splits an hcluster cluster,
+        # the number of targets changes.
+        removed = np.any(self._point_ids == circle_id, axis=1)
+        affected = np.unique(self._point_cluster[removed])
+        self._points = self._points[~removed]
+        self._point_ids = self._point_ids[~removed]
+        self._point_cluster = self._point_cluster[~removed]
+        for cluster in affected.tolist():
+            points = self._points[self._point_cluster == cluster]
+            if not len(points) or perform_hcluster(points, self._threshold, backend=self.cluster_backend)[0] > 1:
+                if self.verbose: print('[IncrementalLocator] number of targets changed')
+                self.relocate()
+                return
+
+        # Rows after the removed one moved up
+        for lat_result in self.records:
+            lat_result.members = np.flatnonzero(self.table['cluster'] == lat_result.index)
+
+        if len(self.records[j].members):
+            self._resolve(j)
+        else:
+            # Its last circle is gone, and so is the target
+            del self.records[j]
+            for lat_result in self.records[j:]:
+                lat_result.index -= 1
+            self.table['cluster'][self.table['cluster'] > j] -= 1
+            self._update_totals()
+
+    def _resolve(self, j):
+        # Multilateration of cluster j only, starting from its previous p
+        self.num_updates += 1
+        members = np.flatnonzero(self.table['cluster'] == j)
+        circle_centers = table_centers(self.table)
+        x_list, r_list = circle_centers[members], self.table['r'][members]
+        xlim = (np.min(x_list[:, 0] - r_list), np.max(x_list[:, 0] + r_list))
+        ylim = (np.min(x_list[:, 1] - r_list), np.max(x_list[:, 1] + r_list))
+
+        p, loss = solve_cluster(x_list, r_list, xlim, ylim, opt_trials=self.warm_trials,
+                                p0_from_hcluster=self.records[j].p, solver=self.solver,
+                                seed=(self.seed, self.num_full_solves, self.num_updates))
+        self.records[j] = LatResult(loss=loss, p=p, members=members, index=j)
+        self._update_totals()
+
+    def _update_totals(self):
+        self.total_loss = sum(lat_result.loss for lat_result in self.records)
+        set_highlights(self.records, table_centers(self.table), np.ascontiguousarray(self.table['r']),
+                       self.highlight_radius)
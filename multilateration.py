@@ -1,21 +1,32 @@
 # https://stackoverflow.com/questions/17009774/quadratic-program-qp-solver-that-only-depends-on-numpy-scipy
 
+import inspect
 import sys
+import time
 import numpy as np
-import scipy
 
-from copy import deepcopy
-from scipy import optimize as opt
-from scipy.cluster import hierarchy as hcluster
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 
+# scipy.optimize and the plotting (matplotlib) are only imported when first used, so that
+# importing this module for solving stays fast and does not need matplotlib.
 try:
     # from same directory
-    from plot_circles import plot_circles
-    from circle_intersection import get_circle_intersections
+    from circle_intersection import get_circle_intersections_batch, SEPERATE, CONTAINED, INTERSECT
+    from spatial_index import all_candidate_pairs, grid_candidate_pairs
+    from clustering import label_components, perform_hcluster, single_linkage_mst
+    from circle_table import LatResult, as_circle_table, circle_table_from_arrays, is_circle_table, table_centers
+    from profiling import NULL_PROFILER
+    from observers import IterationSnapshot
 except ModuleNotFoundError:
     # if it is contained in a project
-    from .plot_circles import plot_circles
-    from .circle_intersection import get_circle_intersections
+    from .circle_intersection import get_circle_intersections_batch, SEPERATE, CONTAINED, INTERSECT
+    from .spatial_index import all_candidate_pairs, grid_candidate_pairs
+    from .clustering import label_components, perform_hcluster, single_linkage_mst
+    from .circle_table import LatResult, as_circle_table, circle_table_from_arrays, is_circle_table, \
+        table_centers
+    from .profiling import NULL_PROFILER
+    from .observers import IterationSnapshot
 
 
 def pair_to_np(pair):
@@ -47,8 +58,9 @@ def opt_func_dec(x_list, r_list, *args):
     :return: loss_func_ord, loss_func, jacobian (gradient)
     """
 
-    x_list_copy = deepcopy(x_list)
-    r_list_copy = deepcopy(r_list)
+    # one contiguous copy of each, rather than a deepcopy of every element
+    x_list_copy = np.array(x_list, dtype='float64')
+    r_list_copy = np.array(r_list, dtype='float64')
 
     def loss_func_ord(p, norm_ord=2):
         l = sum(
@@ -76,114 +88,782 @@ def opt_func_dec(x_list, r_list, *args):
 
     return loss_func_ord, loss_func, jacobian
 
+def opt_func_vec(x_list, r_list, *args):
+    """
+    Vectorized counterpart of opt_func_dec. The circle centers and radii are stored
+    as contiguous (k, 2) and (k,) float64 arrays, so each evaluation is one batched pass
+    over the cluster instead of a python-level sum over single_loss.
 
-def determine_num_lat_clusters(circles, clustering_threshold=0.2):
+    :param x_list: a vector of x's, where x represents [x y]' : a vector of positions
+    :param r_list: a vector of r's, where r represents radius of circle corresponding to position
+    :param *args: lat_id_list and reference back to signal objects, which are unused
+    :return: loss_func_ord, loss_func, jacobian (gradient), loss_and_jacobian (fused)
     """
-    Determine the number of clusters, for which standard multilateration is performed on each
 
-    :param circles: All the circles for multilateration.
-    :param clustering_threshold: Thresold for hcluster
-    :return: num_lat_clusters, enum_clusters, cluster_means, circle_point_id_list
+    centers = np.ascontiguousarray(np.reshape(np.array(x_list, dtype='float64'), (-1, 2)))
+    radii = np.ascontiguousarray(np.reshape(np.array(r_list, dtype='float64'), (-1,)))
+
+    def distances(p):
+        # p-x for every circle, and the euclidean norm of each row
+        diff = p - centers
+        d = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        return diff, d
+
+    def loss_func_ord(p, norm_ord=2):
+        d = np.linalg.norm(p - centers, ord=norm_ord, axis=1)
+        return np.sum(np.abs(d - radii) ** norm_ord)
+
+    def loss_func(p):
+        _, d = distances(p)
+        return np.sum(np.abs(d - radii))
+
+    def jacobian(p):
+        diff, d = distances(p)
+        return (2*(d - radii) / d) @ diff
+
+    def loss_and_jacobian(p):
+        # Shares the distance computation between the loss and its gradient;
+        # suitable for scipy.optimize.minimize(..., jac=True)
+        diff, d = distances(p)
+        residuals = d - radii
+        return np.sum(np.abs(residuals)), (2*residuals / d) @ diff
+
+    return loss_func_ord, loss_func, jacobian, loss_and_jacobian
+
+def multilat_batched(x_list, r_list, p0_list, max_iter=100, xtol=1e-10, ftol=1e-10, same_min_tol=1e-6):
+    """
+    Multi-start multilateration on a single cluster. All starting points are moved at once
+    with vectorized, damped Gauss-Newton (Levenberg-Marquardt) steps instead of one
+    scipy.optimize call per start.
+
+    The starts are first run to the minimum of the squared residuals ||p-x|| - r. The distinct
+    minima are then refined by reweighting each residual by 1/|residual| (IRLS), so that the
+    minimized objective is the same loss_func as the SLSQP path.
+
+    :param x_list: a vector of x's, where x represents [x y]' : a vector of positions
+    :param r_list: a vector of r's, where r represents radius of circle corresponding to position
+    :param p0_list: starting points, array-like of shape (opt_trials, 2)
+    :param max_iter: maximum number of LM iterations per phase
+    :param xtol: relative step size below which a start is considered converged
+    :param ftol: relative loss decrease below which a start is considered converged
+    :param same_min_tol: starts closer than this are treated as the same minimum
+    :return: best p, its loss (as in loss_func from opt_func_vec), number of iterations
+    """
+    centers = np.reshape(np.array(x_list, dtype='float64'), (-1, 2))
+    radii = np.reshape(np.array(r_list, dtype='float64'), (-1,))
+    # floor for the IRLS weights, relative to the size of the circles
+    res_floor = 1e-9 * max(np.max(radii), 1.0)
+
+    def residuals(P):
+        # P: (n, 2). Returns p-x of shape (n, k, 2), distances and residuals of shape (n, k)
+        diff = P[:, None, :] - centers[None, :, :]
+        d = np.sqrt(np.einsum('nki,nki->nk', diff, diff))
+        return diff, d, d - radii
+
+    def loss(res, irls):
+        return np.sum(np.abs(res), axis=1) if irls else np.einsum('nk,nk->n', res, res)
+
+    def lm(P, irls):
+        _, _, res = residuals(P)
+        cost = loss(res, irls)
+        lam = np.full(len(P), 1e-3)
+        active = np.ones(len(P), dtype=bool)
+
+        it = 0
+        for it in range(1, max_iter + 1):
+            idx = np.flatnonzero(active)
+            if idx.size == 0:
+                break
+
+            diff, d, res = residuals(P[idx])
+            # unit vectors from each circle center towards p; zero if p sits on a center
+            J = diff / np.where(d == 0, 1, d)[..., None]
+            w = 1 / np.maximum(np.abs(res), res_floor) if irls else np.ones_like(res)
+            JtWJ = np.einsum('nki,nk,nkj->nij', J, w, J)
+            g = np.einsum('nki,nk->ni', J, w*res)
+
+            # Levenberg damping, scaled to the problem: JtWJ + lam * tr(JtWJ)/2 * I
+            damping = lam[idx] * 0.5 * (JtWJ[:, 0, 0] + JtWJ[:, 1, 1])
+            a = JtWJ[:, 0, 0] + damping
+            b = JtWJ[:, 0, 1]
+            c = JtWJ[:, 1, 1] + damping
+            det = a*c - b*b
+            det = np.where(det > 0, det, np.inf)
+            step = -np.stack(((c*g[:, 0] - b*g[:, 1]) / det, (a*g[:, 1] - b*g[:, 0]) / det), axis=1)
+
+            P_new = P[idx] + step
+            _, _, res_new = residuals(P_new)
+            cost_new = loss(res_new, irls)
+
+            improved = cost_new < cost[idx]
+            stalled = improved & (cost[idx] - cost_new <= ftol * cost[idx])
+            P[idx[improved]] = P_new[improved]
+            cost[idx[improved]] = cost_new[improved]
+            lam[idx] = np.clip(np.where(improved, lam[idx] / 10, lam[idx] * 10), 1e-12, None)
+
+            step_norm = np.linalg.norm(step, axis=1)
+            converged = (step_norm <= xtol * (xtol + np.linalg.norm(P[idx], axis=1))) | stalled | \
+                        (lam[idx] > 1e12) | (cost[idx] <= res_floor)
+            active[idx[converged]] = False
+
+            # Stop once the best start has converged and every start still moving has reached it
+            best_i = np.argmin(cost)
+            moving = np.flatnonzero(active)
+            if not active[best_i] and np.all(np.linalg.norm(P[moving] - P[best_i], axis=1) < same_min_tol):
+                break
+
+        return P, cost, it
+
+    P = np.array(p0_list, dtype='float64').reshape(-1, 2)
+    P, _, it_sq = lm(P, irls=False)
+
+    # Only refine distinct minima
+    P = P[np.unique(np.round(P / same_min_tol), axis=0, return_index=True)[1]]
+    P, cost, it_abs = lm(P, irls=True)
+
+    best_i = np.argmin(cost)
+    return P[best_i], cost[best_i], it_sq + it_abs
+
+
+def multilat_joint(x_list, r_list, clusters, p0s, num_trials=None, xtol=1e-8, ftol=1e-8, l1_scale=1e-4):
+    """
+    Multilateration on many clusters in one optimization. The targets of all clusters are stacked
+    into one parameter vector [x_0, y_0, x_1, y_1, ...] and the residuals ||p_c - x_i|| - r_i of all
+    circles into one residual vector, which scipy.optimize.least_squares solves at once. The residual
+    of a circle only depends on the target of its cluster, so the Jacobian is block sparse: row i has
+    its two entries in the columns of the target of circle i. It is returned as a sparse matrix of
+    that pattern, built once from clusters, and the cost of an iteration is one vectorized pass over
+    the circles, rather than one optimizer call per cluster.
+
+    All starting points are solved together as well, each as a separate target with its own copy of
+    the residuals of its cluster, on the squared residuals. Every cluster keeps its best start, which,
+    as in multilat_batched, is then refined to the minimum of the sum of the absolute residuals
+    (loss_func) with a soft_l1 loss, whose f_scale is lowered to l1_scale times the average radius.
+    The trust region is shared by all targets, so a solve converges quickly if they all start close
+    to a minimum (such as the estimates of linearized_estimates), and slowly from random points.
+
+    :param x_list: (n, 2) array of circle centers
+    :param r_list: (n,) array of circle radii
+    :param clusters: (n,) int array, the cluster of every circle in 0..k-1, or negative for none
+    :param p0s: (k, t, 2) array, t starting points of each of the k clusters
+    :param num_trials: (k,) int array, the number of the starting points of each cluster to use, at most t.
+                       If None, all of them
+    :param xtol: xtol of least_squares
+    :param ftol: ftol of least_squares
+    :param l1_scale: final f_scale of the absolute value refinement, relative to the average radius
+    :return: P, losses, nfev: (k, 2) array of the best target of every cluster, (k,) array of their losses
+             (as loss_func from opt_func_vec; 0 for clusters without circles or trials, whose target stays at their
+             first starting point), and the number of residual evaluations
+    """
+    from scipy import optimize as opt
+    from scipy import sparse
+
+    centers = np.reshape(np.asarray(x_list, dtype='float64'), (-1, 2))
+    radii = np.reshape(np.asarray(r_list, dtype='float64'), (-1,))
+    clusters = np.reshape(np.asarray(clusters, dtype=np.int64), (-1,))
+    p0s = np.asarray(p0s, dtype='float64')
+    num_clusters, max_trials = p0s.shape[:2]
+    num_trials = np.full(num_clusters, max_trials) if num_trials is None else np.asarray(num_trials)
+
+    # The circles of each cluster, as a slice of order
+    order = np.flatnonzero(clusters >= 0)
+    order = order[np.argsort(clusters[order], kind='stable')]
+    counts = np.bincount(clusters[order], minlength=num_clusters)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    num_trials = np.where(counts > 0, num_trials, 0)
+    f_scale = l1_scale * np.mean(radii[order]) if len(order) else 1.0
+
+    def block_rows(block_cluster):
+        # The circle of every residual of targets of block_cluster, and the target of each
+        lengths = counts[block_cluster]
+        block = np.repeat(np.arange(len(block_cluster)), lengths)
+        within = np.arange(len(block)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return order[offsets[block_cluster][block] + within], block
+
+    def least_squares(block_cluster, q0, **kwargs):
+        # Solve one target per entry of block_cluster, on the circles of its cluster, starting at q0.
+        # Returns the targets as (len(block_cluster), 2) array, the loss of each there, and nfev
+        circle, block = block_rows(block_cluster)
+        x, r = centers[circle], radii[circle]
+        m, num_blocks = len(block), len(block_cluster)
+        # Sparsity pattern of the Jacobian, in CSR form: the two columns of the target of each residual
+        indices = np.stack((2*block, 2*block + 1), axis=1).ravel()
+        indptr = np.arange(0, 2*m + 1, 2)
+
+        def distances(q):
+            diff = np.reshape(q, (-1, 2))[block] - x
+            return diff, np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+        def residuals(q):
+            _, d = distances(q)
+            return d - r
+
+        def jacobian(q):
+            # unit vectors from each circle center towards its target; zero if the target sits on the center
+            diff, d = distances(q)
+            unit = diff / np.where(d == 0, 1, d)[:, None]
+            return sparse.csr_matrix((unit.ravel(), indices, indptr), shape=(m, 2*num_blocks))
+
+        solution = opt.least_squares(residuals, np.ravel(q0), jac=jacobian, method='trf', xtol=xtol, ftol=ftol,
+                                     **kwargs)
+        losses = np.bincount(block, weights=np.abs(residuals(solution.x)), minlength=num_blocks)
+        return np.reshape(solution.x, (-1, 2)), losses, solution.nfev
+
+    P = p0s[:, 0].copy()
+    losses = np.zeros(num_clusters)
+    solved = np.flatnonzero(num_trials > 0)
+    if not len(solved):
+        return P, losses, 0
+
+    # Every start of every cluster
+    block_cluster = np.repeat(np.arange(num_clusters), num_trials)
+    trial = np.arange(len(block_cluster)) - np.repeat(np.cumsum(num_trials) - num_trials, num_trials)
+    Q, loss, nfev = least_squares(block_cluster, p0s[block_cluster, trial])
+
+    # The best start of each cluster: the first of its blocks, ordered by cluster then loss
+    best = np.lexsort((loss, block_cluster))[np.cumsum(num_trials[solved]) - num_trials[solved]]
+    P[solved], losses[solved] = Q[best], loss[best]
+
+    for scale in (100*f_scale, 10*f_scale, f_scale):
+        Q, loss, n = least_squares(solved, P[solved], loss='soft_l1', f_scale=scale)
+        better = loss < losses[solved]
+        P[solved[better]], losses[solved[better]] = Q[better], loss[better]
+        nfev += n
+
+    return P, losses, nfev
+
+# Ways for solve_cluster to choose its starting points
+SEEDINGS = ('uniform', 'intersections', 'grid')
+
+def cluster_seeds(x_list, r_list, num_seeds, seeding='intersections', grid_size=32, min_separation=None,
+                  max_pairs=512, block_size=2**20):
+    """
+    Starting points for multilateration of one cluster, best first, found without optimizing:
+    candidates are scored by loss_func (from opt_func_vec) in blocks, and the best ones at least
+    min_separation apart are kept.
+
+    :param x_list: (k, 2) array of circle centers
+    :param r_list: (k,) array of circle radii
+    :param num_seeds: at most this many points are returned
+    :param seeding: 'intersections': the (almost-)intersections of pairs of the cluster's circles, every
+                    pair if there are at most max_pairs of them, otherwise max_pairs pairs spread evenly over
+                    the circles. 'grid': a grid_size x grid_size grid over the box containing the circles
+    :param grid_size: points per side of the grid
+    :param min_separation: minimum distance between returned points. If None, a tenth of the average radius
+    :param max_pairs: most circle pairs of 'intersections', so that, like the grid, scoring costs O(k) per
+                      candidate for O(max_pairs + k) candidates, rather than O(k^3) over all pairs
+    :param block_size: most candidate-circle distances computed at once
+    :return: (m, 2) array of m <= num_seeds points, in order of increasing loss
+    """
+    centers = np.reshape(np.asarray(x_list, dtype='float64'), (-1, 2))
+    radii = np.reshape(np.asarray(r_list, dtype='float64'), (-1,))
+    num_circles = len(centers)
+    if min_separation is None:
+        min_separation = np.mean(radii) / 10
+
+    if seeding == 'intersections':
+        if num_circles * (num_circles - 1) // 2 <= max_pairs:
+            i, j = np.triu_indices(num_circles, k=1)
+        else:
+            # every circle with the next few (cyclically), thinned evenly to max_pairs pairs
+            pairs_per_circle = max(1, max_pairs // num_circles)
+            i = np.repeat(np.arange(num_circles), pairs_per_circle)
+            j = (i + np.tile(np.arange(1, pairs_per_circle + 1), num_circles)) % num_circles
+            keep = np.unique(np.linspace(0, len(i) - 1, max_pairs).astype(np.int64))
+            i, j = i[keep], j[keep]
+        circles = np.column_stack((centers, radii))
+        ix0, ix1, intersect = almost_intersections(circles[i], circles[j])
+        # a point on each circle, for clusters without intersecting pairs
+        candidates = np.concatenate((ix0[intersect], ix1[intersect], centers + radii[:, None] * [1, 0]))
+    elif seeding == 'grid':
+        gx = np.linspace(np.min(centers[:, 0] - radii), np.max(centers[:, 0] + radii), grid_size)
+        gy = np.linspace(np.min(centers[:, 1] - radii), np.max(centers[:, 1] + radii), grid_size)
+        candidates = np.stack(np.meshgrid(gx, gy), axis=-1).reshape(-1, 2)
+    else:
+        raise ValueError('Unknown seeding: %s' % (seeding,))
+
+    loss = np.empty(len(candidates))
+    step = max(1, block_size // num_circles)
+    for start in range(0, len(candidates), step):
+        block = candidates[start:start + step]
+        distances = np.hypot(block[:, 0, None] - centers[None, :, 0], block[:, 1, None] - centers[None, :, 1])
+        loss[start:start + step] = np.sum(np.abs(distances - radii), axis=1)
+    candidates = candidates[np.argsort(loss, kind='stable')]
+
+    # Greedily keep the best candidate, then drop all others within min_separation of it
+    seeds = np.empty((min(num_seeds, len(candidates)), 2))
+    num_kept = 0
+    while num_kept < len(seeds) and len(candidates):
+        seeds[num_kept] = candidates[0]
+        num_kept += 1
+        delta = candidates - seeds[num_kept - 1]
+        candidates = candidates[np.hypot(delta[:, 0], delta[:, 1]) >= min_separation]
+    return seeds[:num_kept]
+
+def linearized_estimates(centers, radii, clusters, num_clusters=None, min_conditioning=1e-6):
+    """
+    Closed-form target estimates of many clusters at once. Subtracting the circle equations
+    ||p - x_i||^2 = r_i^2 of a cluster from their mean leaves the linear system
+    2 (x_i - x_mean) . p = (||x_i||^2 - r_i^2) - mean(||x||^2 - r^2), which is solved in the least
+    squares sense from its 2x2 normal equations, summed per cluster with np.bincount.
+
+    Exact for noiseless circles through one point; with noise, a good starting point.
+
+    :param centers: (n, 2) array of circle centers
+    :param radii: (n,) array of circle radii
+    :param clusters: (n,) int array, the cluster of every circle (negative for none)
+    :param num_clusters: number of clusters. If None, one more than the largest cluster
+    :param min_conditioning: clusters whose circle centers spread less than this in one direction, relative
+                             to the other (smallest over largest eigenvalue of their scatter matrix), are
+                             collinear and get no estimate
+    :return: (num_clusters, 2) array of estimates, NaN for clusters of fewer than three circles or collinear ones
+    """
+    centers = np.reshape(np.asarray(centers, dtype='float64'), (-1, 2))
+    radii = np.reshape(np.asarray(radii, dtype='float64'), (-1,))
+    clusters = np.reshape(np.asarray(clusters), (-1,))
+    if num_clusters is None:
+        num_clusters = int(np.max(clusters, initial=-1)) + 1
+
+    valid = clusters >= 0
+    centers, radii, clusters = centers[valid], radii[valid], clusters[valid]
+
+    def cluster_sum(weights):
+        return np.bincount(clusters, weights=weights, minlength=num_clusters)
+
+    # Work relative to each cluster's mean center, for precision far from the origin
+    counts = np.bincount(clusters, minlength=num_clusters)
+    mean = np.stack((cluster_sum(centers[:, 0]), cluster_sum(centers[:, 1])), axis=1) / np.maximum(counts, 1)[:, None]
+    u = centers - mean[clusters]
+    c = np.einsum('ij,ij->i', u, u) - radii**2
+
+    # Normal equations (sum u u^T) q = 1/2 sum u c, as sum u = 0 within each cluster; p = q + mean
+    sxx, sxy, syy = cluster_sum(u[:, 0]**2), cluster_sum(u[:, 0]*u[:, 1]), cluster_sum(u[:, 1]**2)
+    bx, by = cluster_sum(u[:, 0]*c) / 2, cluster_sum(u[:, 1]*c) / 2
+    det = sxx*syy - sxy**2
+    half_trace = (sxx + syy) / 2
+    min_eig = half_trace - np.sqrt(np.maximum(half_trace**2 - det, 0))
+    max_eig = 2*half_trace - min_eig
+    usable = (counts >= 3) & (min_eig > min_conditioning * max_eig)
+
+    estimates = np.full((num_clusters, 2), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estimates[:, 0] = (syy*bx - sxy*by) / det
+        estimates[:, 1] = (sxx*by - sxy*bx) / det
+    estimates += mean
+    estimates[~usable] = np.nan
+    return estimates
+
+def cluster_starting_points(x_list, r_list, xlim, ylim, opt_trials, p0_from_hcluster, rng, seeding='uniform',
+                            p0_linear=None, linear_tol=None, draw_all=True):
+    """
+    Starting points of the optimizations of solve_cluster on a single cluster.
+
+    :param rng: np.random.Generator to draw random starting points from
+    :param draw_all: Draw the uniform random starting points up front. If False, and there are no other
+                     starting points than p0_from_hcluster, returns None instead, for the caller to draw
+                     them one at a time
+    :return: opt_trials, p0s: the number of optimizations to run (1 if the loss at p0_linear is below
+             linear_tol), and their (opt_trials, 2) starting points or None. See solve_cluster for the rest
+    """
+    if p0_linear is not None and np.all(np.isfinite(p0_linear)):
+        if linear_tol is not None:
+            _, loss_func, _, _ = opt_func_vec(x_list, r_list)
+            if loss_func(p0_linear) < linear_tol:
+                # Already at the minimum, or close to it: no restarts
+                opt_trials, p0_from_hcluster, seeding = 1, None, 'uniform'
+    else:
+        p0_linear = None
+
+    if seeding == 'uniform' and p0_linear is None and not draw_all:
+        return opt_trials, None
+
+    p0s = np.column_stack((rng.uniform(*xlim, size=opt_trials), rng.uniform(*ylim, size=opt_trials)))
+    fixed = [p0 for p0 in (p0_linear, p0_from_hcluster) if p0 is not None][:opt_trials]
+    if seeding != 'uniform':
+        seeds = cluster_seeds(x_list, r_list, opt_trials - len(fixed), seeding=seeding)
+        p0s[len(fixed):len(fixed) + len(seeds)] = seeds
+    if fixed:
+        p0s[:len(fixed)] = fixed
+    return opt_trials, p0s
+
+def solve_cluster(x_list, r_list, xlim, ylim, opt_trials=7, p0_from_hcluster=None, solver='slsqp', seed=None,
+                  return_info=False, seeding='uniform', p0_linear=None, linear_tol=None):
     """
-    def perform_hcluster(points, clustering_threshold=0.2, metric='euclidean'):
-        # points: column np array of [x; y] containing intersections and circle centers
-        # do hcluster.
-        if len(points) == 1:
-            num_lat_clusters = 1
-            enum_clusters = np.array([0,])
-            cluster_means = [np.copy(points[0]),]
-            return num_lat_clusters, enum_clusters, cluster_means
-
-        enum_clusters = hcluster.fclusterdata(points, clustering_threshold, criterion='distance',
-                                              metric=metric)
-        # enumerate the clusters from zero to # clusters-1
-        enum_clusters -= 1
-        num_lat_clusters = np.max(enum_clusters) + 1
-
-        lat_clusters = [[] for _ in range(num_lat_clusters)]
-        for point, point_cluster in zip(points, enum_clusters):
-            lat_clusters[point_cluster].append(point)
-
-        # Calculate the cluster means
-        cluster_means = []
-        for cluster in lat_clusters:
-            mean = np.zeros_like(cluster[0], dtype='float64')
-            for point in cluster:
-                mean += point
-            mean /= len(cluster)
-            cluster_means.append(mean)
-
-        # return the number of clusters and the clusters enumerated from zero
-        return num_lat_clusters, enum_clusters, cluster_means
+    Multilateration on a single cluster: the best of opt_trials optimizations from random
+    starting points. Only takes arrays and plain values, so it can run in a worker process.
+
+    :param x_list: (k, 2) array of circle centers
+    :param r_list: (k,) array of circle radii
+    :param xlim: x borders to draw random starting points from
+    :param ylim: y borders to draw random starting points from
+    :param opt_trials: Optimization re-seeding attempts. More = higher prob. of better result
+    :param p0_from_hcluster: If not None, starting point of the first attempt
+    :param solver: 'slsqp', 'batched' or 'joint', see multiple_multilateration
+    :param seed: seed for np.random.default_rng; the same seed gives the same result
+    :param return_info: Also return a dict of the solve's wall 'time', 'trials', and the 'nfev' and 'nit'
+                        summed over the SLSQP runs ('batched' only reports its LM iterations as nit,
+                        'joint' only nfev)
+    :param seeding: 'uniform' draws the starting points uniformly within xlim and ylim. 'intersections' and
+                    'grid' start from the best points of cluster_seeds instead, after p0_from_hcluster;
+                    random points are only drawn if there are fewer of those than opt_trials
+    :param p0_linear: If not None (or NaN), starting point of the first attempt, before p0_from_hcluster:
+                      the closed-form estimate of linearized_estimates
+    :param linear_tol: If not None, and the loss at p0_linear is below it, only one optimization is
+                       run, starting from p0_linear, instead of opt_trials
+    :return: p, loss, or p, loss, info if return_info
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    opt_trials, p0s = cluster_starting_points(x_list, r_list, xlim, ylim, opt_trials, p0_from_hcluster, rng,
+                                              seeding, p0_linear, linear_tol, draw_all=solver != 'slsqp')
+
+    if solver == 'joint':
+        P, losses, nfev = multilat_joint(x_list, r_list, np.zeros(len(r_list), dtype=np.int64), p0s[None])
+        if return_info:
+            return P[0], losses[0], dict(time=time.perf_counter() - start, trials=opt_trials, nfev=nfev)
+        return P[0], losses[0]
+
+    if solver == 'batched':
+        p, loss, nit = multilat_batched(x_list, r_list, p0s)
+        if return_info:
+            return p, loss, dict(time=time.perf_counter() - start, trials=opt_trials, nit=nit)
+        return p, loss
+
+    from scipy import optimize as opt
+
+    # loss and gradient as separate callables: scipy's wrapper for jac=True costs more than the
+    # shared distance computation of loss_and_jacobian saves
+    _, loss_func, jacobian, _ = opt_func_vec(x_list, r_list)
+
+    min_loss, min_p = sys.maxsize, None
+    nfev, nit = 0, 0
+    for ot in range(opt_trials):
+        # Generate single random initial cluster center
+        # always do so for the initial try
+        if p0s is not None:
+            p0 = p0s[ot]
+        elif p0_from_hcluster is not None and (ot == 0):
+            p0 = p0_from_hcluster
+        else:
+            p0 = np.array([rng.uniform(*xlim), rng.uniform(*ylim)]).T
+
+        # Optimize over this
+        p = opt.minimize(loss_func, p0, jac=jacobian, method='SLSQP', options={'disp': False})
+        nfev += p.nfev
+        nit += p.nit
+        if p.fun < min_loss:
+            min_loss = p.fun
+            min_p = p.x
+
+    if return_info:
+        return min_p, min_loss, dict(time=time.perf_counter() - start, trials=opt_trials, nfev=nfev, nit=nit)
+    return min_p, min_loss
+
+def solve_clusters_joint(args_list):
+    """
+    solve_cluster with solver='joint' on many clusters at once. The starting points of every cluster
+    are chosen as solve_cluster would, from its own seed, and all clusters are solved in one
+    multilat_joint call.
+
+    :param args_list: list of tuples of the positional arguments of solve_cluster, one per cluster
+    :return: list of the results of solve_cluster, in the order of args_list. With return_info, the
+             'time' and 'nfev' of the joint solve are divided evenly among the clusters
+    """
+    start = time.perf_counter()
+    signature = inspect.signature(solve_cluster)
+
+    def starting_points(args):
+        # the arguments of solve_cluster by name, so the two cannot drift apart
+        bound = signature.bind(*args)
+        bound.apply_defaults()
+        kwargs = bound.arguments
+        opt_trials, p0s = cluster_starting_points(
+            kwargs['x_list'], kwargs['r_list'], kwargs['xlim'], kwargs['ylim'], kwargs['opt_trials'],
+            kwargs['p0_from_hcluster'], np.random.default_rng(kwargs['seed']), kwargs['seeding'],
+            kwargs['p0_linear'], kwargs['linear_tol'])
+        return kwargs['x_list'], kwargs['r_list'], opt_trials, p0s, kwargs['return_info']
+
+    clusters = [starting_points(args) for args in args_list]
+    if not clusters:
+        return []
+
+    num_trials = np.array([opt_trials for _, _, opt_trials, _, _ in clusters])
+    # Starting points of all clusters, (k, max trials, 2); num_trials masks the padding
+    p0s = np.zeros((len(clusters), np.max(num_trials), 2))
+    for j, (_, _, opt_trials, cluster_p0s, _) in enumerate(clusters):
+        p0s[j, :opt_trials] = cluster_p0s
+
+    x_list = np.concatenate([np.reshape(x_list, (-1, 2)) for x_list, _, _, _, _ in clusters])
+    r_list = np.concatenate([np.reshape(r_list, (-1,)) for _, r_list, _, _, _ in clusters])
+    circle_cluster = np.repeat(np.arange(len(clusters)), [len(r_list) for _, r_list, _, _, _ in clusters])
+    P, losses, nfev = multilat_joint(x_list, r_list, circle_cluster, p0s, num_trials=num_trials)
+
+    elapsed = time.perf_counter() - start
+    results = []
+    for p, loss, (_, _, opt_trials, _, return_info) in zip(P, losses, clusters):
+        if return_info:
+            results.append((p, loss, dict(time=elapsed / len(clusters), trials=opt_trials, nfev=nfev / len(clusters))))
+        else:
+            results.append((p, loss))
+    return results
+
+@contextmanager
+def cluster_executor(executor):
+    """
+    Executor to solve clusters with.
+
+    :param executor: None to solve clusters one after another in this process, 'thread' or 'process'
+                     for a thread or process pool which is shut down on exit, or any
+                     concurrent.futures.Executor, which is left running.
+    :return: context manager yielding None or an Executor
+    """
+    if executor == 'thread':
+        with ThreadPoolExecutor() as pool:
+            yield pool
+    elif executor == 'process':
+        with ProcessPoolExecutor() as pool:
+            yield pool
+    elif executor is None or isinstance(executor, Executor):
+        yield executor
+    else:
+        raise ValueError('Unknown executor: %s' % (executor,))
+
+def assign_circles_to_targets(centers, radii, targets):
+    """
+    Find the closest and second closest target to every circle, from one (n, k) matrix
+    of residuals | ||p-x|| - r | between all n circles and all k targets.
+
+    :param centers: (n, 2) array of circle centers
+    :param radii: (n,) array of circle radii
+    :param targets: (k, 2) array of target locations p
+    :return: min_lat_cluster, second_min_lat_cluster: (n,) int arrays indexing targets.
+             second_min_lat_cluster is -1 if there is only one target.
+    """
+    centers = np.reshape(np.asarray(centers, dtype='float64'), (-1, 2))
+    radii = np.reshape(np.asarray(radii, dtype='float64'), (-1,))
+    targets = np.reshape(np.asarray(targets, dtype='float64'), (-1, 2))
+
+    diff = centers[:, None, :] - targets[None, :, :]
+    residuals = np.abs(np.sqrt(np.einsum('nki,nki->nk', diff, diff)) - radii[:, None])
+
+    min_lat_cluster = np.argmin(residuals, axis=1)
+    if residuals.shape[1] < 2:
+        return min_lat_cluster, np.full(len(min_lat_cluster), -1)
+
+    residuals[np.arange(len(residuals)), min_lat_cluster] = np.inf
+    second_min_lat_cluster = np.argmin(residuals, axis=1)
+    return min_lat_cluster, second_min_lat_cluster
+
+def almost_intersections(circles0, circles1):
+    """
+    Intersections of circle pairs, including "almost-intersections": pairs which are separate,
+    or one inside the other, are retried with radii scaled by 1.1 and 0.9.
+
+    :param circles0: (m, 3) array of [x, y, r]
+    :param circles1: (m, 3) array of [x, y, r]
+    :return: ix0, ix1, intersect: both (m, 2) intersection points, and whether there are any
+    """
+    # Determine whether the circles actually intersect or not;
+    # if so, return intersection points as 2 column numpy vectors
+    # - In the case of one tangential intersection, return same point
+    #   twice
+    # - In the case of containment, containment's truthfulness determines
+    #   which circle is the larger (containing) one.
+    ix0, ix1, case, containment = get_circle_intersections_batch(circles0, circles1)
+
+    # if case in {'seperate', 'contained', 'coincident'}:
+    # the circles could still be close enough together.
+    # so try increasing/decreasing their radii to see if we
+    # can detect an "almost-intersection".
+    retry = (case == SEPERATE) | (case == CONTAINED)
+    scale0 = np.where(case == SEPERATE, 1.1, np.where(containment[:, 0], 0.9, 1.1))[retry]
+    scale1 = np.where(case == SEPERATE, 1.1, np.where(containment[:, 1], 0.9, 1.1))[retry]
+    # seperate: expand both radii.
+    # contained: reduce the outer (containing) circle's radius,
+    #            expand the inner (contained) circle's radius
+    retry_circles0, retry_circles1 = circles0[retry], circles1[retry]
+    retry_circles0[:, 2] *= scale0
+    retry_circles1[:, 2] *= scale1
+    ix0[retry], ix1[retry], case[retry], _ = get_circle_intersections_batch(retry_circles0, retry_circles1)
+
+    return ix0, ix1, case == INTERSECT
+
+def get_hcluster_points(circles, pair_search='all', intersection_cache=None):
+    """
+    Points to find the clusters in: each circle center, followed by both (almost-)intersections
+    of that circle with every later circle.
+
+    :param circles: All the circles for multilateration, a list or a circle table
+    :param pair_search: 'all' tests every pair of circles for intersections. 'grid' finds the pairs
+                        whose 1.1x expanded discs can touch through a uniform grid instead.
+                        Both give the same hcluster points.
+    :param intersection_cache: None, or a caches.IntersectionCache to reuse the pairs of circles whose radii
+                               did not change since an earlier call with the same centers
+    :return: hcluster_points, point_circles, circle_point_id_list: the (P, 2) points, the (P, 2) indices
+             of the circles each comes from ((i, -1) for the center of circle i), and the indices
+             of the circle centers among the points
+    """
+    # Circles as an (n, 3) array of [x, y, r]
+    table, _ = as_circle_table(circles)
+    circle_array = np.stack((table['x'], table['y'], table['r']), axis=1)
+    num_circles = len(circle_array)
+
+    # Candidate pairs (i, j), i < j, sorted. Pairs further apart than their 1.1x expanded
+    # radii can never produce an (almost-)intersection below, so they are not tested.
+    if pair_search == 'grid':
+        search = grid_candidate_pairs
+    elif pair_search == 'all':
+        search = all_candidate_pairs
+    else:
+        raise ValueError('Unknown pair_search: %s' % (pair_search,))
+
+    if intersection_cache is None:
+        pairs = search(circle_array[:, :2], circle_array[:, 2], expansion=1.1)
+        ix0, ix1, intersect = almost_intersections(circle_array[pairs[:, 0]], circle_array[pairs[:, 1]])
+    else:
+        pairs, ix0, ix1, intersect = intersection_cache.pair_intersections(circle_array, 1.1, search,
+                                                                           almost_intersections)
 
     # Initiallize list of points to be used in hcluster from scikit.
     # They will include circle radii and intersection points between
-    # all pairs of circles.
-    hcluster_points = []
+    # all pairs of circles: each circle center, followed by both intersections
+    # of that circle with every later circle it (almost-)intersects.
+    hcluster_points = np.concatenate((circle_array[:, :2], ix0[intersect], ix1[intersect]))
+    point_circles = np.concatenate((np.stack((np.arange(num_circles), np.full(num_circles, -1)), axis=1),
+                                    pairs[intersect], pairs[intersect]))
+    point_rank = np.concatenate((np.full(num_circles, -1), 2*pairs[intersect, 1], 2*pairs[intersect, 1] + 1))
+    order = np.lexsort((point_rank, point_circles[:, 0]))
 
     # list of indices of the centers of each circle, in the order
     # in which they are appended to hcluster points
-    circle_point_id_list = []
-    point_count = 0
-
-    # iterate over all pairs
-    for i, circle0 in enumerate(circles):
-        c0_origin = circle0[0]
-
-        # get circle origins, and add them to hcluster points
-        hcluster_points.append(c0_origin)
-
-        circle_point_id_list.append(point_count)
-        point_count += 1
-
-        for j, circle1 in enumerate(circles[i+1:], i+1):
-
-            # Determine whether the circles actually intersect or not;
-            # if so, return intersection points as 2 column numpy vectors
-            # - In the case of one tangential intersection, return same point
-            #   twice
-            # - In the case of containment, ix0 and ix1's truthfulness determines
-            #   which circle is the larger (containing) one.
-            ix0, ix1, case = get_circle_intersections(circle0, circle1)
-
-            # if case in {'seperate', 'contained', 'coincident'}:
-            # the circles could still be close enough together.
-            # so try increasing/decreasing their radii to see if we
-            # can detect an "almost-intersection".
-            if case == 'seperate':
-                # seperate: try increasing radii and detecting intersection
-                c0, r0, lat_cluster0, _ = circle0
-                c1, r1, lat_cluster1, _ = circle1
-
-                # expand both radii
-                circle0_expanded = [c0, 1.1 * r0, lat_cluster0, None]
-                circle1_expanded = [c1, 1.1 * r1, lat_cluster1, None]
-                ix0, ix1, case = get_circle_intersections(circle0_expanded, circle1_expanded)
-                if case == 'intersect':
-                    hcluster_points.extend([ix0, ix1])
-                    point_count += 2
-            elif case == 'contained':
-                # seperate: try decreasing radii and detecting intersection
-                c0, r0, lat_cluster0, _ = circle0
-                c1, r1, lat_cluster1, _ = circle1
-
-                # reduce the outer (containing) circle's radius
-                # expand the inner (contained) circle's radius
-                circle0_reduced = [c0, (0.9 if ix0 is True else 1.1) * r0, lat_cluster0, None]
-                circle1_reduced = [c1, (0.9 if ix1 is True else 1.1) * r1, lat_cluster1, None]
-                ix0, ix1, case = get_circle_intersections(circle0_reduced, circle1_reduced)
-                if case == 'intersect':
-                    hcluster_points.extend([ix0, ix1])
-                    point_count += 2
-            elif case == 'intersect':
-                # if they already intersect, great!
-                hcluster_points.extend([ix0, ix1])
-                point_count += 2
-
-    num_lat_clusters, enum_clusters, cluster_means = \
-        perform_hcluster(hcluster_points, clustering_threshold=clustering_threshold)
+    circle_point_id_list = np.flatnonzero(order < num_circles).tolist()
+
+    return hcluster_points[order], point_circles[order], circle_point_id_list
+
+def determine_num_lat_clusters(circles, clustering_threshold=0.2, pair_search='all',
+                               cluster_backend='fclusterdata', profiler=None, intersection_cache=None):
+    """
+    Determine the number of clusters, for which standard multilateration is performed on each
+
+    :param circles: All the circles for multilateration, a list or a circle table
+    :param clustering_threshold: Thresold for hcluster
+    :param pair_search: 'all' tests every pair of circles for intersections. 'grid' finds the pairs
+                        whose 1.1x expanded discs can touch through a uniform grid instead.
+                        Both give the same hcluster points.
+    :param cluster_backend: hcluster implementation, one of clustering.CLUSTER_BACKENDS. All give
+                            the same clusters; 'mst' and 'kdtree' avoid the O(P^2) distance matrix
+    :param profiler: None, or a profiling.Profiler to time the pair intersections and hcluster with
+    :param intersection_cache: None, or a caches.IntersectionCache, see get_hcluster_points
+    :return: num_lat_clusters, enum_clusters, cluster_means, circle_point_id_list
+    """
+    profiler = NULL_PROFILER if profiler is None else profiler
+
+    with profiler.section('pair_intersection'):
+        hcluster_points, _, circle_point_id_list = get_hcluster_points(circles, pair_search=pair_search,
+                                                                       intersection_cache=intersection_cache)
+
+    with profiler.section('hcluster'):
+        num_lat_clusters, enum_clusters, cluster_means = \
+            perform_hcluster(hcluster_points, clustering_threshold=clustering_threshold, backend=cluster_backend)
     return num_lat_clusters, enum_clusters, cluster_means, circle_point_id_list
 
+def search_clustering_threshold(circles, thresholds=None, max_candidates=32, opt_trials=3, residual_floor=None,
+                                pair_search='all', seed=None, intersection_cache=None):
+    """
+    Choose the hcluster clustering threshold by scoring many cut heights of one single linkage
+    tree, instead of re-running the whole pipeline for every threshold. The hcluster points and
+    their euclidean minimum spanning tree are computed once; cutting the tree at a height gives
+    the same clusters as determine_num_lat_clusters with that threshold.
+
+    Each cut is scored by the BIC of its multilateration: every cluster is solved once from its
+    hcluster mean (opt_trials starts), every circle is assigned to its closest target, and
+    score = n log(RSS / (n - 2 k)) + 2 k log(n), with n circles, k targets and RSS the sum of the
+    squared residuals ||p-x|| - r. Lower is better. Cuts with n - 2 k < 1 are not scored; if no cut
+    is left, as with one or two circles, auto_clustering_threshold is returned with a nan score.
+
+    :param circles: All the circles for multilateration, a list or a circle table
+    :param thresholds: Cut heights to try. If None, one inside each gap between the distinct tree edge
+                       lengths from 1/4 to 4 times auto_clustering_threshold, as each gives other clusters
+    :param max_candidates: If thresholds is None, at most this many of them, evenly spread
+    :param opt_trials: Starts per cluster: the hcluster mean, then random points within the cluster's circles
+    :param residual_floor: Residuals below this count as this, so exact data does not reward more targets.
+                           If None, 1e-3 times the average radius
+    :param pair_search: 'all' or 'grid', see get_hcluster_points
+    :param seed: seed for the random starts
+    :param intersection_cache: None, or a caches.IntersectionCache, see get_hcluster_points
+    :return: clustering_threshold, score, candidates: the best threshold and its score, and a list with a dict of
+             threshold, num_lat_clusters, loss (as the total loss of multiple_multilateration) and score per
+             scored cut
+    """
+    table, _ = as_circle_table(circles)
+    circle_centers = table_centers(table)
+    circle_radii = np.ascontiguousarray(table['r'])
+    num_circles = len(table)
+    r_avg = np.mean(circle_radii)
+    if residual_floor is None:
+        residual_floor = 1e-3 * r_avg
+    rng = np.random.default_rng(seed)
+
+    points, _, circle_point_id_list = get_hcluster_points(table, pair_search=pair_search,
+                                                          intersection_cache=intersection_cache)
+    i, j, weight = single_linkage_mst(points)
+
+    auto = float(auto_clustering_threshold(r_avg))
+    if thresholds is None:
+        lo, hi = auto / 4, auto * 4
+        bounds = np.concatenate(([lo], np.unique(weight[(weight > lo) & (weight < hi)]), [hi]))
+        thresholds = (bounds[:-1] + bounds[1:]) / 2
+        if len(thresholds) > max_candidates:
+            thresholds = thresholds[np.unique(np.linspace(0, len(thresholds) - 1, max_candidates).round().astype(int))]
+
+    candidates = []
+    seen = set()
+    # The cuts are nested, so most clusters are the same in consecutive cuts; each is solved once
+    solved = {}
+    for threshold in np.sort(np.asarray(thresholds, dtype='float64')).tolist():
+        keep = weight <= threshold
+        num_lat_clusters, enum_clusters = label_components(len(points), i[keep], j[keep])
+        # the cuts are nested, so cuts with as many clusters are the same
+        if num_lat_clusters in seen:
+            continue
+        seen.add(num_lat_clusters)
+
+        counts = np.bincount(enum_clusters, minlength=num_lat_clusters)
+        targets = np.stack((np.bincount(enum_clusters, weights=points[:, 0], minlength=num_lat_clusters),
+                            np.bincount(enum_clusters, weights=points[:, 1], minlength=num_lat_clusters)),
+                           axis=1) / counts[:, None]
+
+        circle_cluster = enum_clusters[circle_point_id_list[:num_circles]]
+        for k in np.unique(circle_cluster).tolist():
+            members = np.flatnonzero(circle_cluster == k)
+            key = members.tobytes()
+            if key not in solved:
+                x_list, r_list = circle_centers[members], circle_radii[members]
+                p0s = np.column_stack((rng.uniform(np.min(x_list[:, 0] - r_list), np.max(x_list[:, 0] + r_list), opt_trials),
+                                       rng.uniform(np.min(x_list[:, 1] - r_list), np.max(x_list[:, 1] + r_list), opt_trials)))
+                p0s[0] = targets[k]
+                solved[key], _, _ = multilat_batched(x_list, r_list, p0s)
+            targets[k] = solved[key]
+
+        min_lat_cluster, _ = assign_circles_to_targets(circle_centers, circle_radii, targets)
+        residuals = np.abs(np.linalg.norm(circle_centers - targets[min_lat_cluster], axis=1) - circle_radii)
+        # every target spends two of the n residuals' degrees of freedom
+        dof = num_circles - 2 * num_lat_clusters
+        if dof < 1:
+            continue
+        rss = np.sum(np.maximum(residuals, residual_floor)**2)
+        score = num_circles * np.log(rss / dof) + 2 * num_lat_clusters * np.log(num_circles)
+
+        candidates.append({'threshold': threshold, 'num_lat_clusters': int(num_lat_clusters),
+                           'loss': float(np.sum(residuals)), 'score': float(score)})
+
+    if not candidates:
+        # too few circles to score any cut
+        return auto, float('nan'), candidates
+    best = min(candidates, key=lambda candidate: candidate['score'])
+    return best['threshold'], best['score'], candidates
+
 def get_local_lims(circles):
     """
     Get the local limits (borders) for all the circles in the list.
@@ -203,89 +883,167 @@ def get_local_lims(circles):
 
     return (min_x, max_x), (min_y, max_y)
 
+def set_highlights(lat_results, circle_centers, circle_radii, highlight_radius):
+    """
+    Set p_plus of each LatResult: the points to highlight as its target, each with a radius.
+
+    :param lat_results: list of LatResult
+    :param circle_centers: (n, 2) array of the centers of the circles the members index into
+    :param circle_radii: (n,) array of their radii
+    :param highlight_radius: radius for multilateration points
+    """
+    # Detect circle pairs, and if they intersect return both intersections
+    # Format the minlateration p's to include a radius, like how circles are
+    two_circle_members = []
+    two_circle_results = []
+    for lat_result in lat_results:
+        members = lat_result.members
+        # If only one circle in cluster, or all circles share the same center
+        if len(members) >= 1 and np.all(circle_centers[members] == circle_centers[members[0]]):
+            # Set p to be the circle center, and use a similar radius, because nothing more can be said about
+            # which direction the information came from.
+
+            # scale radius of minlat to circle radius
+            r = 0.9*np.average(circle_radii[members])
+            lat_result.p_plus = [[np.copy(circle_centers[members[0]]), r],]
+        # If two circles in cluster: p unless they intersect, see below
+        elif len(members) == 2:
+            lat_result.p_plus = [[lat_result.p, highlight_radius],]
+            two_circle_members.append(members)
+            two_circle_results.append(lat_result)
+        else:
+            lat_result.p_plus = [[lat_result.p, highlight_radius],]
+
+    # Intersect the circles of all two-circle clusters at once
+    if two_circle_results:
+        two_circle_members = np.array(two_circle_members)
+        pair_array = np.concatenate((circle_centers, circle_radii[:, None]), axis=1)
+        ix0, ix1, case, _ = get_circle_intersections_batch(pair_array[two_circle_members[:, 0]],
+                                                           pair_array[two_circle_members[:, 1]])
+        # Convert intersections into list
+        for j in np.flatnonzero(case == INTERSECT):
+            two_circle_results[j].p_plus = [[ix0[j], highlight_radius], [ix1[j], highlight_radius]]
+
 def multiple_multilateration(circles_ref, xlim=(0,10), ylim=(0,10),
                              num_lat_clusters=2, opt_trials=7, recluster_iters=5,
                              clustering_threshold=4.5, highlight_radius=0.2,
-                             plot_circles_on_iter=False, verbose=False):
+                             plot_circles_on_iter=False, verbose=False, solver='slsqp', pair_search='all',
+                             cluster_backend='fclusterdata', convergence_tol=None, executor=None, seed=None,
+                             labels=None, records=False, p0_list=None, warm_start_cache=None,
+                             profiler=None, observers=None, seeding='uniform', linear_tol=None,
+                             intersection_cache=None):
     """
     Perform multilateration, not knowing in advance how many multilateration points there are.
     Uses hcluster to initally seed cluster centers, then a k-means like method to try and find best
     multilat points for each cluster and cluster for each multilat point.
 
-    :param circles_ref: Circles: list of circles in form [x, y], r, _
+    :param circles_ref: Circles: list of circles in form [x, y], r, _, or a circle table (see circle_table)
     :param xlim: x borders
     :param ylim: y borders
-    :param num_lat_clusters: # of lat clusters. If not specified, determined through hcluster
+    :param num_lat_clusters: # of lat clusters. If not specified, determined through hcluster.
+                             If specified, circles start in the clusters given in circles_ref, or, where
+                             these are missing, in the cluster of the closest point of p0_list
     :param opt_trials: Optimization re-seeding attempts. More = higher prob. of better result
     :param recluster_iters: k-means like iterations of reclustering for p
-    :param clustering_threshold: clustering_threshold for hcluster
+    :param clustering_threshold: clustering_threshold for hcluster, or 'search' to choose it with
+                                 search_clustering_threshold
     :param highlight_radius: radius for multilateration point (not used in this, only for plots later)
-    :param plot_circles_on_iter: Generate plots on each iteration or not
+    :param plot_circles_on_iter: Generate plots on each iteration or not. They are rendered in the background
+                                 by a plot_circles.AsyncPlotter, which is waited for before returning
     :param verbose: verbosity
+    :param solver: 'slsqp' for one scipy SLSQP run per seed, 'batched' to move all seeds
+                   of a cluster at once with multilat_batched, or 'joint' to solve all clusters of an
+                   iteration in one sparse least squares problem with multilat_joint (solve_clusters_joint).
+                   'joint' starts from the closed-form estimates of the clusters (see linear_tol) and
+                   cannot use an executor
+    :param pair_search: 'all' or 'grid': how determine_num_lat_clusters finds intersecting circle pairs
+    :param cluster_backend: hcluster implementation used by determine_num_lat_clusters
+    :param convergence_tol: If not None, stop reclustering early after two iterations in a row in which no
+                            circle changed cluster and the total loss improved by less than this. Clusters whose
+                            circles did not change are still re-optimized, but keep their previous result if it
+                            was better, so the loss of such iterations never goes up. Only iterations within
+                            local limits count, as the earlier ones start from elsewhere. The best iteration's
+                            result is returned either way
+    :param executor: How to solve the clusters of an iteration: None one after another, 'thread' or
+                     'process' on a new thread or process pool, or on a given concurrent.futures.Executor.
+                     Must be None with solver='joint'
+    :param seed: Seed for the random starting points. If None, drawn from numpy's global random state
+    :param labels: If circles_ref is a circle table, the list of labels its label column indexes into
+    :param records: Return the clusters as LatResult records, whose circles are indices into the circle
+                    table, instead of dicts with lists of circles
+    :param p0_list: If num_lat_clusters is specified, initial points of the clusters. If None, random
+    :param warm_start_cache: If not None, a caches.WarmStartCache. Clusters found in it are solved with a
+                             single optimization starting from the cached location
+    :param profiler: If not None, a profiling.Profiler recording the time spent in each stage
+    :param observers: Callables, each called with an observers.IterationSnapshot after every recluster
+                      iteration. No snapshots are made without observers
+    :param seeding: Starting points of the optimizations of a cluster, one of SEEDINGS; see solve_cluster
+    :param linear_tol: If not None, clusters of three or more circles whose centers are not collinear start
+                       from their closed-form estimate (linearized_estimates, for all clusters at once). If the
+                       loss there is below linear_tol, the cluster is solved with that one start and no restarts
+    :param intersection_cache: If not None, a caches.IntersectionCache shared between calls. The circle pairs of
+                               the hcluster points, and their intersections, are reused for stations seen before
+                               whose radii did not change
     :return: best_fun_vals_list, best_total_loss
     """
-    circles_copy = deepcopy(circles_ref)
-    num_circles = len(circles_copy)
-    if verbose: print('[multiple_multilateration] circles_copy init:', circles_copy)
-
-    options = {'disp': False}
+    num_circles = len(circles_ref)
+    if verbose: print('[multiple_multilateration] circles_ref init:', circles_ref)
+
+    assert solver in ('slsqp', 'batched', 'joint')
+    assert seeding in SEEDINGS
+    if solver == 'joint' and executor is not None:
+        raise ValueError("solver='joint' solves all clusters in one call and cannot use an executor")
+
+    # Every cluster solve is seeded from (seed, iteration, cluster), so results do not
+    # depend on the executor. Without a seed, draw one from numpy's global random state.
+    if seed is None:
+        seed = np.random.randint(2**31)
+
+    profiler = NULL_PROFILER if profiler is None else profiler
+
+    observers = list(observers or ())
+    plotter = None
+    if plot_circles_on_iter:
+        try:
+            from plot_circles import AsyncPlotter
+        except ModuleNotFoundError:
+            from .plot_circles import AsyncPlotter
+        plotter = AsyncPlotter()
+        observers.append(plotter)
 
     # ------------------- Begin Helper Functions -------------------
 
-    def multilat(circles, use_local_lims=False, p0_from_hcluster=None):
-        # Multilateration on a single cluster
+    def multilat_args(members, use_local_lims=False, p0_from_hcluster=None, seed=None, p0_linear=None):
+        # Arguments of solve_cluster, for multilateration on the circles with indices members
+        x_list = circle_centers[members]
+        r_list = circle_radii[members]
 
-        loss_func_ord, loss_func, grad_j = opt_func_dec(*zip(*circles))
-
-        min_fun_vals = {
-            'loss': sys.maxsize,
-            'p': None,
-            'circles': deepcopy(circles),
-            'index': None
-        }
-
-        # Get coordinate limits of the cluster's data
+        # Get coordinate limits of the cluster's data, as get_local_lims would
         if use_local_lims:
-            cluster_xlim, cluster_ylim = get_local_lims(circles)
+            cluster_xlim = (np.min(x_list[:, 0] - r_list), np.max(x_list[:, 0] + r_list))
+            cluster_ylim = (np.min(x_list[:, 1] - r_list), np.max(x_list[:, 1] + r_list))
         else:
             cluster_xlim, cluster_ylim = xlim, ylim
 
-        for ot in range(opt_trials):
-            # Generate single random initial cluster center
-            # always do so for the initial try
-            if p0_from_hcluster is not None and (ot == 0):
-                p0 = p0_from_hcluster
-            else:
-                p0 = np.array([np.random.uniform(*cluster_xlim), np.random.uniform(*cluster_ylim)]).T
-
-            # Optimize over this
-            p = opt.minimize(loss_func, p0, jac=grad_j, method='SLSQP', options=options)
-            # print(p)
-            # print(p.fun, p.x)
-            if p.fun < min_fun_vals['loss']:
-                min_fun_vals['loss'] = p.fun
-                min_fun_vals['p'] = p.x
-
-        # print(min_fun_vals)
-        return min_fun_vals
-
-    def argmin_p(circle, min_fun_vals):
-        # Finds closest fault to a given circle
-
-        min_val = sys.maxsize
-        second_min_lat_cluster = sys.maxsize
-        min_lat_cluster = None
-        circle_center = circle[0]
-        circle_radius = circle[1]
-        for min_fun_val in min_fun_vals:
-            # p, x, r
-            loss = single_loss(min_fun_val['p'], np.array(circle_center).T, circle_radius)
-            if loss < min_val:
-                min_val = loss
-                second_min_lat_cluster = min_lat_cluster
-                min_lat_cluster = min_fun_val['index']
-
-        return min_lat_cluster, second_min_lat_cluster
+        trials = opt_trials
+        if warm_start_cache is not None:
+            p_cached = warm_start_cache.get(warm_start_cache.fingerprint(x_list, r_list))
+            if p_cached is not None:
+                # a cluster seen before: only refine where it converged then
+                p0_from_hcluster, trials, p0_linear = p_cached, 1, None
+
+        return x_list, r_list, cluster_xlim, cluster_ylim, trials, p0_from_hcluster, solver, seed, profiler.enabled, \
+            seeding, p0_linear, linear_tol
+
+    def multilat_all(pool, args_list):
+        # Solve clusters, on the pool if there is one. Results are in the order of args_list.
+        if solver == 'joint':
+            return solve_clusters_joint(args_list)
+        if pool is None:
+            return [solve_cluster(*args) for args in args_list]
+
+        futures = [pool.submit(solve_cluster, *args) for args in args_list]
+        return [future.result() for future in futures]
 
     def argmax_x(min_fun_val, circles):
         max_val = -sys.maxsize
@@ -304,103 +1062,187 @@ def multiple_multilateration(circles_ref, xlim=(0,10), ylim=(0,10),
 
         return max_delocalized_circle, max_delocalized_circle_index
 
-    def reassign_circle_clusters(circles, min_fun_vals, epsilon=0.25):
-        # Reassign each circle to the fault closest to it
+    def reassign_circle_clusters(min_fun_vals, epsilon=0.25):
+        # Reassign each circle to the fault closest to it, in circle_cluster.
+        # Returns the number of circles which changed cluster.
+
+        targets = np.array([min_fun_val.p for min_fun_val in min_fun_vals], dtype='float64')
+        target_indices = np.array([min_fun_val.index for min_fun_val in min_fun_vals])
+
+        # second_min_lat_cluster unused - might be useful later for prob. epsilon swap
+        min_lat_cluster, _ = assign_circles_to_targets(circle_centers, circle_radii, targets)
+        min_lat_cluster = target_indices[min_lat_cluster]
+
+        num_changed = np.count_nonzero(circle_cluster != min_lat_cluster)
+        circle_cluster[:] = min_lat_cluster
 
-        for i, ((x, y), r, lat_cluster_id, _) in enumerate(circles):
-            # second_min_lat_cluster unused - might be useful later for prob. epsilon swap
-            min_lat_cluster, _ = argmin_p(circles[i], min_fun_vals)
-            circles[i][2] = min_lat_cluster
+        return num_changed
 
-        return +1
+    def cluster_members():
+        # Indices of the circles in each cluster, in increasing order
+        order = np.argsort(circle_cluster, kind='stable')
+        counts = np.bincount(circle_cluster, minlength=num_lat_clusters)
+        return np.split(order, np.cumsum(counts)[:-1])
 
     # ------------------- End Helper Functions -------------------
 
-    # ------------------- Determine initial points if appropriate -------------------
+    # The circle table. circles_ref is never modified; the clusters of the circles are written to
+    # the cluster column of a copy, and clusters are arrays of indices into it.
+    table, labels = as_circle_table(circles_ref, labels)
+    table = table.copy()
+    circle_cluster = table['cluster']
+
+    # Circle centers and radii as read-only arrays, for the vectorized kernels
+    circle_centers = table_centers(table)
+    circle_radii = np.ascontiguousarray(table['r'])
+    circle_centers.flags.writeable = False
+    circle_radii.flags.writeable = False
 
-    # List of initial circle intersection guesses
-    p0_list = None
+    # ------------------- Determine initial points if appropriate -------------------
 
     if num_lat_clusters is None:
-        num_lat_clusters, enum_clusters, cluster_means, circle_point_id_list \
-            = determine_num_lat_clusters(circles_copy, clustering_threshold=clustering_threshold)
+        if clustering_threshold == 'search':
+            with profiler.section('threshold_search'):
+                clustering_threshold, score, _ = search_clustering_threshold(
+                    table, pair_search=pair_search, seed=seed, intersection_cache=intersection_cache)
+            if verbose: print('Clustering threshold search: %g (score %g)' % (clustering_threshold, score))
 
-        # iterate over all points used in hcluster *which are circles*
-        # the indices of such points were returned in circle_point_id_list
-        for circle_i, circle_point_id in zip(range(num_circles), circle_point_id_list):
-            # get the cluster which circle i is in
-            circle_cluster_id = enum_clusters[circle_point_id]
+        num_lat_clusters, enum_clusters, cluster_means, circle_point_id_list \
+            = determine_num_lat_clusters(table, clustering_threshold=clustering_threshold,
+                                         pair_search=pair_search, cluster_backend=cluster_backend, profiler=profiler,
+                                         intersection_cache=intersection_cache)
 
-            # set the init clusters for each circle
-            circles_copy[circle_i][2] = circle_cluster_id
+        # the points used in hcluster *which are circles* are at the indices in circle_point_id_list;
+        # their clusters are the init clusters for each circle
+        circle_cluster[:] = np.asarray(enum_clusters)[circle_point_id_list[:num_circles]]
 
         p0_list = cluster_means
+    else:
+        # List of initial circle intersection guesses
+        if p0_list is None:
+            rng = np.random.default_rng((seed,))
+            p0_list = list(np.column_stack((rng.uniform(*xlim, size=num_lat_clusters),
+                                            rng.uniform(*ylim, size=num_lat_clusters))))
+
+        # circles without a cluster start in the one with the closest initial point
+        unassigned = circle_cluster < 0
+        if np.any(unassigned):
+            circle_cluster[unassigned], _ = assign_circles_to_targets(
+                circle_centers[unassigned], circle_radii[unassigned], np.array(p0_list, dtype='float64'))
 
     # ------------------- End determine initial points if appropriate -------------------
 
     best_total_loss = sys.maxsize
     best_fun_vals_list = None
 
-    min_fun_vals_list = []
-    for i in range(recluster_iters):
-        if verbose: print('--- Iteration %d ---' % (i,))
-        lat_clusters = [[] for _ in range(num_lat_clusters)]
-        for j, ((x, y), r, lat_cluster_id, _) in enumerate(circles_copy):
-            lat_clusters[lat_cluster_id].append(circles_copy[j])
+    # Circle indices of each cluster, total loss of the previous iteration and the number of iterations
+    # in a row that changed nothing, for convergence_tol
+    lat_cluster_members = None
+    prev_total_loss = None
+    stable_iters = 0
+    # From this iteration on, clusters are solved within their local limits
+    local_lims_from = max(2, recluster_iters/4)
 
-        min_fun_vals_list_prev = min_fun_vals_list
+    with cluster_executor(executor) as pool:
         min_fun_vals_list = []
-        for j, lat_cluster in enumerate(lat_clusters):
-            if verbose: print('Cluster # %d:' % (j,), lat_cluster)
-            # Assume all clusters have been assigned some circles at the beginning
-            if not lat_cluster and i > 0:
-                # If no circles in cluster, i.e. the circles were all stolen away
-                # Use the most recent value for p, the lateration cluster centre.
-
-                # TODO: "transfer" empty clusters to other circle centers far away from the rest.
-                # Addendum: I probably won't bother adding this unless it seems like it can
-                # significantly improve performance. I'll leave the argmax_x function
-                # here for now if it seems I will use distant circle transfer in the future.
-                min_fun_vals_list.append(min_fun_vals_list_prev[j])
-                continue
-            elif not lat_cluster and i == 0:
-                # if, on initialization, there was a cluster with no circles assigned to it
-                min_fun_vals = {
-                    'loss': sys.maxsize,    # Essentially infinite loss
-                    'p': p0_list[j],        # Use initial values of p from hierarchical (avg of points)
-                    'circles': [],          # Circles are usually stored in lat_cluster.
-                                            # However, is an empty list so deepcopy(lat_cluster) is [].
-                    'index': j              # Cluster # j
-                }
-                min_fun_vals_list.append(min_fun_vals)
-                continue
-
-            # perform multilateration.
-            # use initial points corresponding to cluster j for the initial try of optimization;
-            # the initial try is only the first iteration of reclustering (i == 0)
-            min_fun_vals = multilat(lat_cluster, use_local_lims=i>=max(2, recluster_iters/4),
-                                    p0_from_hcluster=p0_list[j] if i == 0 else None)
-            min_fun_vals['index'] = j
-            min_fun_vals_list.append(min_fun_vals)
-
-        total_loss = 0
-        for j, min_fun_vals in enumerate(min_fun_vals_list):
-            total_loss += min_fun_vals['loss']
-
-        if total_loss < best_total_loss:
-            best_total_loss = total_loss
-            best_fun_vals_list = deepcopy(min_fun_vals_list)
-
-        if verbose: print('min_fun_vals_list', min_fun_vals_list)
-
-        if plot_circles_on_iter:
-            plot_circles(circles_copy, min_fun_vals_list, xlim=xlim, ylim=ylim,
-                         iteration=i, clear_dir_on_new=False, highlight_radius=highlight_radius)
-
-        reassign_circle_clusters(circles_copy, min_fun_vals_list)
+        for i in range(recluster_iters):
+            if verbose: print('--- Iteration %d ---' % (i,))
+            lat_cluster_members_prev = lat_cluster_members
+            lat_cluster_members = cluster_members()
+            # Before the first iteration within local limits, the later ones may still do better even for the
+            # same clusters, so they do not count towards convergence
+            steady = convergence_tol is not None and i >= local_lims_from
+
+            min_fun_vals_list_prev = min_fun_vals_list
+            min_fun_vals_list = [None] * num_lat_clusters
+            # closed-form estimates of all clusters
+            p0_linear = None
+            if linear_tol is not None or solver == 'joint':
+                p0_linear = linearized_estimates(circle_centers, circle_radii, circle_cluster, num_lat_clusters)
+            # clusters to perform multilateration on, and the solve_cluster arguments for each
+            solve_ids, solve_args = [], []
+            for j, lat_cluster in enumerate(lat_cluster_members):
+                if verbose: print('Cluster # %d:' % (j,), lat_cluster)
+                # Assume all clusters have been assigned some circles at the beginning
+                if not len(lat_cluster) and i > 0:
+                    # If no circles in cluster, i.e. the circles were all stolen away
+                    # Use the most recent value for p, the lateration cluster centre.
+
+                    # TODO: "transfer" empty clusters to other circle centers far away from the rest.
+                    # Addendum: I probably won't bother adding this unless it seems like it can
+                    # significantly improve performance. I'll leave the argmax_x function
+                    # here for now if it seems I will use distant circle transfer in the future.
+                    min_fun_vals_list[j] = min_fun_vals_list_prev[j]
+                    continue
+                elif not len(lat_cluster) and i == 0:
+                    # if, on initialization, there was a cluster with no circles assigned to it
+                    min_fun_vals_list[j] = LatResult(
+                        loss=sys.maxsize,       # Essentially infinite loss
+                        p=p0_list[j],           # Use initial values of p from hierarchical (avg of points)
+                        members=lat_cluster,    # Indices of the cluster's circles, here none
+                        index=j                 # Cluster # j
+                    )
+                    continue
+
+                # perform multilateration.
+                # use initial points corresponding to cluster j for the initial try of optimization;
+                # the initial try is only the first iteration of reclustering (i == 0)
+                solve_ids.append(j)
+                solve_args.append(multilat_args(lat_cluster, use_local_lims=i>=local_lims_from,
+                                                p0_from_hcluster=p0_list[j] if i == 0 else None, seed=(seed, i, j),
+                                                p0_linear=None if p0_linear is None else p0_linear[j]))
+
+            # The clusters are independent, so they can be solved in parallel
+            for j, args, (p, loss, *info) in zip(solve_ids, solve_args, multilat_all(pool, solve_args)):
+                min_fun_vals_list[j] = LatResult(loss=loss, p=p, members=lat_cluster_members[j], index=j)
+                if convergence_tol is not None and i > 0 and min_fun_vals_list_prev[j].loss < loss and \
+                        np.array_equal(lat_cluster_members[j], lat_cluster_members_prev[j]):
+                    # No circle joined or left this cluster, so its previous, better result still holds
+                    min_fun_vals_list[j] = min_fun_vals_list_prev[j]
+                if info:
+                    info = info[0]
+                    profiler.record('multilat', info.pop('time'), iteration=i, cluster=j, **info)
+                if warm_start_cache is not None:
+                    warm_start_cache.put(warm_start_cache.fingerprint(args[0], args[1]), p)
+
+            total_loss = 0
+            for j, min_fun_vals in enumerate(min_fun_vals_list):
+                total_loss += min_fun_vals.loss
+
+            if total_loss < best_total_loss:
+                best_total_loss = total_loss
+                # results are never modified once made, so the list itself is all there is to copy
+                best_fun_vals_list = list(min_fun_vals_list)
+
+            if verbose: print('min_fun_vals_list', min_fun_vals_list)
+
+            if observers:
+                with profiler.section('plot', iteration=i):
+                    snapshot = IterationSnapshot(
+                        iteration=i, circle_centers=circle_centers, circle_radii=circle_radii,
+                        clusters=circle_cluster.copy(),
+                        targets=np.array([min_fun_vals.p for min_fun_vals in min_fun_vals_list], dtype='float64'),
+                        losses=np.array([min_fun_vals.loss for min_fun_vals in min_fun_vals_list], dtype='float64'),
+                        total_loss=total_loss, xlim=xlim, ylim=ylim, highlight_radius=highlight_radius)
+                    for observer in observers:
+                        observer(snapshot)
+
+            with profiler.section('reassign', iteration=i):
+                num_changed = reassign_circle_clusters(min_fun_vals_list)
+            if verbose: print('Circles reassigned: %d' % (num_changed,))
+
+            if steady:
+                if num_changed == 0 and 0 <= prev_total_loss - total_loss < convergence_tol:
+                    stable_iters += 1
+                else:
+                    stable_iters = 0
+                if stable_iters == 2:
+                    if verbose: print('Converged: nothing changed for two iterations')
+                    break
+            prev_total_loss = total_loss
 
     # if verbose:
-    #     print(circles_copy)
+    #     print(circle_cluster)
 
     # --- Does not work well ---
     """
@@ -430,89 +1272,196 @@ def multiple_multilateration(circles_ref, xlim=(0,10), ylim=(0,10),
 
     """
 
+    if plotter is not None:
+        plotter.close()
+
     # In case no good optimized circle intersections was found, just take the last one
     if best_fun_vals_list is None:
         best_fun_vals_list = min_fun_vals_list
 
-    # Detect circle pairs, and if they intersect return both intersections
-    # Format the minlateration p's to include a radius, like how circles are
-    for best_fun_vals in best_fun_vals_list:
-        # If only one circle in cluster, or all circles share the same center
-        circle_centers, circle_radii = [], []
-        for center, r, lat_cluster_id, _ in best_fun_vals['circles']:
-            circle_centers.append(center)
-            circle_radii.append(r)
-        if len(best_fun_vals['circles']) >= 1 and all(np.array_equal(center, circle_centers[0]) for center in circle_centers):
-            # Set p to be the circle center, and use a similar radius, because nothing more can be said about
-            # which direction the information came from.
+    with profiler.section('highlights'):
+        set_highlights(best_fun_vals_list, circle_centers, circle_radii, highlight_radius)
 
-            # scale radius of minlat to circle radius
-            r = 0.9*np.average(circle_radii)
-            best_fun_vals['p+'] = [[circle_centers[0], r],]
-        # If two circles in cluster
-        elif len(best_fun_vals['circles']) == 2:
-            ix0, ix1, case = get_circle_intersections(*best_fun_vals['circles'])
-            # Convert intersections into list
-            if case == 'intersect':
-                best_fun_vals['p+'] = [[ix0, highlight_radius], [ix1, highlight_radius]]
-            else:
-                best_fun_vals['p+'] = [[best_fun_vals['p'], highlight_radius],]
-        else:
-            best_fun_vals['p+'] = [[best_fun_vals['p'], highlight_radius],]
+    if not records:
+        # Dicts with the clusters' circles as lists [center, r, lat_cluster_id, label], as in circles_ref
+        best_fun_vals_list = [best_fun_vals.to_dict(table, labels) for best_fun_vals in best_fun_vals_list]
 
     return best_fun_vals_list, best_total_loss
 
-def locate_intersections(circles_ref, xlim=None, ylim=None, num_lat_clusters=None, clustering_threshold=None,
-                         plot_circles_on_iter=False, verbose=False):
+def auto_clustering_threshold(r_avg):
+    """
+    Clustering threshold for determine_num_lat_clusters derived from the average circle radius.
+
+    :param r_avg: average radius, or an array of average radii of several scenes
+    :return: clustering threshold(s)
+    """
+    K = 34
+    diameter = K
+    ratio_determinant = diameter / (np.multiply(r_avg, 3))
+
+    return np.where(ratio_determinant < 3.95, 4.488449 * (np.divide(r_avg, 3)), 4.488449 * (np.divide(r_avg, 2.5)))
 
-    assert circles_ref
+def prepare_scenes(scenes, xlim=None, ylim=None, clustering_threshold=None, verbose=False, labels=None):
+    """
+    Set up the multiple_multilateration arguments of many scenes at once. All circles are
+    packed into one array so the average radii and limits of all scenes are found together.
+
+    :param scenes: list of circles_ref, see locate_intersections. A scene can also be a circle table,
+                   which is used as it is, without going through lists of circles
+    :param xlim: x-limits shared by all scenes. If None, the limits of each scene's circles
+    :param ylim: y-limits shared by all scenes. If None, the limits of each scene's circles
+    :param clustering_threshold: threshold shared by all scenes. If None, derived per scene. 'search' is
+                                 passed on, for multiple_multilateration to search each scene's threshold
+    :param verbose: verbosity
+    :param labels: list with, for each scene, the labels the label column of its circle table indexes into,
+                   or None. Only used for scenes given as circle tables
+    :return: list of (table, labels, xlim, ylim, clustering_threshold, highlight_radius), one per scene,
+             where table is the scene's circle table and labels the list its label column indexes into
+    """
+    assert all(len(circles_ref) for circles_ref in scenes)
     assert (xlim is not None and ylim is not None) or (xlim is None and ylim is None)
 
-    r_avg = 0
-    circles_np = []
-    for circle in circles_ref:
-        x, y = circle[0]
-        r = circle[1]
-        label = None
-        if len(circle) >= 3:
-            label = circle[2]
+    scene_sizes = np.array([len(circles_ref) for circles_ref in scenes])
+    scene_starts = np.cumsum(scene_sizes) - scene_sizes
+    scene_ids = np.repeat(np.arange(len(scenes)), scene_sizes)
+
+    if any(is_circle_table(circles_ref) for circles_ref in scenes):
+        circle_array = np.concatenate([
+            np.stack((circles_ref['x'], circles_ref['y'], circles_ref['r']), axis=1) if is_circle_table(circles_ref)
+            else np.array([[circle[0][0], circle[0][1], circle[1]] for circle in circles_ref], dtype='float64')
+            for circles_ref in scenes])
+    else:
+        circle_array = np.array([[circle[0][0], circle[0][1], circle[1]]
+                                 for circles_ref in scenes for circle in circles_ref], dtype='float64')
+    x, y, r = circle_array.T
 
-        circles_np.append([pair_to_np([x, y]), r, None, label])
-        r_avg += r
-    r_avg /= len(circles_np)
-    highlight_radius = r_avg / 10
+    # bincount adds up each scene's radii in order, like a running sum would
+    r_avg = np.bincount(scene_ids, weights=r, minlength=len(scenes)) / scene_sizes
+    highlight_radii = (r_avg / 10).tolist()
 
     if xlim is None or ylim is None:
-        xlim, ylim = get_local_lims(circles_np)
-        if verbose: print('[minlateration: locate_intersections] xlim, ylim:', xlim, ylim)
+        xlims = np.stack((np.minimum.reduceat(x - r, scene_starts), np.maximum.reduceat(x + r, scene_starts)), axis=1)
+        ylims = np.stack((np.minimum.reduceat(y - r, scene_starts), np.maximum.reduceat(y + r, scene_starts)), axis=1)
+        xlims = [tuple(lim) for lim in xlims.tolist()]
+        ylims = [tuple(lim) for lim in ylims.tolist()]
+        if verbose: print('[minlateration: prepare_scenes] xlim, ylim:', xlims, ylims)
+    else:
+        xlims, ylims = [xlim] * len(scenes), [ylim] * len(scenes)
 
     if clustering_threshold is None:
-        K = 34
-        diameter = K
-        ratio_determinant = diameter / (r_avg*3)
+        clustering_thresholds = auto_clustering_threshold(r_avg).tolist()
+        if verbose:
+            print('[minlateration: prepare_scenes] auto cluster thresholds: %s r_avg: %s' %
+                  (clustering_thresholds, r_avg))
+    else:
+        clustering_thresholds = [clustering_threshold] * len(scenes)
 
-        if ratio_determinant < 3.95:
-            auto_clustering_threshold = 4.488449 * (r_avg / 3)
-        else:
-            auto_clustering_threshold = 4.488449 * (r_avg / 2.5)
+    prepared = []
+    for k, circles_ref in enumerate(scenes):
+        if is_circle_table(circles_ref):
+            scene_labels = None if labels is None else labels[k]
+            prepared.append((circles_ref, [] if scene_labels is None else scene_labels, xlims[k], ylims[k],
+                             clustering_thresholds[k], highlight_radii[k]))
+            continue
 
-        if verbose:
-            print('[minlateration: locate_intersections] auto cluster threshold: %f ratio_determinant: %f '
-                  'r_avg: %f' % (auto_clustering_threshold, ratio_determinant, r_avg))
+        scene_labels = None
+        if any(len(circle) >= 3 for circle in circles_ref):
+            scene_labels = [circle[2] if len(circle) >= 3 else None for circle in circles_ref]
+
+        start, end = scene_starts[k], scene_starts[k] + scene_sizes[k]
+        table, scene_labels = circle_table_from_arrays(circle_array[start:end, :2], circle_array[start:end, 2],
+                                                       labels=scene_labels)
 
-        clustering_threshold = auto_clustering_threshold
+        prepared.append((table, scene_labels, xlims[k], ylims[k], clustering_thresholds[k], highlight_radii[k]))
 
+    return prepared
+
+def locate_scene(table, labels, xlim, ylim, clustering_threshold, highlight_radius, mm_kwargs):
+    """
+    Solve one scene set up by prepare_scenes. Module level, so scenes can run in worker processes.
+
+    :param mm_kwargs: further keyword arguments of multiple_multilateration
+    :return: best_fun_vals_list, best_total_loss, xlim, ylim, highlight_radius
+    """
     best_fun_vals_list, best_total_loss = \
-        multiple_multilateration(circles_np, xlim=xlim, ylim=ylim, num_lat_clusters=num_lat_clusters,
-                                 opt_trials=15, recluster_iters=8, clustering_threshold=clustering_threshold,
-                                 highlight_radius=highlight_radius, plot_circles_on_iter=plot_circles_on_iter,
-                                 verbose=verbose)
+        multiple_multilateration(table, xlim=xlim, ylim=ylim, opt_trials=15, recluster_iters=8,
+                                 clustering_threshold=clustering_threshold, labels=labels,
+                                 highlight_radius=highlight_radius, **mm_kwargs)
 
-    if verbose: print('Best total loss:', best_total_loss)
+    if mm_kwargs.get('verbose'): print('Best total loss:', best_total_loss)
 
     return best_fun_vals_list, best_total_loss, xlim, ylim, highlight_radius
 
+def locate_intersections(circles_ref, xlim=None, ylim=None, num_lat_clusters=None, clustering_threshold=None,
+                         plot_circles_on_iter=False, verbose=False, solver='slsqp', pair_search='all',
+                         cluster_backend='fclusterdata', convergence_tol=None, executor=None, seed=None,
+                         records=False, warm_start_cache=None, profiler=None, observers=None,
+                         seeding='uniform', labels=None, linear_tol=None, intersection_cache=None):
+
+    assert len(circles_ref)
+
+    with (NULL_PROFILER if profiler is None else profiler).section('prepare'):
+        (scene,) = prepare_scenes([circles_ref], xlim=xlim, ylim=ylim, clustering_threshold=clustering_threshold,
+                                  verbose=verbose, labels=[labels])
+
+    return locate_scene(*scene, dict(num_lat_clusters=num_lat_clusters, plot_circles_on_iter=plot_circles_on_iter,
+                                     verbose=verbose, solver=solver, pair_search=pair_search,
+                                     cluster_backend=cluster_backend, convergence_tol=convergence_tol,
+                                     executor=executor, seed=seed, records=records,
+                                     warm_start_cache=warm_start_cache, profiler=profiler,
+                                     observers=observers, seeding=seeding, linear_tol=linear_tol,
+                                     intersection_cache=intersection_cache))
+
+def locate_intersections_batch(scenes, xlim=None, ylim=None, num_lat_clusters=None, clustering_threshold=None,
+                               verbose=False, solver='slsqp', pair_search='all', cluster_backend='fclusterdata',
+                               convergence_tol=None, executor=None, seed=None, records=False,
+                               warm_start_cache=None, profiler=None, seeding='uniform',
+                               linear_tol=None, intersection_cache=None):
+    """
+    locate_intersections for many independent scenes. The setup of all scenes is done at once,
+    and the scenes can be spread over an executor.
+
+    :param scenes: list of circles_ref, each as for locate_intersections
+    :param executor: How to solve the scenes: None one after another, 'thread' or 'process' on a new
+                     thread or process pool, or on a given concurrent.futures.Executor. Process pools
+                     work on copies of warm_start_cache and intersection_cache, so they neither use
+                     nor fill the caller's, and record nothing in profiler
+    :param seed: Scene k is seeded with seed + k, so it gives the same result as
+                 locate_intersections(scenes[k], seed=seed + k). If None, drawn from numpy's global random state.
+                 Can also be a list of the seed of each scene
+    :return: list of (best_fun_vals_list, best_total_loss, xlim, ylim, highlight_radius), one per scene
+    """
+    if seed is None:
+        seed = np.random.randint(2**31)
+    seeds = [seed + k for k in range(len(scenes))] if np.isscalar(seed) else list(seed)
+    assert len(seeds) == len(scenes)
+
+    with (NULL_PROFILER if profiler is None else profiler).section('prepare'):
+        prepared = prepare_scenes(scenes, xlim=xlim, ylim=ylim, clustering_threshold=clustering_threshold,
+                                  verbose=verbose)
+
+    args_list = []
+    for k, scene in enumerate(prepared):
+        mm_kwargs = dict(num_lat_clusters=num_lat_clusters, verbose=verbose, solver=solver,
+                         pair_search=pair_search, cluster_backend=cluster_backend,
+                         convergence_tol=convergence_tol, seed=seeds[k], records=records,
+                         warm_start_cache=warm_start_cache, intersection_cache=intersection_cache,
+                         profiler=profiler, seeding=seeding, linear_tol=linear_tol)
+        args_list.append(scene + (mm_kwargs,))
+
+    with cluster_executor(executor) as pool:
+        if pool is None:
+            return [locate_scene(*args) for args in args_list]
+
+        futures = [pool.submit(locate_scene, *args) for args in args_list]
+        return [future.result() for future in futures]
+
 if __name__ == '__main__':
+    try:
+        from plot_circles import plot_circles
+    except ModuleNotFoundError:
+        from .plot_circles import plot_circles
+
     xlim = None
     ylim = None
 
@@ -0,0 +1,30 @@
+class IterationSnapshot:
+    """
+    State of multiple_multilateration after the clusters of one recluster iteration are solved,
+    as handed to its observers. Only arrays are kept, so a snapshot is cheap to make and to send
+    to another thread or process.
+
+    circle_centers and circle_radii are the read-only arrays of the solve, shared by all
+    snapshots; clusters is a copy of the cluster of every circle during the iteration.
+    targets and losses hold p and the loss of each cluster.
+    """
+    __slots__ = ('iteration', 'circle_centers', 'circle_radii', 'clusters', 'targets', 'losses', 'total_loss',
+                 'xlim', 'ylim', 'highlight_radius')
+
+    def __init__(self, iteration, circle_centers, circle_radii, clusters, targets, losses, total_loss,
+                 xlim, ylim, highlight_radius):
+        self.iteration = iteration
+        self.circle_centers = circle_centers
+        self.circle_radii = circle_radii
+        self.clusters = clusters
+        self.targets = targets
+        self.losses = losses
+        self.total_loss = total_loss
+        self.xlim = xlim
+        self.ylim = ylim
+        self.highlight_radius = highlight_radius
+
+    def __repr__(self):
+        return 'IterationSnapshot(iteration=%r, targets=%r, total_loss=%r)' % \
+            (self.iteration, self.targets, self.total_loss)
+
@@ -1,6 +1,11 @@
 import os
 import glob
-import matplotlib.pyplot as plt
+import queue
+import threading
+import traceback
+import multiprocessing
+
+# matplotlib is imported when first plotting, not when this module is imported
 
 
 def clear_dir(dir):
@@ -16,6 +21,7 @@ def plot_circles(circles, min_fun_vals, xlim=(0, 10), ylim=(0, 10),
                  savefolder=os.path.join('circles', 'results'), iteration=None,
                  clear_dir_on_new=False, title=None, highlight_radius=0.2,
                  labels=None, mode='single_fault_location'):
+    import matplotlib.pyplot as plt
 
     if clear_dir_on_new:
         clear_dir(savefolder)
@@ -60,4 +66,117 @@ def plot_circles(circles, min_fun_vals, xlim=(0, 10), ylim=(0, 10),
         else:
             title = 'plotcircles iter %d.png' % (iteration,)
 
-    fig.savefig(os.path.join(savefolder, title))
\ No newline at end of file
+    fig.savefig(os.path.join(savefolder, title))
+    plt.close(fig)
+
+
+def render_snapshot(fig, snapshot):
+    """
+    Draw an observers.IterationSnapshot on fig, as plot_circles draws the circles and targets
+    of an iteration. fig is cleared first, so one figure can be reused for every snapshot.
+    """
+    from matplotlib.patches import Circle
+
+    fig.clear()
+    ax = fig.add_subplot()
+    ax.set_xlim(snapshot.xlim)
+    ax.set_ylim(snapshot.ylim)
+    ax.set_xlabel('x coordinate')
+    ax.set_ylabel('y coordinate')
+    for center, r in zip(snapshot.circle_centers.tolist(), snapshot.circle_radii.tolist()):
+        ax.add_artist(Circle(center, r, color='r', fill=False))
+    for p in snapshot.targets.tolist():
+        ax.add_artist(Circle(p, snapshot.highlight_radius, color='blue', fill=False))
+    ax.set_aspect('equal')
+
+def _plot_snapshots(snapshots, savefolder, errors):
+    # Render snapshots from the queue until None arrives, on one headless Agg figure.
+    # A failure is reported on errors, as its traceback, and ends the worker.
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        os.makedirs(savefolder, exist_ok=True)
+        while True:
+            snapshot = snapshots.get()
+            if snapshot is None:
+                break
+            render_snapshot(fig, snapshot)
+            fig.savefig(os.path.join(savefolder, 'plotcircles iter %d.png' % (snapshot.iteration,)))
+    except Exception:
+        errors.put(traceback.format_exc())
+
+
+class AsyncPlotter:
+    """
+    Observer for multiple_multilateration that saves a plot of every iteration snapshot, like
+    plot_circles_on_iter, but renders them in a background thread or process, so the solver
+    does not wait for matplotlib. Renders with the Agg backend on a single reused figure,
+    without pyplot. close() waits until every snapshot so far has been saved.
+
+    If rendering fails (matplotlib missing, savefolder not writable, ...), the worker stops, and
+    the next call or close() raises a RuntimeError with its traceback, rather than waiting for it.
+    """
+
+    def __init__(self, savefolder=os.path.join('circles', 'results'), use_process=False, max_pending=16):
+        """
+        :param savefolder: folder to save the plots to, created if missing
+        :param use_process: render in a separate process instead of a thread
+        :param max_pending: snapshots waiting to be rendered; beyond this, the solver blocks
+        """
+        if use_process:
+            self._snapshots = multiprocessing.Queue(max_pending)
+            self._errors = multiprocessing.Queue()
+            self._worker = multiprocessing.Process(target=_plot_snapshots,
+                                                   args=(self._snapshots, savefolder, self._errors), daemon=True)
+        else:
+            self._snapshots = queue.Queue(max_pending)
+            self._errors = queue.Queue()
+            self._worker = threading.Thread(target=_plot_snapshots, args=(self._snapshots, savefolder, self._errors),
+                                            daemon=True)
+        self._worker.start()
+        self._closed = False
+
+    def _check_worker(self):
+        # Raise if the worker has stopped, with its error if it reported one
+        if self._worker.is_alive():
+            return
+        try:
+            error = self._errors.get(timeout=1)
+        except queue.Empty:
+            error = 'exited without an error'
+        raise RuntimeError('AsyncPlotter worker stopped: %s' % (error,))
+
+    def _put(self, item):
+        # Put on the queue, waiting while it is full only as long as the worker runs
+        while True:
+            self._check_worker()
+            try:
+                self._snapshots.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def __call__(self, snapshot):
+        self._put(snapshot)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._put(None)
+        self._worker.join()
+        # The worker may have failed on one of the last snapshots
+        try:
+            error = self._errors.get_nowait()
+        except queue.Empty:
+            return
+        raise RuntimeError('AsyncPlotter worker stopped: %s' % (error,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
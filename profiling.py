@@ -0,0 +1,121 @@
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+
+# Stages recorded by locate_intersections and multiple_multilateration:
+# - 'prepare': limits, average radius and clustering threshold of the scene
+# - 'pair_intersection': candidate pair search and (almost-)intersections, see get_hcluster_points
+# - 'threshold_search': search_clustering_threshold, with clustering_threshold='search'
+# - 'hcluster': clustering the hcluster points
+# - 'multilat': one solve_cluster call, with its nfev and nit (and trials) as extra fields. With
+#               solver='joint', each cluster's even share of the solve of all clusters of the iteration
+# - 'reassign': reassigning circles to their closest targets, once per recluster iteration
+# - 'plot': making the iteration snapshot and handing it to the observers (such as the plotter),
+#           once per recluster iteration
+# - 'highlights': the p+ points of the best result
+STAGES = ('prepare', 'threshold_search', 'pair_intersection', 'hcluster', 'multilat', 'reassign', 'plot', 'highlights')
+
+# Event fields added up per stage by Profiler.report
+SUMMED_FIELDS = ('time', 'trials', 'nfev', 'nit')
+
+
+class Profiler:
+    """
+    Records the wall time of the stages of a locate_intersections call as events: dicts with
+    'stage', 'iteration' (the recluster iteration, or None outside the recluster loop) and
+    'time' in seconds, plus stage specific fields such as the 'nfev' and 'nit' of 'multilat'.
+
+    Pass one as profiler= to locate_intersections or multiple_multilateration. Events can be
+    read from events, summarized with report(), or handed to a callback as they happen. A
+    profiler can be shared between threads; a process pool works on copies, so events recorded
+    there are lost, except for the 'multilat' solves, which are timed in the worker.
+    """
+    enabled = True
+
+    def __init__(self, callback=None, clock=time.perf_counter):
+        """
+        :param callback: if not None, called with every event as it is recorded
+        :param clock: time source, in seconds
+        """
+        self.callback = callback
+        self.clock = clock
+        self.events = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def section(self, stage, iteration=None):
+        """
+        Context manager recording the wall time of its body as an event of stage.
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(stage, self.clock() - start, iteration=iteration)
+
+    def record(self, stage, elapsed, iteration=None, **info):
+        """
+        Record an event of stage which took elapsed seconds. info holds further fields of the event.
+        """
+        event = dict(stage=stage, iteration=iteration, time=elapsed, **info)
+        with self._lock:
+            self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def report(self):
+        """
+        :return: {'stages': {stage: {'calls', and the sums of the SUMMED_FIELDS its events have}},
+                  'iterations': [{stage: time} for each recluster iteration]}
+        """
+        with self._lock:
+            events = list(self.events)
+
+        stages = {}
+        iterations = []
+        for event in events:
+            summary = stages.setdefault(event['stage'], {'calls': 0, 'time': 0.0})
+            summary['calls'] += 1
+            for field in SUMMED_FIELDS:
+                if field in event:
+                    summary[field] = summary.get(field, 0) + event[field]
+
+            iteration = event['iteration']
+            if iteration is not None:
+                while len(iterations) <= iteration:
+                    iterations.append({})
+                iterations[iteration][event['stage']] = iterations[iteration].get(event['stage'], 0.0) + event['time']
+
+        return {'stages': stages, 'iterations': iterations}
+
+    def reset(self):
+        with self._lock:
+            self.events = []
+
+
+class NullProfiler:
+    """
+    Profiler that records nothing, used when no profiler is given. section returns one shared
+    do-nothing context manager, so disabled instrumentation costs an attribute lookup and a call.
+    """
+    enabled = False
+    _null_section = nullcontext()
+
+    def section(self, stage, iteration=None):
+        return self._null_section
+
+    def record(self, stage, elapsed, iteration=None, **info):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
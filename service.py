@@ -0,0 +1,253 @@
+import asyncio
+import functools
+import os
+import time
+import numpy as np
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    # from same directory
+    from multilateration import locate_intersections_batch
+except ModuleNotFoundError:
+    # if it is contained in a project
+    from .multilateration import locate_intersections_batch
+
+
+class BatchingLocator:
+    """
+    asyncio front-end of locate_intersections for many small concurrent requests.
+
+    result = await locator.locate(circles_ref) queues a request. Requests are collected into a
+    batch until max_batch_size are queued, or max_wait seconds after the first, and each batch is
+    solved by one locate_intersections_batch call on the worker pool, which prepares all its scenes
+    at once. Every caller gets the (best_fun_vals_list, best_total_loss, xlim, ylim, highlight_radius)
+    tuple of its own scene. Up to max_pending_batches batches are solved at a time; requests arriving
+    meanwhile wait in the queue, so batches grow with the load.
+
+    If a batch fails, its requests are solved one at a time, so that only the failing ones get the
+    exception. metrics() reports the queue depth and batch sizes.
+
+    Use as `async with BatchingLocator(...) as locator:`, or call close() when done.
+    """
+
+    def __init__(self, max_batch_size=16, max_wait=0.005, executor='thread', max_pending_batches=None, seed=None,
+                 clock=time.perf_counter, **kwargs):
+        """
+        :param max_batch_size: largest number of requests solved in one batch
+        :param max_wait: seconds to wait for more requests after the first of a batch arrives
+        :param executor: 'thread' or 'process' for a new thread or process pool, which is shut down on close,
+                         or a concurrent.futures.Executor, which is left running
+        :param max_pending_batches: batches solved at a time. If None, the number of CPUs
+        :param seed: If not None, request n (counted from 0 in order of arrival) is seeded with seed + n, so
+                     it gives the same result as locate_intersections(circles_ref, seed=seed + n), however it
+                     is batched. If None, every request draws a seed from numpy's global random state
+        :param clock: time source, in seconds, for the metrics
+        :param kwargs: further arguments of locate_intersections_batch, the same for all requests, such as
+                       solver, pair_search or records
+        """
+        if executor not in ('thread', 'process') and not isinstance(executor, Executor):
+            raise ValueError('Unknown executor: %s' % (executor,))
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self.max_pending_batches = max_pending_batches or os.cpu_count() or 1
+        self.seed = seed
+        self.clock = clock
+        self.kwargs = kwargs
+
+        self.num_requests = 0
+        self.num_batches = 0
+        self.num_failed = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = {}
+        self.total_wait = 0.0
+        self.total_solve_time = 0.0
+
+        self._queue = None
+        self._slots = None
+        self._pool = None
+        self._task = None
+        self._pending = set()
+        self._closed = False
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def start(self):
+        """
+        Start collecting requests, on the running event loop. Called by the first locate.
+        """
+        if self._closed:
+            raise RuntimeError('BatchingLocator is closed')
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_pending_batches)
+        if self.executor == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=self.max_pending_batches)
+        elif self.executor == 'process':
+            self._pool = ProcessPoolExecutor(max_workers=self.max_pending_batches)
+        else:
+            self._pool = self.executor
+        self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def close(self):
+        """
+        Solve the requests already queued, wait for them, and stop. Shuts down the pool if it was made here.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        if self._pending:
+            await asyncio.gather(*self._pending)
+        if self._pool is not self.executor:
+            self._pool.shutdown()
+
+    async def locate(self, circles_ref, seed=None):
+        """
+        Locate the targets of one scene.
+
+        :param circles_ref: circles, as for locate_intersections
+        :param seed: seed of this request. If None, see seed of __init__
+        :return: best_fun_vals_list, best_total_loss, xlim, ylim, highlight_radius, as from locate_intersections
+        """
+        if self._task is None:
+            self.start()
+        if self._closed:
+            raise RuntimeError('BatchingLocator is closed')
+
+        if seed is None:
+            seed = np.random.randint(2**31) if self.seed is None else self.seed + self.num_requests
+        self.num_requests += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((circles_ref, seed, future, self.clock()))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    def metrics(self):
+        """
+        :return: dict of queue_depth (requests waiting for a batch), pending_batches (being solved),
+                 requests, batches, failed (requests which raised), max_queue_depth, batch_sizes
+                 ({size: number of batches}), mean_batch_size, mean_wait (seconds from a request to the
+                 solve of its batch) and mean_solve_time (seconds per batch)
+        """
+        solved = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'pending_batches': len(self._pending),
+            'requests': self.num_requests,
+            'batches': self.num_batches,
+            'failed': self.num_failed,
+            'max_queue_depth': self.max_queue_depth,
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            'mean_batch_size': solved / self.num_batches if self.num_batches else 0.0,
+            'mean_wait': self.total_wait / solved if solved else 0.0,
+            'mean_solve_time': self.total_solve_time / self.num_batches if self.num_batches else 0.0
+        }
+
+    async def _collect(self):
+        # Form batches from the queue until the None put by close
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            # Wait for a free slot first, so that requests queue up while all batches are being solved
+            await self._slots.acquire()
+            request = await self._queue.get()
+            if request is None:
+                self._slots.release()
+                break
+
+            batch = [request]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    request = self._queue.get_nowait()
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+
+            task = loop.create_task(self._solve(batch))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _solve(self, batch):
+        # Solve a batch on the pool and resolve the future of each of its requests
+        loop = asyncio.get_running_loop()
+        start = self.clock()
+        self.total_wait += sum(start - queued for _, _, _, queued in batch)
+        try:
+            scenes = [circles_ref for circles_ref, _, _, _ in batch]
+            seeds = [seed for _, seed, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self._pool, functools.partial(locate_intersections_batch, scenes, seed=seeds, **self.kwargs))
+            except Exception as e:
+                if len(batch) == 1:
+                    results = [e]
+                else:
+                    # Find the failing requests: solve every request on its own
+                    results = await asyncio.gather(*(loop.run_in_executor(
+                        self._pool, functools.partial(locate_intersections_batch, [circles_ref], seed=[seed],
+                                                      **self.kwargs))
+                        for circles_ref, seed, _, _ in batch), return_exceptions=True)
+                    results = [result if isinstance(result, Exception) else result[0] for result in results]
+
+            for (_, _, future, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self.num_failed += 1
+                    if not future.done():
+                        future.set_exception(result)
+                elif not future.done():
+                    future.set_result(result)
+        finally:
+            self.num_batches += 1
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            self.total_solve_time += self.clock() - start
+            self._slots.release()
+
+
+async def generate_load(locator, scenes, rate=None, seed=0, clock=time.perf_counter):
+    """
+    In-process load generator: sends every scene as a concurrent request to locator.locate.
+
+    :param locator: a BatchingLocator, or any object with an async locate(circles_ref)
+    :param scenes: list of circles_ref, one per request, sent in this order
+    :param rate: mean requests per second, with exponentially distributed gaps between them (a Poisson
+                 process). If None, all requests are sent at once
+    :param seed: seed of the gaps
+    :param clock: time source, in seconds
+    :return: results, latencies, elapsed: the result of each request (in the order of scenes; the exception
+             for failed ones), the (n,) array of the seconds from sending each request to its result, and the
+             seconds from the first request to the last result
+    """
+    rng = np.random.default_rng(seed)
+    delays = np.zeros(len(scenes)) if rate is None else np.cumsum(rng.exponential(1 / rate, size=len(scenes)))
+    latencies = np.zeros(len(scenes))
+    start = clock()
+
+    async def request(k):
+        await asyncio.sleep(max(start + delays[k] - clock(), 0))
+        sent = clock()
+        try:
+            return await locator.locate(scenes[k])
+        finally:
+            latencies[k] = clock() - sent
+
+    results = await asyncio.gather(*(request(k) for k in range(len(scenes))), return_exceptions=True)
+    return results, latencies, clock() - start
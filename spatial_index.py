@@ -0,0 +1,121 @@
+import numpy as np
+
+
+def grid_candidate_pairs(centers, radii, expansion=1.0, cell_size=None, max_cells=16):
+    """
+    Find all pairs of circles whose discs, with radii scaled by expansion, can touch.
+    Each circle's bounding box is put into every cell of a uniform grid it covers; only
+    circles sharing a cell are compared, so the cost grows roughly linearly for sparse scenes.
+    Circles covering more than max_cells cells, much larger than the cells, are compared with
+    every circle instead, so a few large circles cannot blow up the grid.
+
+    :param centers: (n, 2) array of circle centers
+    :param radii: (n,) array of circle radii
+    :param expansion: factor applied to every radius before testing
+    :param cell_size: side of a grid cell. If None, twice the median expanded radius
+    :param max_cells: most grid cells of one circle's bounding box
+    :return: (m, 2) int array of pairs (i, j) with i < j, sorted by i then j
+    """
+    centers = np.reshape(np.asarray(centers, dtype='float64'), (-1, 2))
+    reach = expansion * np.reshape(np.asarray(radii, dtype='float64'), (-1,))
+    n = len(centers)
+    if n < 2:
+        return np.empty((0, 2), dtype=np.intp)
+
+    if cell_size is None:
+        cell_size = 2 * np.median(reach)
+        if not cell_size > 0:
+            cell_size = max(np.max(reach), 1.0)
+
+    # range of grid cells covered by each circle's bounding box, in floats until the large circles are out
+    origin = np.min(centers - reach[:, None], axis=0)
+    lo = np.floor((centers - reach[:, None] - origin) / cell_size)
+    hi = np.floor((centers + reach[:, None] - origin) / cell_size)
+    span = hi - lo + 1
+    large = span[:, 0] * span[:, 1] > max_cells
+
+    small = np.flatnonzero(~large)
+    lo, hi, span = lo[small].astype(np.int64), hi[small].astype(np.int64), span[small].astype(np.int64)
+    cells_per_circle = span[:, 0] * span[:, 1]
+
+    # one entry per (circle, covered cell)
+    entry_circle = np.repeat(np.arange(len(small)), cells_per_circle)
+    local = np.arange(len(entry_circle)) - np.repeat(np.cumsum(cells_per_circle) - cells_per_circle,
+                                                     cells_per_circle)
+    cell_x = lo[entry_circle, 0] + local % span[entry_circle, 0]
+    cell_y = lo[entry_circle, 1] + local // span[entry_circle, 0]
+    cell_key = cell_x * (np.max(hi[:, 1], initial=0) + 1) + cell_y
+
+    order = np.argsort(cell_key, kind='stable')
+    entry_circle = small[entry_circle[order]]
+    cell_key = cell_key[order]
+
+    # position of each entry within its cell, and the size of its cell
+    cell_start = np.flatnonzero(np.r_[True, cell_key[1:] != cell_key[:-1]]) if len(cell_key) else \
+        np.empty(0, dtype=np.int64)
+    cell_len = np.diff(np.r_[cell_start, len(cell_key)])
+    pos_in_cell = np.arange(len(cell_key)) - np.repeat(cell_start, cell_len)
+
+    # pair every entry with the entries after it in the same cell
+    num_after = np.repeat(cell_len, cell_len) - 1 - pos_in_cell
+    first = np.repeat(np.arange(len(cell_key)), num_after)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(num_after) - num_after, num_after)
+
+    i = entry_circle[first]
+    j = entry_circle[second]
+
+    # every large circle against all circles, in blocks as all_candidate_pairs does
+    large = np.flatnonzero(large)
+    large_i, large_j = [i], [j]
+    block_size = max(1, 2**20 // n)
+    for start in range(0, len(large), block_size):
+        rows = large[start:start + block_size]
+        delta = centers[rows, None, :] - centers[None, :, :]
+        d = np.sqrt(delta[..., 0]*delta[..., 0] + delta[..., 1]*delta[..., 1])
+        row, col = np.nonzero(d <= (reach[rows, None] + reach[None, :]) * (1 + 1e-9))
+        large_i.append(rows[row])
+        large_j.append(col)
+    i, j = np.concatenate(large_i), np.concatenate(large_j)
+
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    # circles spanning several cells are found once per shared cell, and pairs of large circles twice
+    pair_key = np.unique(i[i != j] * n + j[i != j])
+    i, j = pair_key // n, pair_key % n
+
+    # bounding boxes overlapping is necessary, not sufficient: keep discs that touch.
+    # The small slack keeps this a superset of what get_circle_intersections accepts.
+    delta = centers[i] - centers[j]
+    d = np.sqrt(delta[:, 0]*delta[:, 0] + delta[:, 1]*delta[:, 1])
+    touching = d <= (reach[i] + reach[j]) * (1 + 1e-9)
+
+    return np.stack((i[touching], j[touching]), axis=1)
+
+
+def all_candidate_pairs(centers, radii, expansion=1.0, block_size=1024):
+    """
+    Brute-force counterpart of grid_candidate_pairs: every pair of circles is tested.
+    Rows are processed in blocks so memory stays bounded by block_size * n.
+
+    :param centers: (n, 2) array of circle centers
+    :param radii: (n,) array of circle radii
+    :param expansion: factor applied to every radius before testing
+    :param block_size: number of circles compared against all later circles at once
+    :return: (m, 2) int array of pairs (i, j) with i < j, sorted by i then j
+    """
+    centers = np.reshape(np.asarray(centers, dtype='float64'), (-1, 2))
+    reach = expansion * np.reshape(np.asarray(radii, dtype='float64'), (-1,))
+    n = len(centers)
+
+    pairs = [np.empty((0, 2), dtype=np.intp)]
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(start + block_size, n))
+        cols = np.arange(start, n)
+        delta = centers[rows, None, :] - centers[None, cols, :]
+        d = np.sqrt(delta[..., 0]*delta[..., 0] + delta[..., 1]*delta[..., 1])
+        # only keep j > i
+        touching = (d <= (reach[rows, None] + reach[None, cols]) * (1 + 1e-9)) & \
+                   (rows[:, None] < cols[None, :])
+        i, j = np.nonzero(touching)
+        pairs.append(np.stack((rows[i], cols[j]), axis=1))
+
+    return np.concatenate(pairs)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules are flat files in the repository root, and the seeded scenes are in benchmarks
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
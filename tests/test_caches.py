@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from bench_intersection_cache import make_snapshots
+from caches import IntersectionCache
+from multilateration import get_hcluster_points, locate_intersections
+from scenes import make_scene
+
+
+@pytest.mark.parametrize('pair_search', ['all', 'grid'])
+def test_intersection_cache_matches_uncached_points(pair_search):
+    snapshots = make_snapshots(300, 5, 0.1, np.random.default_rng(0))
+    cache = IntersectionCache()
+    for table in snapshots:
+        points, labels, lines = get_hcluster_points(table, pair_search=pair_search)
+        cached_points, cached_labels, cached_lines = get_hcluster_points(
+            table, pair_search=pair_search, intersection_cache=cache)
+        assert np.array_equal(points, cached_points)
+        assert np.array_equal(labels, cached_labels)
+        assert lines == cached_lines
+    stats = cache.stats()
+    assert stats['size'] == 1
+    assert stats['hits'] > 0 and 0 < stats['hit_rate'] < 1
+
+
+def test_intersection_cache_keys_on_centers_and_evicts():
+    snapshots = [make_snapshots(50, 1, 0.0, np.random.default_rng(seed))[0] for seed in range(3)]
+    cache = IntersectionCache(max_size=2)
+    for table in snapshots:
+        get_hcluster_points(table, intersection_cache=cache)
+    assert len(cache) == 2
+    assert cache.stats()['evictions'] == 1
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_locate_intersections_with_intersection_cache():
+    circles_ref, _, _ = make_scene(8, 3, seed=0)
+    kwargs = dict(solver='batched', pair_search='grid', seed=0)
+    _, total_loss, _, _, _ = locate_intersections(circles_ref, **kwargs)
+    cache = IntersectionCache()
+    for _ in range(2):
+        _, cached_total_loss, _, _, _ = locate_intersections(circles_ref, intersection_cache=cache, **kwargs)
+        assert cached_total_loss == total_loss
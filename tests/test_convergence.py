@@ -0,0 +1,26 @@
+from multilateration import locate_intersections
+
+# the 14-circle example of multilateration.py
+CIRCLES_REF = [
+    [[6, 27], 3], [[3, 25], 2], [[0, 30], 4],
+    [[27, 27], 3], [[26, 27], 2.15], [[24, 30], 4], [[22, 22], 4],
+    [[28, 4], 1.5], [[26, 3], 2], [[25.77, 6.8], 2.7],
+    [[3, 3], 1.5], [[4.5, 3.5], 2],
+    [[19, 11], 1.5], [[20, 14], 2],
+]
+
+
+def test_convergence_tol_returns_the_best_iteration():
+    total_losses = []
+    _, best_total_loss, _, _, _ = locate_intersections(
+        CIRCLES_REF, solver='batched', convergence_tol=1e-6, seed=0,
+        observers=[lambda snapshot: total_losses.append(snapshot.total_loss)])
+    # does not stop before two iterations within local limits
+    assert len(total_losses) >= 4
+    assert best_total_loss == min(total_losses)
+
+
+def test_convergence_tol_does_not_stop_on_the_first_iteration_without_improvement():
+    _, loss, _, _, _ = locate_intersections(CIRCLES_REF, seed=0)
+    _, converged_loss, _, _, _ = locate_intersections(CIRCLES_REF, convergence_tol=1e-6, seed=0)
+    assert converged_loss <= loss
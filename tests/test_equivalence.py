@@ -0,0 +1,145 @@
+"""
+Results that must not depend on how they are computed: executors, loss engines, candidate pair
+searches, clustering backends, batching of scenes and clusters, and the record format.
+"""
+import numpy as np
+import pytest
+
+from circle_table import as_circle_table
+from clustering import perform_hcluster
+from multilateration import get_hcluster_points, locate_intersections, locate_intersections_batch, opt_func_dec, \
+    opt_func_vec, solve_cluster, solve_clusters_joint
+from scenes import make_scene
+
+KWARGS = dict(solver='batched', pair_search='grid', cluster_backend='kdtree', convergence_tol=1e-6)
+
+
+def scene(seed=0, num_targets=4, stations_per_target=3, noise=0.02):
+    circles_ref, _, _ = make_scene(num_targets, stations_per_target, noise=noise, seed=seed)
+    return circles_ref
+
+
+def assert_same_records(results, expected):
+    assert len(results) == len(expected)
+    for result, other in zip(results, expected):
+        assert result.loss == other.loss
+        assert np.array_equal(result.p, other.p)
+        assert np.array_equal(result.members, other.members)
+        assert result.index == other.index
+
+
+def same_partition(labels, other):
+    # The same clusters, up to their numbering
+    labels, other = np.asarray(labels), np.asarray(other)
+    pairs = set(zip(labels.tolist(), other.tolist()))
+    return len(pairs) == len(set(labels.tolist())) == len(set(other.tolist()))
+
+
+@pytest.mark.parametrize('solver', ['slsqp', 'batched'])
+def test_executors_give_the_same_result(solver):
+    circles_ref = scene(seed=1)
+    kwargs = dict(KWARGS, solver=solver, seed=7, records=True)
+    serial, serial_loss, _, _, _ = locate_intersections(circles_ref, **kwargs)
+    for executor in ('thread', 'process'):
+        results, total_loss, _, _, _ = locate_intersections(circles_ref, executor=executor, **kwargs)
+        assert total_loss == serial_loss
+        assert_same_records(results, serial)
+
+
+def test_vectorized_loss_engine_matches_reference():
+    rng = np.random.default_rng(0)
+    x_list, r_list = rng.uniform(-5, 5, size=(6, 2)), rng.uniform(1, 4, size=6)
+    dec_ord, dec_loss, dec_jacobian = opt_func_dec(x_list, r_list)
+    vec_ord, vec_loss, vec_jacobian, vec_loss_and_jacobian = opt_func_vec(x_list, r_list)
+    for p in rng.uniform(-6, 6, size=(20, 2)):
+        assert np.isclose(vec_loss(p), dec_loss(p), rtol=1e-12)
+        assert np.allclose(vec_jacobian(p), dec_jacobian(p), rtol=1e-12)
+        for norm_ord in (1, 2, 16):
+            assert np.isclose(vec_ord(p, norm_ord=norm_ord), dec_ord(p, norm_ord=norm_ord), rtol=1e-12)
+        loss, jacobian = vec_loss_and_jacobian(p)
+        assert loss == vec_loss(p)
+        assert np.array_equal(jacobian, vec_jacobian(p))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_grid_pair_search_gives_the_same_hcluster_points(seed):
+    circles_ref = scene(seed=seed, num_targets=8)
+    points, point_circles, circle_point_ids = get_hcluster_points(circles_ref, pair_search='all')
+    grid_points, grid_point_circles, grid_circle_point_ids = get_hcluster_points(circles_ref, pair_search='grid')
+    assert np.array_equal(grid_points, points)
+    assert np.array_equal(grid_point_circles, point_circles)
+    assert grid_circle_point_ids == circle_point_ids
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_cluster_backends_give_the_same_partition(seed):
+    points, _, _ = get_hcluster_points(scene(seed=seed, num_targets=8))
+    num_clusters, labels, means = perform_hcluster(points, clustering_threshold=0.5, backend='fclusterdata')
+    for backend in ('mst', 'kdtree'):
+        backend_num_clusters, backend_labels, backend_means = perform_hcluster(points, clustering_threshold=0.5,
+                                                                               backend=backend)
+        assert backend_num_clusters == num_clusters
+        assert same_partition(backend_labels, labels)
+        # The same clusters have the same means, whatever their numbering
+        assert np.allclose(np.array(backend_means)[backend_labels], np.array(means)[labels])
+
+
+def test_mst_backend_on_collinear_points():
+    # Delaunay fails on collinear points, so the tree is built along the line
+    rng = np.random.default_rng(0)
+    points = np.array([1.0, 2.0]) + rng.uniform(-5, 5, size=40)[:, None] * np.array([0.6, 0.8])
+    points[5] = points[4]
+    num_clusters, labels, _ = perform_hcluster(points, clustering_threshold=0.5, backend='fclusterdata')
+    mst_num_clusters, mst_labels, _ = perform_hcluster(points, clustering_threshold=0.5, backend='mst')
+    assert mst_num_clusters == num_clusters
+    assert same_partition(mst_labels, labels)
+
+
+def test_batch_matches_single_scenes():
+    scenes = [scene(seed=k) for k in range(3)]
+    batch = locate_intersections_batch(scenes, seed=11, records=True, **KWARGS)
+    for k, (results, total_loss, xlim, ylim, highlight_radius) in enumerate(batch):
+        expected, expected_loss, expected_xlim, expected_ylim, expected_radius = \
+            locate_intersections(scenes[k], seed=11 + k, records=True, **KWARGS)
+        assert total_loss == expected_loss
+        assert_same_records(results, expected)
+        assert (xlim, ylim, highlight_radius) == (expected_xlim, expected_ylim, expected_radius)
+
+
+def test_dicts_match_records():
+    circles_ref = [[center, r, 'station %d' % (i,)] for i, (center, r) in enumerate(scene(seed=3))]
+    records, _, _, _, _ = locate_intersections(circles_ref, seed=5, records=True, **KWARGS)
+    dicts, _, _, _, _ = locate_intersections(circles_ref, seed=5, **KWARGS)
+    table, labels = as_circle_table([[center, r, None, label] for center, r, label in circles_ref])
+
+    assert len(dicts) == len(records)
+    for min_fun_vals, record in zip(dicts, records):
+        assert set(min_fun_vals) == set(record.to_dict(table, labels))
+        assert min_fun_vals['loss'] == record.loss
+        assert np.array_equal(min_fun_vals['p'], record.p)
+        assert min_fun_vals['index'] == record.index
+        # The cluster's own circles, in the circles_ref format, with the cluster index and label
+        assert len(min_fun_vals['circles']) == len(record.members)
+        for (center, r, cluster, label), i in zip(min_fun_vals['circles'], record.members):
+            assert np.array_equal(center, circles_ref[i][0])
+            assert r == circles_ref[i][1]
+            assert cluster == record.index
+            assert label == circles_ref[i][2]
+
+
+def test_joint_solve_of_one_cluster_matches_solve_cluster():
+    rng = np.random.default_rng(0)
+    x_list, r_list = rng.uniform(-5, 5, size=(5, 2)), rng.uniform(3, 6, size=5)
+    # positional arguments of solve_cluster, with and without the trailing defaults
+    for args in ((x_list, r_list, (-8, 8), (-8, 8), 4, None, 'joint', 3),
+                 (x_list, r_list, (-8, 8), (-8, 8), 4, np.zeros(2), 'joint', 3, True, 'grid')):
+        (joint,) = solve_clusters_joint([args])
+        single = solve_cluster(*args)
+        assert np.array_equal(joint[0], single[0])
+        assert joint[1] == single[1]
+        assert len(joint) == len(single)
+
+
+def test_joint_solver_rejects_an_executor():
+    with pytest.raises(ValueError, match='executor'):
+        locate_intersections(scene(seed=0), solver='joint', executor='thread', seed=0)
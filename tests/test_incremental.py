@@ -0,0 +1,31 @@
+import pytest
+
+from incremental import IncrementalLocator
+from scenes import make_scene
+
+
+def test_remove_unknown_circle_raises_key_error():
+    circles_ref, _, _ = make_scene(2, 3, seed=0)
+    locator = IncrementalLocator(circles_ref, solver='batched', seed=0)
+    circle_id = locator.add([[0.0, 0.0], 1.0])
+    locator.remove(circle_id)
+    with pytest.raises(KeyError, match=str(circle_id)):
+        locator.remove(circle_id)
+
+
+def test_remove_uses_the_configured_cluster_backend(monkeypatch):
+    import incremental
+
+    backends = []
+    perform_hcluster = incremental.perform_hcluster
+
+    def recording_perform_hcluster(points, clustering_threshold, backend):
+        backends.append(backend)
+        return perform_hcluster(points, clustering_threshold, backend=backend)
+
+    monkeypatch.setattr(incremental, 'perform_hcluster', recording_perform_hcluster)
+    circles_ref, _, _ = make_scene(2, 3, seed=0)
+    locator = IncrementalLocator(circles_ref, solver='batched', cluster_backend='mst', seed=0)
+    locator.remove(0)
+    assert len(backends) > 1
+    assert set(backends) == {'mst'}
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pytest
+
+from observers import IterationSnapshot
+from plot_circles import AsyncPlotter
+
+
+def snapshot(iteration):
+    return IterationSnapshot(iteration=iteration, circle_centers=np.zeros((1, 2)), circle_radii=np.ones(1),
+                             clusters=np.zeros(1, dtype=np.int64), targets=np.zeros((1, 2)), losses=np.zeros(1),
+                             total_loss=0.0, xlim=(-2, 2), ylim=(-2, 2), highlight_radius=0.1)
+
+
+@pytest.mark.parametrize('use_process', [False, True])
+def test_failed_worker_raises_instead_of_blocking(tmp_path, use_process):
+    # savefolder is a file, so the worker cannot create it
+    savefolder = tmp_path / 'not a folder'
+    savefolder.write_text('')
+    plotter = AsyncPlotter(str(savefolder), use_process=use_process, max_pending=1)
+    with pytest.raises(RuntimeError, match='AsyncPlotter worker stopped'):
+        # more snapshots than fit in the queue; without the check, this blocks forever
+        for iteration in range(5):
+            plotter(snapshot(iteration))
+        plotter.close()
+
+
+def test_close_waits_for_every_plot(tmp_path):
+    pytest.importorskip('matplotlib')
+    with AsyncPlotter(str(tmp_path), max_pending=1) as plotter:
+        for iteration in range(3):
+            plotter(snapshot(iteration))
+    assert sorted(os.listdir(tmp_path)) == ['plotcircles iter %d.png' % (iteration,) for iteration in range(3)]
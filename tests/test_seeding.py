@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from multilateration import cluster_seeds, opt_func_vec
+
+
+def circles_through(target, num_circles, seed=0, noise=0.05):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-50, 50, size=(num_circles, 2))
+    radii = np.linalg.norm(centers - target, axis=1) + rng.normal(0, noise, size=num_circles)
+    return centers, radii
+
+
+@pytest.mark.parametrize('seeding', ['intersections', 'grid'])
+def test_seeds_are_separated_and_in_order_of_loss(seeding):
+    centers, radii = circles_through(np.array([3.0, 4.0]), 6)
+    seeds = cluster_seeds(centers, radii, 5, seeding=seeding)
+    _, loss_func, _, _ = opt_func_vec(centers, radii)
+    losses = [loss_func(seed) for seed in seeds]
+    assert len(seeds) == 5
+    assert losses == sorted(losses)
+    distances = np.linalg.norm(seeds[:, None] - seeds[None], axis=2)
+    assert np.all(distances[np.triu_indices(len(seeds), k=1)] >= np.mean(radii) / 10)
+
+
+def test_intersection_seeding_of_a_large_cluster():
+    # all 499500 pairs would need a (10^6, 1000, 2) array to score; only max_pairs of them are used
+    target = np.array([3.0, 4.0])
+    centers, radii = circles_through(target, 1000)
+    seeds = cluster_seeds(centers, radii, 7, seeding='intersections')
+    assert len(seeds) == 7
+    assert np.linalg.norm(seeds[0] - target) < 0.1
@@ -0,0 +1,71 @@
+import asyncio
+import numpy as np
+import pytest
+
+from multilateration import locate_intersections
+from scenes import make_scene
+from service import BatchingLocator, generate_load
+
+KWARGS = dict(solver='batched', pair_search='grid', cluster_backend='kdtree', convergence_tol=1e-6, records=True)
+
+
+def scenes(num_scenes):
+    return [make_scene(2, 3, noise=0.02, seed=k)[0] for k in range(num_scenes)]
+
+
+def run_load(scenes, **kwargs):
+    # Send all scenes at once; max_wait is long enough for every batch to fill up
+    async def run():
+        async with BatchingLocator(max_wait=1.0, max_pending_batches=1, **dict(KWARGS, **kwargs)) as locator:
+            results, latencies, elapsed = await generate_load(locator, scenes)
+            return results, latencies, locator.metrics()
+    return asyncio.run(run())
+
+
+def test_results_match_locate_intersections_with_seed_plus_n():
+    load = scenes(6)
+    results, latencies, _ = run_load(load, max_batch_size=4, seed=3)
+    assert len(latencies) == len(load) and np.all(latencies > 0)
+    for n, (scene, result) in enumerate(zip(load, results)):
+        records, total_loss, xlim, ylim, highlight_radius = result
+        expected, expected_loss, expected_xlim, expected_ylim, expected_radius = \
+            locate_intersections(scene, seed=3 + n, **KWARGS)
+        assert total_loss == expected_loss
+        assert (xlim, ylim, highlight_radius) == (expected_xlim, expected_ylim, expected_radius)
+        assert len(records) == len(expected)
+        for record, expected_record in zip(records, expected):
+            assert np.array_equal(record.p, expected_record.p)
+            assert np.array_equal(record.members, expected_record.members)
+
+
+def test_metrics_count_requests_and_batch_sizes():
+    _, _, metrics = run_load(scenes(8), max_batch_size=4, seed=0)
+    assert metrics['requests'] == 8
+    assert metrics['batches'] == 2
+    assert metrics['batch_sizes'] == {4: 2}
+    assert metrics['mean_batch_size'] == 4
+    assert metrics['failed'] == 0
+    assert metrics['queue_depth'] == 0 and metrics['pending_batches'] == 0
+
+
+def test_a_failing_request_fails_alone():
+    load = scenes(4)
+    # a negative radius makes the whole batch raise
+    load[2] = [[[0.0, 0.0], -1.0]]
+    results, _, metrics = run_load(load, max_batch_size=4, seed=0)
+    assert isinstance(results[2], ValueError)
+    for n in (0, 1, 3):
+        assert not isinstance(results[n], Exception)
+        assert results[n][1] == locate_intersections(load[n], seed=n, **KWARGS)[1]
+    assert metrics['failed'] == 1
+    assert metrics['batch_sizes'] == {4: 1}
+
+
+def test_locate_raises_after_close():
+    async def run():
+        locator = BatchingLocator(seed=0, **KWARGS)
+        await locator.locate(scenes(1)[0])
+        await locator.close()
+        with pytest.raises(RuntimeError, match='closed'):
+            await locator.locate(scenes(1)[0])
+    asyncio.run(run())
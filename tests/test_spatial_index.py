@@ -0,0 +1,13 @@
+import numpy as np
+
+from spatial_index import all_candidate_pairs, grid_candidate_pairs
+
+
+def test_grid_pairs_with_a_few_large_circles_match_all_pairs():
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(0, 100, size=(500, 2))
+    radii = rng.uniform(0.5, 3.0, size=500)
+    # without the brute-force path, the first circle alone would cover about 1e8 grid cells
+    radii[[0, 7, 8]] = [1e4, 50.0, 20.0]
+    pairs = grid_candidate_pairs(centers, radii, expansion=1.1)
+    assert np.array_equal(pairs, all_candidate_pairs(centers, radii, expansion=1.1))
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from multilateration import auto_clustering_threshold, locate_intersections, search_clustering_threshold
+from scenes import make_scene
+from tiling import locate_intersections_tiled
+
+FEW_CIRCLES = {
+    'one circle': [[[0.0, 0.0], 1.0, 'a']],
+    'two circles': [[[0.0, 0.0], 1.0, 'a'], [[1.5, 0.0], 1.0, 'b']],
+    'two separated pairs': [[[0.0, 0.0], 1.0, 'a'], [[1.5, 0.0], 1.0, 'b'],
+                            [[50.0, 0.0], 1.0, 'c'], [[51.5, 0.0], 1.0, 'd']],
+}
+
+
+@pytest.mark.parametrize('name', sorted(FEW_CIRCLES))
+def test_search_falls_back_without_degrees_of_freedom(name):
+    circles_ref = FEW_CIRCLES[name]
+    circles = [[center, r, None, label] for center, r, label in circles_ref]
+    threshold, score, candidates = search_clustering_threshold(circles, seed=0)
+    if not candidates:
+        assert threshold == pytest.approx(float(auto_clustering_threshold(1.0)))
+        assert np.isnan(score)
+
+    best_fun_vals_list, best_total_loss, _, _, _ = locate_intersections(
+        circles_ref, clustering_threshold='search', solver='batched', seed=0)
+    assert best_fun_vals_list
+    assert np.isfinite(best_total_loss)
+
+
+def test_tiled_search_with_small_tiles():
+    circles_ref, _, _ = make_scene(16, 3, seed=0)
+    best_fun_vals_list, _, _, _, _ = locate_intersections_tiled(
+        circles_ref, tile_size=10, clustering_threshold='search', solver='batched', seed=0)
+    assert best_fun_vals_list
@@ -0,0 +1,252 @@
+import numpy as np
+
+try:
+    # from same directory
+    from circle_table import LatResult, circle_table_from_arrays, table_centers
+    from multilateration import SEEDINGS, assign_circles_to_targets, cluster_executor, locate_scene, \
+        prepare_scenes, set_highlights, solve_cluster
+    from profiling import NULL_PROFILER
+except ModuleNotFoundError:
+    # if it is contained in a project
+    from .circle_table import LatResult, circle_table_from_arrays, table_centers
+    from .multilateration import SEEDINGS, assign_circles_to_targets, cluster_executor, locate_scene, \
+        prepare_scenes, set_highlights, solve_cluster
+    from .profiling import NULL_PROFILER
+
+
+def tile_circles(centers, tile_size, halo):
+    """
+    Partition circles into square tiles by their centers. Each tile is a core square of side
+    tile_size, grown by halo on every side; a circle is in every tile whose grown square holds
+    its center, so circles near a core border are in several tiles.
+
+    :param centers: (n, 2) array of circle centers
+    :param tile_size: side of the core square of a tile
+    :param halo: margin added around each core
+    :return: list of (core, members): core is ((x0, x1), (y0, y1)), the bounds of the tile's core, and
+             members the sorted int array of the circles in the tile. Only tiles with circles are listed,
+             ordered by x, then y.
+    """
+    centers = np.reshape(np.asarray(centers, dtype='float64'), (-1, 2))
+    if not len(centers):
+        return []
+
+    # range of tiles whose grown square holds each center
+    origin = np.min(centers, axis=0)
+    lo = np.floor((centers - halo - origin) / tile_size).astype(np.int64)
+    hi = np.floor((centers + halo - origin) / tile_size).astype(np.int64)
+    span = hi - lo + 1
+    tiles_per_circle = span[:, 0] * span[:, 1]
+
+    # one entry per (circle, tile), as in spatial_index.grid_candidate_pairs
+    entry_circle = np.repeat(np.arange(len(centers)), tiles_per_circle)
+    local = np.arange(len(entry_circle)) - np.repeat(np.cumsum(tiles_per_circle) - tiles_per_circle,
+                                                     tiles_per_circle)
+    tile_x = lo[entry_circle, 0] + local % span[entry_circle, 0]
+    tile_y = lo[entry_circle, 1] + local // span[entry_circle, 0]
+
+    y_min, y_max = np.min(tile_y), np.max(tile_y)
+    tile_key = (tile_x - np.min(tile_x)) * (y_max - y_min + 1) + (tile_y - y_min)
+    order = np.lexsort((entry_circle, tile_key))
+    entry_circle, tile_key = entry_circle[order], tile_key[order]
+    tile_x, tile_y = tile_x[order], tile_y[order]
+
+    starts = np.flatnonzero(np.r_[True, tile_key[1:] != tile_key[:-1]])
+    tiles = []
+    for start, members in zip(starts, np.split(entry_circle, starts[1:])):
+        x0, y0 = origin + tile_size * np.array((tile_x[start], tile_y[start]))
+        tiles.append((((x0, x0 + tile_size), (y0, y0 + tile_size)), members))
+    return tiles
+
+def merge_tile_results(tile_results, centers, radii, solver='slsqp', merge_distance=0.0, seed=0):
+    """
+    Merge the targets of overlapping tiles into one set of targets.
+
+    A target is kept by the tile whose core holds it, grown by merge_distance so that targets on a
+    core border are not lost; cores on the border of the scene reach out to infinity. A target
+    outside the core is kept too if none of its circles belong to a kept target. Of kept targets
+    closer than merge_distance, the one with the most circles (then the lowest loss) is kept.
+    A circle claimed by several kept targets goes to the one ranked first in the same way, and a
+    circle claimed by none to the closest, as in assign_circles_to_targets. Targets whose circles
+    changed are solved again, starting from their p; targets left without circles are dropped.
+
+    :param tile_results: list of (core, lat_results), where lat_results are the LatResult records of the
+                         tile, with members as indices into centers and radii
+    :param centers: (n, 2) array of the circle centers of the whole scene
+    :param radii: (n,) array of their radii
+    :param solver: solver for the targets that are solved again, see solve_cluster
+    :param merge_distance: targets closer than this are the same target
+    :param seed: seed of those solves
+    :return: list of LatResult, with consecutive indices and p_plus not set
+    """
+    # Targets can lie outside the circle centers, so cores on the border of the scene are open outwards
+    cores = np.array([core for core, _ in tile_results], dtype='float64').reshape(-1, 4)
+    cores[cores[:, 0] == np.min(cores[:, 0]), 0] = -np.inf
+    cores[cores[:, 1] == np.max(cores[:, 1]), 1] = np.inf
+    cores[cores[:, 2] == np.min(cores[:, 2]), 2] = -np.inf
+    cores[cores[:, 3] == np.max(cores[:, 3]), 3] = np.inf
+
+    def rank(lat_result):
+        # Most circles, then lowest loss first
+        return -len(lat_result.members), lat_result.loss
+
+    candidates, outside = [], []
+    for (x0, x1, y0, y1), (_, lat_results) in zip(cores, tile_results):
+        for lat_result in lat_results:
+            x, y = lat_result.p
+            if not len(lat_result.members):
+                continue
+            if x0 - merge_distance <= x < x1 + merge_distance and y0 - merge_distance <= y < y1 + merge_distance:
+                candidates.append(lat_result)
+            else:
+                outside.append(lat_result)
+
+    # A target can be found outside the core of every tile that solves it, for instance at the two
+    # intersections of a two-circle cluster. Keep such targets if none of their circles is claimed yet.
+    claimed = np.zeros(len(radii), dtype=bool)
+    for lat_result in candidates:
+        claimed[lat_result.members] = True
+    for lat_result in sorted(outside, key=rank):
+        if not np.any(claimed[lat_result.members]):
+            candidates.append(lat_result)
+            claimed[lat_result.members] = True
+    if not candidates:
+        return []
+
+    # Drop candidates close to one already kept
+    candidates.sort(key=rank)
+    targets = np.array([lat_result.p for lat_result in candidates], dtype='float64')
+    kept = []
+    if merge_distance > 0:
+        from scipy.spatial import cKDTree
+        near = cKDTree(targets).query_ball_point(targets, merge_distance)
+        dropped = np.zeros(len(candidates), dtype=bool)
+        for k in range(len(candidates)):
+            if not dropped[k]:
+                kept.append(k)
+                dropped[near[k]] = True
+    else:
+        kept = list(range(len(candidates)))
+    kept.sort()
+    candidates = [candidates[k] for k in kept]
+    targets = targets[kept]
+
+    # Target of each circle: the first of the targets claiming it, which are in rank order, else the closest
+    claim_target = np.concatenate([np.full(len(lat_result.members), k) for k, lat_result in enumerate(candidates)])
+    claim_circle = np.concatenate([lat_result.members for lat_result in candidates])
+    circle_target = np.full(len(radii), len(candidates))
+    np.minimum.at(circle_target, claim_circle, claim_target)
+    unclaimed = np.flatnonzero(circle_target == len(candidates))
+    if len(unclaimed):
+        circle_target[unclaimed], _ = assign_circles_to_targets(centers[unclaimed], radii[unclaimed], targets)
+
+    order = np.argsort(circle_target, kind='stable')
+    counts = np.bincount(circle_target, minlength=len(candidates))
+    merged = []
+    for k, (lat_result, members) in enumerate(zip(candidates, np.split(order, np.cumsum(counts)[:-1]))):
+        if not len(members):
+            continue
+        p, loss = lat_result.p, lat_result.loss
+        if not np.array_equal(members, lat_result.members):
+            x_list, r_list = centers[members], radii[members]
+            xlim = (np.min(x_list[:, 0] - r_list), np.max(x_list[:, 0] + r_list))
+            ylim = (np.min(x_list[:, 1] - r_list), np.max(x_list[:, 1] + r_list))
+            p, loss = solve_cluster(x_list, r_list, xlim, ylim, opt_trials=1, p0_from_hcluster=p, solver=solver,
+                                    seed=(seed, k))
+        merged.append(LatResult(loss=loss, p=p, members=members, index=len(merged)))
+
+    return merged
+
+def locate_intersections_tiled(circles_ref, tile_size=None, halo=None, merge_distance=None, clustering_threshold=None,
+                               verbose=False, solver='slsqp', pair_search='all', cluster_backend='fclusterdata',
+                               convergence_tol=None, executor=None, seed=None, records=False,
+                               warm_start_cache=None, profiler=None, seeding='uniform',
+                               labels=None, linear_tol=None, intersection_cache=None):
+    """
+    locate_intersections for wide scenes, by tiles. The circles are partitioned into square tiles
+    (tile_circles), each tile is solved on its own as a scene, and the targets of the tiles are
+    merged (merge_tile_results). Targets far apart never share circles, so the cost of each tile
+    depends only on the circles near it, not on the whole scene.
+
+    A target's circles have their centers within r_max of it, so with halo at least 2 r_max every
+    target within r_max of a tile's core is solved with all its circles.
+
+    :param circles_ref: list of [(x,y),r,label], or a circle table, as for locate_intersections
+    :param tile_size: side of the core square of a tile. If None, 40 times the largest radius
+    :param halo: margin around each core. If None, twice the largest radius
+    :param merge_distance: targets of different tiles closer than this are the same target.
+                           If None, the highlight radius (a tenth of the average radius)
+    :param clustering_threshold: threshold shared by all tiles. If None, derived from the average radius of
+                                 the whole scene. 'search' searches the threshold of each tile
+    :param executor: How to solve the tiles: None one after another, 'thread' or 'process' on a new thread
+                     or process pool, or on a given concurrent.futures.Executor. Process pools work on copies
+                     of warm_start_cache, intersection_cache and profiler, as in locate_intersections_batch
+    :param seed: Tile k is seeded with seed + k. If None, drawn from numpy's global random state
+    :param labels: If circles_ref is a circle table, the labels its label column indexes into
+    :return: best_fun_vals_list, best_total_loss, xlim, ylim, highlight_radius, as locate_intersections
+    """
+    assert len(circles_ref)
+    assert seeding in SEEDINGS
+
+    if seed is None:
+        seed = np.random.randint(2**31)
+
+    profiler = NULL_PROFILER if profiler is None else profiler
+
+    with profiler.section('prepare'):
+        ((table, labels, xlim, ylim, clustering_threshold, highlight_radius),) = \
+            prepare_scenes([circles_ref], clustering_threshold=clustering_threshold, verbose=verbose, labels=[labels])
+
+        centers = table_centers(table)
+        radii = np.ascontiguousarray(table['r'])
+        r_max = np.max(radii)
+        if tile_size is None:
+            tile_size = 40 * r_max
+        if halo is None:
+            halo = 2 * r_max
+        if merge_distance is None:
+            merge_distance = highlight_radius
+
+        tiles = tile_circles(centers, tile_size, halo)
+        if verbose:
+            print('[minlateration: locate_intersections_tiled] %d tiles, largest %d circles' %
+                  (len(tiles), max(len(members) for _, members in tiles)))
+
+    args_list = []
+    for k, (core, members) in enumerate(tiles):
+        tile_table, _ = circle_table_from_arrays(centers[members], radii[members])
+        tile_xlim = (np.min(tile_table['x'] - tile_table['r']), np.max(tile_table['x'] + tile_table['r']))
+        tile_ylim = (np.min(tile_table['y'] - tile_table['r']), np.max(tile_table['y'] + tile_table['r']))
+        mm_kwargs = dict(num_lat_clusters=None, verbose=verbose, solver=solver, pair_search=pair_search,
+                         cluster_backend=cluster_backend, convergence_tol=convergence_tol, seed=seed + k, records=True,
+                         warm_start_cache=warm_start_cache, intersection_cache=intersection_cache,
+                         profiler=profiler, seeding=seeding, linear_tol=linear_tol)
+        args_list.append((tile_table, [], tile_xlim, tile_ylim, clustering_threshold, highlight_radius, mm_kwargs))
+
+    with cluster_executor(executor) as pool:
+        if pool is None:
+            solved = [locate_scene(*args) for args in args_list]
+        else:
+            futures = [pool.submit(locate_scene, *args) for args in args_list]
+            solved = [future.result() for future in futures]
+
+    # Members of the tiles' results are rows of the tile tables; make them rows of the scene's table
+    tile_results = []
+    for (core, members), (lat_results, _, _, _, _) in zip(tiles, solved):
+        for lat_result in lat_results:
+            lat_result.members = members[lat_result.members]
+        tile_results.append((core, lat_results))
+
+    best_fun_vals_list = merge_tile_results(tile_results, centers, radii, solver=solver,
+                                            merge_distance=merge_distance, seed=seed)
+    best_total_loss = sum(lat_result.loss for lat_result in best_fun_vals_list)
+
+    with profiler.section('highlights'):
+        set_highlights(best_fun_vals_list, centers, radii, highlight_radius)
+
+    if not records:
+        best_fun_vals_list = [lat_result.to_dict(table, labels) for lat_result in best_fun_vals_list]
+
+    if verbose: print('Best total loss:', best_total_loss)
+
+    return best_fun_vals_list, best_total_loss, xlim, ylim, highlight_radius